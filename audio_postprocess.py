@@ -0,0 +1,135 @@
+# audio_postprocess.py
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import numpy as np
+from typing import Optional
+from ffmpeg_utils import run_ffmpeg
+from captions import alignment_path, load_alignment
+
+logger = logging.getLogger(__name__)
+
+
+class AudioPostProcessor:
+    """무음 트리밍 + EBU R128 라우드니스 정규화. 입력 해시 기준으로 결과 캐시"""
+
+    def __init__(self, cache_dir: str = 'static/audio/processed', analysis_rate: int = 16000,
+                 frame_ms: int = 10, silence_db: float = -45.0, pad_seconds: float = 0.15,
+                 target_lufs: float = -14.0, true_peak: float = -1.5, lra: float = 11.0):
+        self.cache_dir = cache_dir
+        self.analysis_rate = analysis_rate
+        self.frame_ms = frame_ms
+        self.silence_db = silence_db
+        self.pad_seconds = pad_seconds
+        self.target_lufs = target_lufs
+        self.true_peak = true_peak
+        self.lra = lra
+
+    def _params_key(self) -> str:
+        return (f"{self.analysis_rate}:{self.frame_ms}:{self.silence_db}:{self.pad_seconds}:"
+                f"{self.target_lufs}:{self.true_peak}:{self.lra}")
+
+    def _input_hash(self, path: str) -> str:
+        digest = hashlib.sha256(self._params_key().encode('utf-8'))
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:32]
+
+    def analyze(self, path: str) -> dict:
+        """한 번 디코딩한 PCM 을 memmap 으로 읽어 무음 구간과 피크를 벡터 연산으로 계산"""
+        work_dir = tempfile.mkdtemp(prefix="audio_pcm_")
+        pcm_path = os.path.join(work_dir, "mono.f32")
+        try:
+            run_ffmpeg(["-i", path, "-ac", "1", "-ar", str(self.analysis_rate), "-f", "f32le", pcm_path])
+            if os.path.getsize(pcm_path) == 0:
+                return {'duration': 0.0, 'start': 0.0, 'end': 0.0, 'peak_db': float('-inf')}
+
+            samples = np.memmap(pcm_path, dtype=np.float32, mode='r')
+            duration = len(samples) / self.analysis_rate
+            frame = max(1, self.analysis_rate * self.frame_ms // 1000)
+            usable = len(samples) // frame * frame
+
+            frames = np.asarray(samples[:usable]).reshape(-1, frame)
+            rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+            rms_db = 20 * np.log10(np.maximum(rms, 1e-10))
+            peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+            del frames, samples
+
+            voiced = np.flatnonzero(rms_db > self.silence_db)
+            if voiced.size == 0:
+                start, end = 0.0, duration
+            else:
+                frame_seconds = frame / self.analysis_rate
+                start = max(0.0, voiced[0] * frame_seconds - self.pad_seconds)
+                end = min(duration, (voiced[-1] + 1) * frame_seconds + self.pad_seconds)
+
+            return {
+                'duration': float(duration),
+                'start': float(start),
+                'end': float(end),
+                'peak_db': float(20 * np.log10(max(peak, 1e-10))),
+            }
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def process(self, path: str, output_path: Optional[str] = None) -> str:
+        """트리밍 + 정규화된 오디오 경로 반환 (캐시 적중 시 분석/인코딩 생략)"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        key = self._input_hash(path)
+        cached_path = os.path.join(self.cache_dir, f"{key}.mp3")
+        meta_path = os.path.join(self.cache_dir, f"{key}.json")
+
+        if not (os.path.exists(cached_path) and os.path.exists(meta_path)):
+            info = self.analyze(path)
+            # 트리밍과 라우드니스 정규화를 ffmpeg 한 번으로 처리
+            run_ffmpeg([
+                "-ss", f"{info['start']:.3f}", "-to", f"{info['end']:.3f}", "-i", path,
+                "-af", f"loudnorm=I={self.target_lufs}:TP={self.true_peak}:LRA={self.lra}",
+                "-ar", "44100", "-c:a", "libmp3lame", "-b:a", "192k",
+                cached_path
+            ])
+            self._shift_alignment(path, cached_path, info['start'])
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(info, f)
+            trimmed = info['duration'] - (info['end'] - info['start'])
+            logger.info(f"🎚️ 오디오 후처리: 무음 {trimmed:.2f}초 제거, 피크 {info['peak_db']:.1f}dBFS → "
+                        f"{self.target_lufs} LUFS")
+        else:
+            logger.info(f"후처리 캐시 사용: {cached_path}")
+
+        if output_path:
+            shutil.copyfile(cached_path, output_path)
+            if os.path.exists(alignment_path(cached_path)):
+                shutil.copyfile(alignment_path(cached_path), alignment_path(output_path))
+            return output_path
+        return cached_path
+
+    def _shift_alignment(self, source: str, processed: str, offset: float):
+        """앞쪽 무음을 잘라낸 만큼 TTS 타임스탬프도 당겨서 자막 싱크 유지"""
+        alignment = load_alignment(source)
+        if not alignment:
+            return
+        for field in ('character_start_times_seconds', 'character_end_times_seconds'):
+            alignment[field] = [max(0.0, t - offset) for t in alignment[field]]
+        with open(alignment_path(processed), 'w', encoding='utf-8') as f:
+            json.dump(alignment, f, ensure_ascii=False)
+
+
+# 오디오 후처리기 인스턴스
+audio_postprocessor = AudioPostProcessor()
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from logging_setup import setup_logging
+    setup_logging()
+
+    target = sys.argv[1] if len(sys.argv) > 1 else "static/audio/output.mp3"
+    for label in ("최초", "캐시"):
+        started = time.perf_counter()
+        result = audio_postprocessor.process(target)
+        print(f"{label}: {result} ({time.perf_counter() - started:.3f}초)")
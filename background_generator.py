@@ -0,0 +1,171 @@
+# background_generator.py
+import os
+import json
+import colorsys
+import hashlib
+import logging
+import numpy as np
+from PIL import Image
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SHORTS_SIZE = (1080, 1920)
+LANDSCAPE_SIZE = (1280, 720)
+
+# 카테고리별 기본 색상(hue, 0~1). 목록에 없으면 주제 해시로 결정
+CATEGORY_HUES = {
+    '기술': 0.60, 'IT': 0.60, 'AI': 0.70, '인공지능': 0.70, '프로그래밍': 0.55,
+    '과학': 0.50, '보안': 0.35, '암호화폐': 0.12, '비트코인': 0.10, '메타버스': 0.80,
+}
+STYLES = ('linear', 'radial', 'noise')
+
+
+class BackgroundLibrary:
+    """주제/카테고리 시드 기반 배경 생성 + 내용 주소 캐시 (LRU 용량 제한)"""
+
+    def __init__(self, cache_dir: str = 'static/backgrounds', max_entries: int = 200,
+                 max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    # ========================
+    # 파라미터 → 캐시 키
+    # ========================
+    def _params(self, topic: str, category: str, size: Tuple[int, int], variant: int) -> dict:
+        seed = int(hashlib.sha256(f"{category}|{topic}|{variant}".encode('utf-8')).hexdigest()[:16], 16)
+        rng = np.random.default_rng(seed)
+        base_hue = CATEGORY_HUES.get(category, rng.random())
+        return {
+            'size': list(size),
+            'style': STYLES[int(rng.integers(len(STYLES)))],
+            'hues': [round((base_hue + offset) % 1.0, 4)
+                     for offset in (0.0, float(rng.uniform(0.08, 0.25)), float(rng.uniform(-0.2, -0.05)))],
+            'angle': round(float(rng.uniform(0, np.pi)), 4),
+            'noise_scale': int(rng.integers(4, 12)),
+            'seed': seed % (2 ** 32),
+        }
+
+    def _cache_key(self, params: dict) -> str:
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+
+    # ========================
+    # 벡터 연산 렌더링
+    # ========================
+    @staticmethod
+    def _color(hue: float, saturation: float, value: float) -> np.ndarray:
+        return np.array(colorsys.hsv_to_rgb(hue, saturation, value), dtype=np.float32)
+
+    @staticmethod
+    def _value_noise(height: int, width: int, cells: int, rng: np.random.Generator) -> np.ndarray:
+        """저해상도 난수 격자를 bilinear 보간해 부드러운 노이즈 생성"""
+        grid_h = cells * height // max(height, width) + 2
+        grid_w = cells * width // max(height, width) + 2
+        grid = rng.random((grid_h, grid_w), dtype=np.float32)
+
+        ys = np.linspace(0, grid_h - 1.001, height, dtype=np.float32)
+        xs = np.linspace(0, grid_w - 1.001, width, dtype=np.float32)
+        y0, x0 = ys.astype(np.int32), xs.astype(np.int32)
+        # smoothstep 으로 격자 경계가 보이지 않게
+        fy = (ys - y0)[:, None]
+        fx = (xs - x0)[None, :]
+        fy, fx = fy * fy * (3 - 2 * fy), fx * fx * (3 - 2 * fx)
+
+        top = grid[y0][:, x0] * (1 - fx) + grid[y0][:, x0 + 1] * fx
+        bottom = grid[y0 + 1][:, x0] * (1 - fx) + grid[y0 + 1][:, x0 + 1] * fx
+        return top * (1 - fy) + bottom * fy
+
+    def render(self, params: dict) -> Image.Image:
+        width, height = params['size']
+        rng = np.random.default_rng(params['seed'])
+        c1, c2, c3 = (self._color(h, 0.75, v) for h, v in zip(params['hues'], (0.55, 0.35, 0.15)))
+
+        y = np.linspace(-1, 1, height, dtype=np.float32)[:, None]
+        x = np.linspace(-1, 1, width, dtype=np.float32)[None, :] * (width / height)
+
+        if params['style'] == 'radial':
+            t = np.clip(np.sqrt(x * x + y * y) / 1.2, 0, 1)
+        else:
+            angle = params['angle']
+            t = (x * np.cos(angle) + y * np.sin(angle))
+            t = (t - t.min()) / max(float(t.max() - t.min()), 1e-6)
+
+        if params['style'] == 'noise':
+            noise = self._value_noise(height, width, params['noise_scale'], rng)
+            t = np.clip(0.6 * t + 0.4 * noise, 0, 1)
+
+        t = t[..., None]
+        # 3색 그라데이션: c1 → c2 → c3
+        image = np.where(t < 0.5, c1 + (c2 - c1) * (t * 2), c2 + (c3 - c2) * (t * 2 - 1))
+
+        # 미세 그레인 + 비네트 (밴딩 방지, 중앙 자막 가독성)
+        image += (rng.random((height, width, 1), dtype=np.float32) - 0.5) * (4 / 255)
+        vignette = 1 - 0.35 * np.clip(x * x / (width / height) ** 2 + y * y, 0, 1)
+        image *= vignette[..., None]
+
+        return Image.fromarray((np.clip(image, 0, 1) * 255).astype(np.uint8), 'RGB')
+
+    # ========================
+    # 캐시
+    # ========================
+    def get(self, topic: str, category: str = '', size: Tuple[int, int] = SHORTS_SIZE,
+            variant: int = 0) -> str:
+        """주제별 배경 이미지 경로 (캐시 적중 시 파일 접근 시각만 갱신)"""
+        params = self._params(topic, category, size, variant)
+        path = os.path.join(self.cache_dir, f"{self._cache_key(params)}.jpg")
+
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        self.render(params).save(tmp_path, 'JPEG', quality=92, subsampling=0)
+        os.replace(tmp_path, path)
+        logger.info(f"🎨 배경 생성: {topic} ({params['style']}, {size[0]}x{size[1]})")
+        self._evict()
+        return path
+
+    def _evict(self):
+        """최근 사용 순으로 max_entries / max_bytes 초과분 삭제"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.jpg'):
+                full = os.path.join(self.cache_dir, name)
+                stat = os.stat(full)
+                entries.append((stat.st_mtime, stat.st_size, full))
+        entries.sort(reverse=True)
+
+        total = 0
+        for idx, (_, size, full) in enumerate(entries):
+            total += size
+            if idx >= self.max_entries or total > self.max_bytes:
+                os.remove(full)
+                logger.info(f"배경 캐시 정리: {os.path.basename(full)}")
+
+
+def size_for_targets(targets) -> Tuple[int, int]:
+    """세로 포맷이 하나라도 있으면 세로 배경, 아니면 가로 배경"""
+    return LANDSCAPE_SIZE if set(targets) <= {'longform'} else SHORTS_SIZE
+
+
+# 배경 라이브러리 인스턴스
+background_library = BackgroundLibrary()
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import tempfile
+    from logging_setup import setup_logging
+    setup_logging()
+
+    library = BackgroundLibrary(cache_dir=tempfile.mkdtemp(prefix="bg_bench_"))
+    topics = sys.argv[1:] or ['AI의 미래와 일자리', '비트코인 반감기', '자율주행 택시']
+    for size in (SHORTS_SIZE, LANDSCAPE_SIZE):
+        for label in ("생성", "캐시"):
+            started = time.perf_counter()
+            for topic in topics:
+                library.get(topic, '기술', size=size)
+            elapsed = (time.perf_counter() - started) / len(topics) * 1000
+            print(f"{size[0]}x{size[1]} {label}: 영상당 {elapsed:.2f}ms")
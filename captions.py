@@ -0,0 +1,302 @@
+# captions.py
+import os
+import re
+import json
+import logging
+from typing import List, Optional, Tuple
+from ffmpeg_utils import probe_duration
+from tts_normalizer import TTSNormalizer
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r'[.!?。…~]+["\')\]]*$')
+# 자막 문장 분리: 문장부호 뒤 공백 또는 줄바꿈 ('73.5%' 의 '.' 에서는 자르지 않음)
+DISPLAY_SPLIT = re.compile(r'(?<=[.!?。…])\s+|\n+')
+# 원문 문장이 낭독 텍스트의 이 비율 이상을 설명하지 못하면(축약 요청으로 다시 쓴 경우 등) 낭독 텍스트로 자막 생성
+MIN_MATCH_RATIO = 0.8
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: {width}
+PlayResY: {height}
+WrapStyle: 0
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,{font},{font_size},&H00FFFFFF,&H00B4B4B4,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,4,2,2,60,60,{margin_v},1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+# (시작 초, 끝 초, 단어)
+Word = Tuple[float, float, str]
+
+
+class Cue:
+    def __init__(self, words: List[Word]):
+        self.words = words
+        self.start = words[0][0]
+        self.end = words[-1][1]
+
+    @property
+    def text(self) -> str:
+        return " ".join(word for _, _, word in self.words)
+
+
+def alignment_path(audio_path: str) -> str:
+    """TTS 타임스탬프 사이드카 파일 경로"""
+    return os.path.splitext(audio_path)[0] + ".alignment.json"
+
+
+def spoken_text_path(audio_path: str) -> str:
+    """실제로 TTS 에 보낸(정규화/길이 조정된) 텍스트 사이드카 파일 경로"""
+    return os.path.splitext(audio_path)[0] + ".spoken.txt"
+
+
+def save_spoken_text(audio_path: str, text: str):
+    with open(spoken_text_path(audio_path), 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def load_spoken_text(audio_path: str) -> Optional[str]:
+    path = spoken_text_path(audio_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def load_alignment(audio_path: str) -> Optional[dict]:
+    path = alignment_path(audio_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def words_from_alignment(alignment: dict) -> List[Word]:
+    """ElevenLabs 문자 단위 타임스탬프를 단어 단위로 묶음"""
+    chars = alignment['characters']
+    starts = alignment['character_start_times_seconds']
+    ends = alignment['character_end_times_seconds']
+
+    words, current, word_start, word_end = [], [], None, None
+    for char, start, end in zip(chars, starts, ends):
+        if char.isspace():
+            if current:
+                words.append((word_start, word_end, "".join(current)))
+            current, word_start = [], None
+            continue
+        if word_start is None:
+            word_start = start
+        current.append(char)
+        word_end = end
+    if current:
+        words.append((word_start, word_end, "".join(current)))
+    return words
+
+
+def estimate_words(text: str, duration: float) -> List[Word]:
+    """타임스탬프가 없을 때 글자 수 비례로 단어 시간 추정 (문장 끝은 쉼 가중치)"""
+    tokens = text.split()
+    if not tokens:
+        return []
+    weights = [len(token) + (3 if SENTENCE_END.search(token) else 1) for token in tokens]
+    scale = duration / sum(weights)
+
+    words, cursor = [], 0.0
+    for token, weight in zip(tokens, weights):
+        span = weight * scale
+        words.append((cursor, cursor + span, token))
+        cursor += span
+    return words
+
+
+def _weight(text: str) -> int:
+    return sum(len(token) + (3 if SENTENCE_END.search(token) else 1) for token in text.split())
+
+
+def match_sentences(script: str, spoken: str) -> Optional[List[Tuple[str, int, int]]]:
+    """원문 문장 → 낭독 텍스트 안의 (원문 문장, 시작, 끝) 위치. 길이 조정으로 빠진 문장은 제외
+
+    원문으로 낭독 텍스트를 충분히 설명할 수 없으면 None
+    """
+    matches, cursor = [], 0
+    for sentence in DISPLAY_SPLIT.split(TTSNormalizer.display(script)):
+        spoken_form = TTSNormalizer.normalize(sentence).rstrip(' ,')
+        if not spoken_form:
+            continue
+        position = spoken.find(spoken_form, cursor)
+        if position < 0:
+            continue
+        matches.append((sentence.strip(), position, position + len(spoken_form)))
+        cursor = position + len(spoken_form)
+    covered = sum(end - start for _, start, end in matches)
+    if not matches or covered < len(spoken.strip()) * MIN_MATCH_RATIO:
+        return None
+    return matches
+
+
+def display_words(script: str, spoken: str, duration: float, alignment: Optional[dict] = None) -> List[Word]:
+    """낭독 텍스트 기준으로 문장 시간을 정하고, 화면에는 원문 문장(숫자/기호 그대로)을 표시
+
+    문장 구간: 타임스탬프가 낭독 텍스트와 일치하면 그 시간, 아니면 낭독 형태(읽는 글자 수) 비례.
+    문장 안의 원문 단어는 구간을 글자 수 비례로 나눔
+    """
+    matches = match_sentences(script, spoken)
+    if matches is None:
+        logger.warning("원문 문장을 낭독 텍스트와 대응시킬 수 없어 낭독 텍스트로 자막 생성")
+        if alignment and ''.join(alignment['characters']) == spoken:
+            return words_from_alignment(alignment)
+        return estimate_words(spoken, duration)
+
+    if alignment and ''.join(alignment['characters']) == spoken:
+        starts = alignment['character_start_times_seconds']
+        ends = alignment['character_end_times_seconds']
+        spans = [(starts[start], ends[end - 1]) for _, start, end in matches]
+    else:
+        weights = [_weight(spoken[start:end]) for _, start, end in matches]
+        scale = duration / max(1, sum(weights))
+        spans, cursor = [], 0.0
+        for weight in weights:
+            spans.append((cursor, cursor + weight * scale))
+            cursor += weight * scale
+
+    words = []
+    for (sentence, _, _), (start, end) in zip(matches, spans):
+        words.extend((start + s, start + e, word) for s, e, word in estimate_words(sentence, end - start))
+    return words
+
+
+def build_cues(words: List[Word], max_chars: int = 16) -> List[Cue]:
+    """문장 끝 또는 max_chars 기준으로 자막 단위 구성"""
+    cues, current, length = [], [], 0
+    for word in words:
+        if current and length + len(word[2]) > max_chars:
+            cues.append(Cue(current))
+            current, length = [], 0
+        current.append(word)
+        length += len(word[2]) + 1
+        if SENTENCE_END.search(word[2]):
+            cues.append(Cue(current))
+            current, length = [], 0
+    if current:
+        cues.append(Cue(current))
+
+    # 짧은 공백은 다음 자막 시작까지 이어서 깜빡임 방지
+    for cue, following in zip(cues, cues[1:]):
+        if 0 < following.start - cue.end < 0.3:
+            cue.end = following.start
+    return cues
+
+
+def _srt_time(seconds: float) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def _ass_time(seconds: float) -> str:
+    centis = int(round(seconds * 100))
+    hours, centis = divmod(centis, 360000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def _ass_escape(text: str) -> str:
+    return text.replace("\\", "＼").replace("{", "(").replace("}", ")")
+
+
+def to_srt(cues: List[Cue]) -> str:
+    blocks = []
+    for idx, cue in enumerate(cues, 1):
+        blocks.append(f"{idx}\n{_srt_time(cue.start)} --> {_srt_time(cue.end)}\n{cue.text}\n")
+    return "\n".join(blocks)
+
+
+# secure_main 썸네일과 같은 기준: 윈도우는 맑은 고딕, 그 외는 나눔고딕
+DEFAULT_FONT = "Malgun Gothic" if os.name == 'nt' else "NanumGothic"
+
+
+def to_ass(cues: List[Cue], width: int = 1080, height: int = 1920, font: str = DEFAULT_FONT,
+           karaoke: bool = False) -> str:
+    lines = [ASS_HEADER.format(width=width, height=height, font=font,
+                               font_size=int(height / 26), margin_v=int(height / 6)).rstrip("\n")]
+    for cue in cues:
+        if karaoke:
+            # 단어 타임스탬프가 있으면 읽는 위치를 \kf 로 강조
+            parts = []
+            for start, end, word in cue.words:
+                parts.append(f"{{\\kf{max(1, int(round((end - start) * 100)))}}}{_ass_escape(word)}")
+            text = " ".join(parts)
+        else:
+            text = _ass_escape(cue.text)
+        lines.append(f"Dialogue: 0,{_ass_time(cue.start)},{_ass_time(cue.end)},Default,,0,0,0,,{text}")
+    return "\n".join(lines) + "\n"
+
+
+def write_captions(text: str, audio_path: str, output_path: str, width: int = 1080,
+                   height: int = 1920, max_chars: int = 16, spoken: Optional[str] = None) -> str:
+    """TTS 결과에서 자막 생성. ASS(번인용)와 SRT(업로드용)를 함께 저장하고 ASS 경로 반환
+
+    text: 원래 스크립트(화면 표시용), spoken: 실제로 합성한 텍스트 (없으면 오디오 옆 사이드카, 그것도 없으면 text 를 정규화)
+    """
+    spoken = spoken or load_spoken_text(audio_path) or TTSNormalizer.normalize(text)
+    alignment = load_alignment(audio_path)
+    words = display_words(text, spoken, probe_duration(audio_path), alignment)
+    if alignment:
+        logger.info(f"TTS 타임스탬프 기반 자막 생성 ({len(words)}단어)")
+    else:
+        logger.info(f"오디오 길이 기반 자막 시간 추정 ({len(words)}단어)")
+
+    cues = build_cues(words, max_chars=max_chars)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(to_ass(cues, width, height, karaoke=alignment is not None))
+    with open(os.path.splitext(output_path)[0] + ".srt", 'w', encoding='utf-8') as f:
+        f.write(to_srt(cues))
+    return output_path
+
+
+def ass_filter(path: str, fonts_dir: str = ".") -> str:
+    """ffmpeg ass 필터 문자열 (경로의 특수문자 이스케이프)"""
+    def escape(value: str) -> str:
+        return value.replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+    return f"ass=filename='{escape(path)}':fontsdir='{escape(fonts_dir)}'"
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import shutil
+    import tempfile
+    from ffmpeg_utils import run_ffmpeg
+    from logging_setup import setup_logging
+    setup_logging()
+
+    # 사용법: python captions.py [길이(초)] — 자막 번인 유무에 따른 렌더링 비용 비교
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    bench_dir = tempfile.mkdtemp(prefix="caption_bench_")
+    audio_path = os.path.join(bench_dir, "tone.m4a")
+    run_ffmpeg(["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}", "-c:a", "aac", audio_path])
+    sample = "AI가 일자리를 바꾸고 있습니다! 하지만 걱정만 할 필요는 없어요. 새로운 기회도 함께 열리고 있거든요. " * 6
+    ass_path = write_captions(sample, audio_path, os.path.join(bench_dir, "captions.ass"))
+
+    results = {}
+    for name, extra in (("baseline", []), ("captions", ["-vf", ass_filter(ass_path)])):
+        out_path = os.path.join(bench_dir, f"{name}.mp4")
+        started = time.perf_counter()
+        run_ffmpeg(["-loop", "1", "-i", "background.jpg", "-i", audio_path] + extra + [
+            "-c:v", "libx264", "-tune", "stillimage", "-c:a", "aac", "-b:a", "192k",
+            "-pix_fmt", "yuv420p", "-shortest", out_path
+        ])
+        results[name] = time.perf_counter() - started
+        print(f"{name:>9}: {results[name]:6.2f}초")
+
+    print(f"자막 번인 추가 비용: {(results['captions'] / results['baseline'] - 1) * 100:+.1f}%")
+    shutil.rmtree(bench_dir, ignore_errors=True)
@@ -1,6 +1,7 @@
 # 환경 변수(키) 검증 파일
 import os
 from dotenv import load_dotenv
+from key_health import key_health, configured_keys, format_report, HEALTHY
 
 def check_env():
     load_dotenv()
@@ -31,6 +32,16 @@ def check_env():
         if key_count < 5:
             errors.append("❌ OpenAI 키는 최소 5개 이상 필요합니다")
 
+    keys = configured_keys()
+    if keys:
+        # 실제 호출로 키 상태 확인 (TTL 안의 결과는 캐시 사용)
+        results = key_health.check(keys)
+        print("\n🩺 OpenAI 키 점검:")
+        for line in format_report(results):
+            print(line)
+        if not any(r['status'] == HEALTHY for r in results.values()):
+            errors.append("❌ 사용 가능한 OpenAI 키가 없습니다")
+
     if errors:
         print("\n⚠️ 발견된 오류:")
         for error in errors:
@@ -0,0 +1,242 @@
+# encoder_autotune.py
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from ffmpeg_utils import run_ffmpeg, probe_video, is_image
+from upload_ledger import content_hash
+
+try:
+    import resource
+except ImportError:  # Windows: 자식 프로세스 CPU 시간을 얻을 수 없어 경과 시간으로 비교
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# 프로필이 없을 때 쓰는 기존 설정
+DEFAULT_SETTINGS = {'preset': 'veryfast', 'crf': 23, 'fps': 30}
+PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium')
+CRFS = (20, 23, 26, 28)
+FPS_CHOICES = (15, 24, 30)
+
+SSIM_RE = re.compile(r'SSIM .*All:([\d.]+)')
+PSNR_RE = re.compile(r'PSNR .*average:([\d.]+|inf)')
+
+
+def _children_cpu() -> float:
+    """종료된 자식 프로세스의 누적 CPU 시간 (resource 가 없으면 경과 시간 기준 시계)"""
+    if resource is None:
+        return time.perf_counter()
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+# 렌더링마다 템플릿 전체를 다시 읽지 않도록 (경로, 크기, 수정 시각) → 내용 해시를 프로세스 안에서만 기억
+_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def template_digest(source: str) -> str:
+    stat = os.stat(source)
+    marker = (os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+    if marker not in _digests:
+        _digests[marker] = content_hash(source)
+    return _digests[marker]
+
+
+def profile_key(source: str, size: Tuple[int, int]) -> str:
+    """템플릿 영상은 파일 내용 해시별, 정지 이미지는 해상도별로 하나의 프로필
+
+    경로/수정 시각은 키에 넣지 않음 (actions/checkout 이 매 실행 수정 시각을 바꿔 캐시가 맞지 않게 됨)
+    """
+    name = 'image' if is_image(source) else f"{os.path.basename(source)}:{template_digest(source)[:12]}"
+    return f"{name}@{size[0]}x{size[1]}"
+
+
+class EncoderProfileStore:
+    """템플릿/해상도별로 선택된 인코딩 설정 저장소"""
+
+    def __init__(self, profile_file: str = 'static/logs/encoder_profiles.json'):
+        self.profile_file = profile_file
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if os.path.exists(self.profile_file):
+            with open(self.profile_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def get(self, source: str, size: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        try:
+            return self._load().get(profile_key(source, size))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, source: str, size: Tuple[int, int], profile: Dict[str, Any]):
+        profiles = self._load()
+        profiles[profile_key(source, size)] = profile
+        os.makedirs(os.path.dirname(self.profile_file) or '.', exist_ok=True)
+        tmp_path = f"{self.profile_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(profiles, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.profile_file)
+
+    def resolve(self, source: str, size: Optional[Tuple[int, int]] = None, preset: Optional[str] = None,
+                crf: Optional[int] = None, fps: Optional[int] = None) -> Tuple[str, int, int]:
+        """명시한 값 > 캐시된 프로필 > 기본값 순으로 (preset, crf, fps) 결정"""
+        profile: Dict[str, Any] = {}
+        try:
+            if size is None:
+                info = probe_video(source)
+                size = (info['width'], info['height'])
+            profile = self.get(source, size) or {}
+        except Exception as e:
+            logger.warning(f"⚠️ 인코딩 프로필 조회 실패 ({source}): {str(e)}")
+        settings = {**DEFAULT_SETTINGS, **{k: profile[k] for k in DEFAULT_SETTINGS if k in profile}}
+        return (preset or settings['preset'], crf if crf is not None else settings['crf'],
+                fps or settings['fps'])
+
+
+class EncoderAutotuner:
+    """preset/crf/fps 조합을 샘플 구간으로 벤치마크 → 용량/화질 목표를 만족하는 가장 싼(CPU 시간) 설정 선택"""
+
+    def __init__(self, store: EncoderProfileStore, min_ssim: float = 0.97, min_psnr: float = 36.0,
+                 max_mb: Optional[float] = None, sample_seconds: float = 10.0):
+        self.store = store
+        self.min_ssim = min_ssim
+        self.min_psnr = min_psnr
+        # 전체 길이(audio_seconds) 기준 영상 용량 한도
+        self.max_mb = max_mb if max_mb is not None else float(os.getenv('AUTOTUNE_MAX_MB', 50))
+        self.sample_seconds = sample_seconds
+
+    @staticmethod
+    def _input_args(source: str, fps: float, seconds: float) -> List[str]:
+        if is_image(source):
+            return ["-loop", "1", "-framerate", str(fps), "-t", f"{seconds:.3f}", "-i", source]
+        return ["-stream_loop", "-1", "-t", f"{seconds:.3f}", "-i", source]
+
+    def _encode(self, source: str, size: Tuple[int, int], ref_fps: float, seconds: float,
+                preset: str, crf: int, fps: int, output: str) -> float:
+        """샘플 인코딩 후 ffmpeg 자식 프로세스의 CPU 시간(초) 반환 (Windows 는 경과 시간)"""
+        before = _children_cpu()
+        run_ffmpeg(
+            self._input_args(source, ref_fps, seconds)
+            + ["-an", "-vf", f"scale={size[0]}:{size[1]},fps={fps},format=yuv420p",
+               "-c:v", "libx264", "-preset", preset, "-crf", str(crf)]
+            + (["-tune", "stillimage"] if is_image(source) else [])
+            + [output]
+        )
+        return _children_cpu() - before
+
+    def _measure(self, source: str, size: Tuple[int, int], ref_fps: float, seconds: float,
+                 encoded: str) -> Tuple[float, float]:
+        """원본 대비 (SSIM, PSNR). 낮춘 fps 는 원본 fps 로 복제해 비교 → 끊김도 화질 손실로 반영"""
+        scale = f"scale={size[0]}:{size[1]},fps={ref_fps},format=yuv420p,setpts=PTS-STARTPTS"
+        graph = (f"[0:v]{scale}[d];[1:v]{scale}[r];[d]split[d1][d2];[r]split[r1][r2];"
+                 f"[d1][r1]ssim;[d2][r2]psnr")
+        result = run_ffmpeg(["-i", encoded] + self._input_args(source, ref_fps, seconds)
+                            + ["-lavfi", graph, "-f", "null", "-"], quiet=False)
+        ssim, psnr = SSIM_RE.search(result.stderr), PSNR_RE.search(result.stderr)
+        if not ssim or not psnr:
+            raise RuntimeError("ffmpeg ssim/psnr 결과를 읽을 수 없음")
+        return float(ssim.group(1)), float(psnr.group(1))
+
+    def tune(self, source: str, audio_seconds: float = 60.0, size: Optional[Tuple[int, int]] = None,
+             presets: Sequence[str] = PRESETS, crfs: Sequence[int] = CRFS,
+             fps_choices: Sequence[int] = FPS_CHOICES) -> Dict[str, Any]:
+        info = probe_video(source)
+        size = size or (info['width'], info['height'])
+        # 원본보다 높은 fps 는 의미 없음 (정지 이미지는 기존 기본값 기준)
+        ref_fps = info['fps'] or DEFAULT_SETTINGS['fps']
+        fps_choices = sorted({min(fps, round(ref_fps)) for fps in fps_choices})
+        seconds = min(self.sample_seconds, audio_seconds)
+        max_bytes = self.max_mb * 1024 * 1024
+
+        work_dir = tempfile.mkdtemp(prefix="autotune_")
+        results = []
+        try:
+            for fps in fps_choices:
+                for crf in crfs:
+                    for preset in presets:
+                        output = os.path.join(work_dir, f"{preset}_{crf}_{fps}.mp4")
+                        cpu = self._encode(source, size, ref_fps, seconds, preset, crf, fps, output)
+                        ssim, psnr = self._measure(source, size, ref_fps, seconds, output)
+                        # 전체 길이 용량 / CPU 시간은 샘플 길이에 비례한다고 보고 환산
+                        scale = audio_seconds / seconds
+                        result = {
+                            'preset': preset, 'crf': crf, 'fps': fps,
+                            'cpu_seconds': round(cpu * scale, 2),
+                            'est_mb': round(os.path.getsize(output) * scale / 1024 / 1024, 2),
+                            'ssim': round(ssim, 4), 'psnr': round(psnr, 2),
+                        }
+                        result['ok'] = (ssim >= self.min_ssim and psnr >= self.min_psnr
+                                        and os.path.getsize(output) * scale <= max_bytes)
+                        results.append(result)
+                        logger.info(f"⏱️ {preset}/crf{crf}/{fps}fps: CPU {result['cpu_seconds']}초, "
+                                    f"{result['est_mb']}MB, SSIM {result['ssim']}, PSNR {result['psnr']}dB"
+                                    + ("" if result['ok'] else " ✗"))
+                        os.remove(output)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        passing = [r for r in results if r['ok']]
+        if not passing:
+            logger.warning(f"⚠️ 목표(SSIM {self.min_ssim}, PSNR {self.min_psnr}dB, {self.max_mb}MB)를 "
+                           f"만족하는 설정 없음: 기본값 유지")
+            return dict(DEFAULT_SETTINGS, results=results)
+
+        best = min(passing, key=lambda r: (r['cpu_seconds'], r['est_mb']))
+        profile = {k: best[k] for k in ('preset', 'crf', 'fps', 'cpu_seconds', 'est_mb', 'ssim', 'psnr')}
+        profile.update(audio_seconds=audio_seconds, size=list(size), min_ssim=self.min_ssim,
+                       min_psnr=self.min_psnr, max_mb=self.max_mb, tuned_at=datetime.now().isoformat())
+        self.store.put(source, size, profile)
+        logger.info(f"✅ 인코딩 프로필 저장: {profile_key(source, size)} → "
+                    f"{best['preset']}/crf{best['crf']}/{best['fps']}fps")
+        return dict(profile, results=results)
+
+    def ensure(self, source: str, audio_seconds: float = 60.0,
+               size: Optional[Tuple[int, int]] = None, force: bool = False) -> Dict[str, Any]:
+        """캐시된 프로필이 있으면 그대로, 없으면 튜닝"""
+        if size is None:
+            info = probe_video(source)
+            size = (info['width'], info['height'])
+        cached = None if force else self.store.get(source, size)
+        if cached:
+            logger.info(f"📁 캐시된 인코딩 프로필 사용: {profile_key(source, size)}")
+            return cached
+        return self.tune(source, audio_seconds, size)
+
+
+# 인코딩 프로필 저장소 인스턴스
+encoder_profiles = EncoderProfileStore()
+
+if __name__ == "__main__":
+    import sys
+    from logging_setup import setup_logging
+    setup_logging()
+
+    # 사용법: python encoder_autotune.py <템플릿/배경 이미지> [오디오 길이(초)] [가로x세로] [--force]
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+    source = args[0] if args else "shorts_template.mp4"
+    audio_seconds = float(args[1]) if len(args) > 1 else 60.0
+    size = tuple(int(v) for v in args[2].split('x')) if len(args) > 2 else None
+    tuner = EncoderAutotuner(encoder_profiles,
+                             min_ssim=float(os.getenv('AUTOTUNE_MIN_SSIM', 0.97)),
+                             min_psnr=float(os.getenv('AUTOTUNE_MIN_PSNR', 36.0)))
+
+    started = time.perf_counter()
+    profile = tuner.ensure(source, audio_seconds, size, force='--force' in sys.argv)
+    results = profile.get('results', [])
+    # 기존 설정 (원본 fps 가 더 낮으면 원본 fps 로 비교)
+    top_fps = max((r['fps'] for r in results), default=0)
+    baseline = next((r for r in results if r['preset'] == DEFAULT_SETTINGS['preset']
+                     and r['crf'] == DEFAULT_SETTINGS['crf'] and r['fps'] == top_fps), None)
+    print(f"선택: {profile['preset']}/crf{profile['crf']}/{profile['fps']}fps "
+          f"({len(results)}개 조합, {time.perf_counter() - started:.1f}초)")
+    if baseline and profile.get('cpu_seconds'):
+        print(f"기존 설정({DEFAULT_SETTINGS['preset']}/crf{DEFAULT_SETTINGS['crf']}/{top_fps}fps) "
+              f"CPU {baseline['cpu_seconds']}초 → {profile['cpu_seconds']}초, "
+              f"{baseline['est_mb']}MB → {profile['est_mb']}MB")
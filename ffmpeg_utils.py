@@ -0,0 +1,49 @@
+# ffmpeg_utils.py
+import json
+import logging
+import subprocess
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+
+
+def run_ffmpeg(args: List[str], quiet: bool = True) -> subprocess.CompletedProcess:
+    """ffmpeg 실행. 실패 시 stderr 마지막 부분을 포함해 예외 발생"""
+    cmd = ["ffmpeg", "-y", "-hide_banner"]
+    if quiet:
+        cmd += ["-loglevel", "error"]
+    cmd += args
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        logger.error(f"ffmpeg 실패: {' '.join(cmd)}\n{result.stderr[-2000:]}")
+        raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+    return result
+
+
+def probe(path: str) -> dict:
+    """ffprobe 로 포맷/스트림 정보 조회"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def probe_duration(path: str) -> float:
+    """미디어 길이(초)"""
+    return float(probe(path)['format']['duration'])
+
+
+def is_image(path: str) -> bool:
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def probe_video(path: str) -> dict:
+    """첫 번째 영상 스트림의 크기/프레임 레이트 (이미지는 fps 0)"""
+    stream = next(s for s in probe(path)['streams'] if s.get('codec_type') == 'video')
+    num, _, den = stream.get('avg_frame_rate', '0/1').partition('/')
+    fps = float(num) / float(den) if float(den or 0) else 0.0
+    return {'width': int(stream['width']), 'height': int(stream['height']),
+            'fps': 0.0 if is_image(path) else fps}
@@ -0,0 +1,423 @@
+# job_queue.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(RuntimeError):
+    """가시성 타임아웃이 지나 다른 워커가 작업을 가져감 (결과를 반영하면 안 됨)"""
+
+
+@dataclass
+class Job:
+    id: str
+    stage: str
+    payload: Dict[str, Any]
+    attempts: int
+    lease_token: str
+    priority: int = 0
+
+
+# ========================
+# 큐 인터페이스
+# ========================
+class JobQueue:
+    """단계별 영상 작업 큐. lease 한 작업은 가시성 타임아웃 안에 heartbeat/complete/fail 해야 함"""
+
+    def enqueue(self, stage: str, payload: Dict[str, Any], priority: int = 0,
+                job_id: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    def lease(self, worker_id: str, stages: Optional[Sequence[str]] = None,
+              visibility_timeout: float = 300) -> Optional[Job]:
+        raise NotImplementedError
+
+    def heartbeat(self, job: Job, visibility_timeout: float = 300) -> bool:
+        raise NotImplementedError
+
+    def complete(self, job: Job, next_stage: Optional[str] = None,
+                 payload: Optional[Dict[str, Any]] = None):
+        """현재 단계 완료. next_stage 가 있으면 같은 작업을 다음 단계로 넘김"""
+        raise NotImplementedError
+
+    def fail(self, job: Job, error: str, retry_delay: Optional[float] = None) -> bool:
+        """retry_delay 가 None 이거나 시도 횟수를 다 쓰면 dead 처리. 다시 대기열에 넣었으면 True"""
+        raise NotImplementedError
+
+    def release(self, job: Job, available_at: float):
+        """시도 횟수를 소모하지 않고 available_at 까지 미룸 (쿼터 대기 등)"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+
+class SQLiteJobQueue(JobQueue):
+    """SQLite 기반 큐. 같은 호스트의 여러 프로세스 전용 (WAL 은 공유 메모리를 쓰므로 네트워크 파일 시스템 불가)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            stage TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL,
+            lease_token TEXT,
+            leased_by TEXT,
+            lease_expires REAL,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at, priority);
+    """
+
+    def __init__(self, path: str = 'static/queue/jobs.db', max_attempts: int = 5):
+        self.path = path
+        self.max_attempts = max_attempts
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # 호출마다 연결 → 하트비트 스레드와 작업 스레드가 연결을 공유하지 않음
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, stage: str, payload: Dict[str, Any], priority: int = 0,
+                job_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, stage, payload, priority, status, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, 'ready', ?, ?, ?)",
+                (job_id, stage, json.dumps(payload, ensure_ascii=False), priority, now, now, now)
+            )
+        return job_id
+
+    def lease(self, worker_id: str, stages: Optional[Sequence[str]] = None,
+              visibility_timeout: float = 300) -> Optional[Job]:
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE: 쓰기 잠금을 먼저 잡아 두 워커가 같은 작업을 가져가지 않게 함
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            stage_filter = f" AND stage IN ({','.join('?' * len(stages))})" if stages else ""
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE ((status = 'ready' AND available_at <= ?)"
+                    " OR (status = 'leased' AND lease_expires < ?))" + stage_filter +
+                    " ORDER BY priority DESC, created_at LIMIT 1",
+                    (now, now, *(stages or ()))
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                if row['attempts'] >= self.max_attempts:
+                    # 타임아웃으로 반복 회수된 작업 (워커가 계속 죽는 경우)
+                    conn.execute("UPDATE jobs SET status = 'dead', lease_token = NULL, updated_at = ?,"
+                                 " last_error = COALESCE(last_error, '가시성 타임아웃 반복') WHERE id = ?",
+                                 (now, row['id']))
+                    logger.error(f"💀 작업 {row['id']} ({row['stage']}) 최대 시도 초과")
+                    continue
+                if row['status'] == 'leased':
+                    logger.warning(f"⏱️ 작업 {row['id']} 임대 만료 ({row['leased_by']}) → {worker_id} 가 회수")
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE jobs SET status = 'leased', lease_token = ?, leased_by = ?, lease_expires = ?,"
+                    " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (token, worker_id, now + visibility_timeout, now, row['id'])
+                )
+                conn.execute("COMMIT")
+                return Job(row['id'], row['stage'], json.loads(row['payload']), row['attempts'] + 1,
+                           token, row['priority'])
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update_leased(self, job: Job, sql: str, params: tuple) -> int:
+        with self._connection() as conn:
+            cursor = conn.execute(sql + " WHERE id = ? AND lease_token = ?", (*params, job.id, job.lease_token))
+            return cursor.rowcount
+
+    def heartbeat(self, job: Job, visibility_timeout: float = 300) -> bool:
+        now = time.time()
+        return self._update_leased(job, "UPDATE jobs SET lease_expires = ?, updated_at = ?",
+                                   (now + visibility_timeout, now)) == 1
+
+    def complete(self, job: Job, next_stage: Optional[str] = None,
+                 payload: Optional[Dict[str, Any]] = None):
+        now = time.time()
+        payload = job.payload if payload is None else payload
+        if next_stage:
+            updated = self._update_leased(
+                job, "UPDATE jobs SET stage = ?, payload = ?, status = 'ready', attempts = 0, available_at = ?,"
+                     " lease_token = NULL, leased_by = NULL, lease_expires = NULL, last_error = NULL, updated_at = ?",
+                (next_stage, json.dumps(payload, ensure_ascii=False), now, now))
+        else:
+            updated = self._update_leased(
+                job, "UPDATE jobs SET payload = ?, status = 'done', lease_token = NULL, lease_expires = NULL,"
+                     " updated_at = ?",
+                (json.dumps(payload, ensure_ascii=False), now))
+        if not updated:
+            raise LeaseLost(f"작업 {job.id} 임대 만료 (다른 워커가 처리 중)")
+
+    def fail(self, job: Job, error: str, retry_delay: Optional[float] = None) -> bool:
+        now = time.time()
+        if retry_delay is None or job.attempts >= self.max_attempts:
+            self._update_leased(job, "UPDATE jobs SET status = 'dead', last_error = ?, lease_token = NULL,"
+                                     " lease_expires = NULL, updated_at = ?", (error, now))
+            logger.error(f"💀 작업 {job.id} ({job.stage}) 중단: {error}")
+            return False
+        self._update_leased(job, "UPDATE jobs SET status = 'ready', last_error = ?, available_at = ?,"
+                                 " lease_token = NULL, lease_expires = NULL, updated_at = ?",
+                            (error, now + retry_delay, now))
+        return True
+
+    def release(self, job: Job, available_at: float):
+        self._update_leased(job, "UPDATE jobs SET status = 'ready', attempts = attempts - 1, available_at = ?,"
+                                 " lease_token = NULL, lease_expires = NULL, updated_at = ?",
+                            (available_at, time.time()))
+
+    def stats(self) -> Dict[str, int]:
+        with self._connection() as conn:
+            rows = conn.execute("SELECT stage, status, COUNT(*) AS n FROM jobs GROUP BY stage, status").fetchall()
+        return {f"{row['stage']}/{row['status']}": row['n'] for row in rows}
+
+    def dead_jobs(self) -> List[Dict[str, Any]]:
+        with self._connection() as conn:
+            rows = conn.execute("SELECT id, stage, attempts, last_error FROM jobs WHERE status = 'dead'").fetchall()
+        return [dict(row) for row in rows]
+
+
+class FileJobQueue(JobQueue):
+    """디렉터리 기반 큐. 임대는 원자적 rename 으로만 잡으므로 NFS 등 공유 볼륨에서 여러 호스트가 사용 가능
+
+    ready/<id>.json → leased/<id>.<token>.json (파일 수정 시각 = 임대 만료 시각) → ready/done/dead
+    """
+
+    STATES = ('ready', 'leased', 'done', 'dead', 'tmp')
+    # 상태 전환 도중 워커가 죽어 tmp/ 에 남은 작업을 ready 로 되돌리기까지의 유예
+    ORPHAN_GRACE = 600
+
+    def __init__(self, path: str = 'static/queue/jobs', max_attempts: int = 5):
+        self.path = path
+        self.max_attempts = max_attempts
+        for state in self.STATES:
+            os.makedirs(os.path.join(path, state), exist_ok=True)
+
+    def _file(self, state: str, job_id: str, token: Optional[str] = None) -> str:
+        return os.path.join(self.path, state, f"{job_id}.{token}.json" if token else f"{job_id}.json")
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # 다른 워커가 먼저 옮겼거나 쓰는 중
+            return None
+
+    def _write(self, data: Dict[str, Any], path: str, mtime: Optional[float] = None):
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        if mtime is not None:
+            os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, path)
+
+    def _entries(self, state: str):
+        """(경로, 작업 id, 토큰) 목록 (쓰는 중인 .tmp 파일 제외)"""
+        directory = os.path.join(self.path, state)
+        for name in os.listdir(directory):
+            if not name.endswith('.json'):
+                continue
+            job_id, _, token = name[:-len('.json')].partition('.')
+            yield os.path.join(directory, name), job_id, token or None
+
+    @staticmethod
+    def _claim(path: str, target: str, expires: float) -> bool:
+        """만료 시각을 먼저 적고 rename (rename 에 성공한 워커 하나만 임대를 가짐)"""
+        try:
+            os.utime(path, (expires, expires))
+            os.rename(path, target)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _exists(self, job_id: str, states: Sequence[str]) -> bool:
+        return any(entry_id == job_id for state in states for _, entry_id, _ in self._entries(state))
+
+    def enqueue(self, stage: str, payload: Dict[str, Any], priority: int = 0,
+                job_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex[:12]
+        # 이미 있는 작업은 다시 넣지 않음 (SQLite 백엔드의 INSERT OR IGNORE 와 같음)
+        if self._exists(job_id, self.STATES):
+            return job_id
+        now = time.time()
+        self._write({'id': job_id, 'stage': stage, 'payload': payload, 'priority': priority, 'attempts': 0,
+                     'available_at': now, 'leased_by': None, 'last_error': None, 'created_at': now},
+                    self._file('ready', job_id))
+        return job_id
+
+    def _recover_orphans(self, now: float):
+        for path, job_id, _ in self._entries('tmp'):
+            try:
+                if os.path.getmtime(path) >= now - self.ORPHAN_GRACE:
+                    continue
+                # 다음 상태 파일까지 쓰고 죽었으면 tmp 만 정리
+                if self._exists(job_id, ('ready', 'leased', 'done', 'dead')):
+                    os.remove(path)
+                    continue
+                os.rename(path, self._file('ready', job_id))
+                logger.warning(f"♻️ 작업 {job_id} 상태 전환 중 중단됨 → ready 로 복구")
+            except FileNotFoundError:
+                continue
+
+    def _candidates(self, now: float, stages: Optional[Sequence[str]]):
+        candidates = []
+        for state in ('ready', 'leased'):
+            for path, job_id, token in self._entries(state):
+                try:
+                    expires = os.path.getmtime(path)
+                except FileNotFoundError:
+                    continue
+                if state == 'leased' and expires >= now:
+                    continue
+                data = self._read(path)
+                if data is None or (stages and data['stage'] not in stages):
+                    continue
+                if state == 'ready' and data['available_at'] > now:
+                    continue
+                candidates.append((-data['priority'], data['created_at'], path, state, data))
+        return sorted(candidates, key=lambda item: item[:2])
+
+    def lease(self, worker_id: str, stages: Optional[Sequence[str]] = None,
+              visibility_timeout: float = 300) -> Optional[Job]:
+        now = time.time()
+        self._recover_orphans(now)
+        for _, _, path, state, data in self._candidates(now, stages):
+            token = uuid.uuid4().hex
+            target = self._file('leased', data['id'], token)
+            expires = now + visibility_timeout
+            if not self._claim(path, target, expires):
+                continue
+            data = self._read(target) or data
+            if data['attempts'] >= self.max_attempts:
+                # 타임아웃으로 반복 회수된 작업 (워커가 계속 죽는 경우)
+                data.update(last_error=data.get('last_error') or '가시성 타임아웃 반복')
+                self._write(data, self._file('dead', data['id']))
+                os.remove(target)
+                logger.error(f"💀 작업 {data['id']} ({data['stage']}) 최대 시도 초과")
+                continue
+            if state == 'leased':
+                logger.warning(f"⏱️ 작업 {data['id']} 임대 만료 ({data['leased_by']}) → {worker_id} 가 회수")
+            data.update(attempts=data['attempts'] + 1, leased_by=worker_id)
+            self._write(data, target, mtime=expires)
+            return Job(data['id'], data['stage'], data['payload'], data['attempts'], token, data['priority'])
+        return None
+
+    def _take(self, job: Job) -> Optional[Dict[str, Any]]:
+        """임대 파일을 tmp/ 로 옮겨 전환을 시작 (임대를 잃었으면 None)"""
+        path = self._file('tmp', job.id, job.lease_token)
+        try:
+            os.rename(self._file('leased', job.id, job.lease_token), path)
+        except FileNotFoundError:
+            return None
+        return self._read(path)
+
+    def _finish(self, job: Job, data: Dict[str, Any], state: str):
+        self._write(data, self._file(state, job.id))
+        os.remove(self._file('tmp', job.id, job.lease_token))
+
+    def heartbeat(self, job: Job, visibility_timeout: float = 300) -> bool:
+        expires = time.time() + visibility_timeout
+        try:
+            os.utime(self._file('leased', job.id, job.lease_token), (expires, expires))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, job: Job, next_stage: Optional[str] = None,
+                 payload: Optional[Dict[str, Any]] = None):
+        data = self._take(job)
+        if data is None:
+            raise LeaseLost(f"작업 {job.id} 임대 만료 (다른 워커가 처리 중)")
+        data.update(payload=job.payload if payload is None else payload, leased_by=None)
+        if next_stage:
+            data.update(stage=next_stage, attempts=0, available_at=time.time(), last_error=None)
+        self._finish(job, data, 'ready' if next_stage else 'done')
+
+    def fail(self, job: Job, error: str, retry_delay: Optional[float] = None) -> bool:
+        data = self._take(job)
+        if data is None:
+            return False
+        data.update(last_error=error, leased_by=None)
+        if retry_delay is None or job.attempts >= self.max_attempts:
+            self._finish(job, data, 'dead')
+            logger.error(f"💀 작업 {job.id} ({job.stage}) 중단: {error}")
+            return False
+        data.update(available_at=time.time() + retry_delay)
+        self._finish(job, data, 'ready')
+        return True
+
+    def release(self, job: Job, available_at: float):
+        data = self._take(job)
+        if data is None:
+            return
+        data.update(attempts=data['attempts'] - 1, available_at=available_at, leased_by=None)
+        self._finish(job, data, 'ready')
+
+    def stats(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for state in ('ready', 'leased', 'done', 'dead'):
+            for path, _, _ in self._entries(state):
+                data = self._read(path)
+                if data is not None:
+                    key = f"{data['stage']}/{state}"
+                    counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def dead_jobs(self) -> List[Dict[str, Any]]:
+        jobs = (self._read(path) for path, _, _ in self._entries('dead'))
+        return [{key: job[key] for key in ('id', 'stage', 'attempts', 'last_error')} for job in jobs if job]
+
+
+BACKENDS = {
+    'sqlite': SQLiteJobQueue,
+    'fs': FileJobQueue,
+}
+
+
+def open_queue(url: Optional[str] = None) -> JobQueue:
+    """JOB_QUEUE 환경 변수 형식: <backend>://<위치> (예: sqlite://static/queue/jobs.db, fs:///mnt/shared/queue)"""
+    url = url or os.getenv('JOB_QUEUE', 'sqlite://static/queue/jobs.db')
+    backend, _, location = url.partition('://')
+    if backend not in BACKENDS:
+        raise ValueError(f"지원하지 않는 큐 백엔드: {backend}")
+    return BACKENDS[backend](location) if location else BACKENDS[backend]()
@@ -0,0 +1,186 @@
+# key_health.py
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 상태: valid(사용 가능), exhausted(잔액/쿼터 소진), revoked(폐기/권한 없음), error(네트워크 등 판정 불가)
+HEALTHY = 'valid'
+UNHEALTHY = ('exhausted', 'revoked')
+PROBE_MODEL = os.getenv('KEY_PROBE_MODEL', 'gpt-3.5-turbo')
+
+
+def key_id(key: str) -> str:
+    """캐시/로그용 키 식별자 (원래 키는 저장하지 않음)"""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def configured_keys() -> List[str]:
+    """OPENAI_KEYS(쉼표) + OPENAI_API_KEYS(세미콜론)에 설정된 키 (중복 제거, 순서 유지)"""
+    keys = [k.strip() for k in os.getenv('OPENAI_KEYS', '').split(',') if k.strip()]
+    keys += [k.strip() for k in os.getenv('OPENAI_API_KEYS', '').split(';') if k.strip()]
+    return list(dict.fromkeys(keys))
+
+
+def classify_error(error: Exception) -> str:
+    """OpenAI SDK 예외 → 상태. 429 라도 insufficient_quota 가 아니면 키 자체는 정상(속도 제한)"""
+    status = getattr(error, 'status_code', None)
+    code = str(getattr(error, 'code', '') or '') + str(error)
+    if status in (401, 403):
+        return 'revoked'
+    if status == 429:
+        return 'exhausted' if 'insufficient_quota' in code else HEALTHY
+    if status == 402:
+        return 'exhausted'
+    return 'error'
+
+
+def openai_probe(key: str, timeout: float) -> None:
+    """max_tokens=1 완성 요청 (잔액 소진은 models.list 로는 드러나지 않아 완성 요청으로 확인)"""
+    import openai
+    client = openai.OpenAI(api_key=key, timeout=timeout, max_retries=0)
+    client.chat.completions.create(
+        model=PROBE_MODEL,
+        messages=[{"role": "user", "content": "ping"}],
+        max_tokens=1
+    )
+
+
+class KeyHealthChecker:
+    """시작 시 모든 키를 동시에 점검하고 결과를 TTL 동안 디스크에 캐시 → 정상 키만 지연 시간 순으로 사용"""
+
+    def __init__(self, cache_file: str = 'static/logs/key_health.json', ttl_hours: Optional[float] = None,
+                 timeout: Optional[float] = None, max_workers: int = 8,
+                 prober: Callable[[str, float], Any] = openai_probe):
+        self.cache_file = cache_file
+        # 워크플로우 실행 간격(6시간 cron + 시작 지연)보다 넉넉히 길게: 다음 실행에서 캐시가 만료되지 않도록
+        # (실행 중 인증/잔액 오류가 난 키는 invalidate 로 즉시 다시 점검 대상)
+        self.ttl = (ttl_hours or float(os.getenv('KEY_HEALTH_TTL_HOURS', 12))) * 3600
+        self.timeout = timeout or float(os.getenv('KEY_PROBE_TIMEOUT', 5))
+        self.max_workers = max_workers
+        self.prober = prober
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except ValueError:
+                logger.warning(f"⚠️ 키 점검 캐시 손상: {self.cache_file} 무시")
+        return {}
+
+    def _save(self, cache: Dict[str, Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, self.cache_file)
+
+    # ========================
+    # 점검
+    # ========================
+    def probe(self, key: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            self.prober(key, self.timeout)
+            status, detail = HEALTHY, ''
+        except Exception as e:
+            status, detail = classify_error(e), f"{type(e).__name__}: {str(e)[:120]}"
+        result = {'status': status, 'latency': round(time.perf_counter() - started, 3), 'checked_at': time.time()}
+        if detail:
+            result['detail'] = detail
+        return result
+
+    def check(self, keys: Sequence[str], force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """키별 점검 결과. TTL 안의 캐시는 그대로 쓰고 나머지만 동시에 점검"""
+        now = time.time()
+        with self._lock:
+            cache = {k: v for k, v in self._load().items() if now - v.get('checked_at', 0) <= self.ttl}
+            results = {key: cache[key_id(key)] for key in keys if not force and key_id(key) in cache}
+            stale = [key for key in dict.fromkeys(keys) if key not in results]
+            if stale:
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(stale)),
+                                        thread_name_prefix='key-probe') as pool:
+                    for key, result in zip(stale, pool.map(self.probe, stale)):
+                        results[key] = result
+                        # 판정 불가(네트워크 오류)는 캐시하지 않고 다음 실행에서 다시 점검
+                        if result['status'] != 'error':
+                            cache[key_id(key)] = result
+                self._save(cache)
+                logger.info(f"🩺 OpenAI 키 {len(stale)}개 점검 ({time.perf_counter() - started:.2f}초), "
+                            f"캐시 사용 {len(keys) - len(stale)}개")
+        return results
+
+    def healthy(self, keys: Sequence[str], force: bool = False) -> List[str]:
+        """정상 키를 지연 시간 순으로. 판정 불가 키는 정상 키 뒤에 붙임 (일시적 오류일 수 있음)"""
+        results = self.check(keys, force)
+        for key in keys:
+            if results[key]['status'] in UNHEALTHY:
+                logger.warning(f"⚠️ OpenAI 키 {key_id(key)[:8]} 제외: {results[key]['status']}")
+        ordered = sorted((k for k in dict.fromkeys(keys) if results[k]['status'] not in UNHEALTHY),
+                         key=lambda k: (results[k]['status'] != HEALTHY, results[k]['latency']))
+        return ordered
+
+    def invalidate(self, key: str):
+        """실행 중 인증/잔액 오류가 난 키의 캐시 삭제 → 다음 실행에서 다시 점검"""
+        with self._lock:
+            cache = self._load()
+            if cache.pop(key_id(key), None) is not None:
+                self._save(cache)
+
+
+def format_report(results: Dict[str, Dict[str, Any]]) -> List[str]:
+    """check_env / test_keys 출력용 (키 대신 식별자만 표시)"""
+    icons = {HEALTHY: '✅', 'exhausted': '💸', 'revoked': '⛔', 'error': '❓'}
+    return [f"{icons.get(r['status'], '❓')} {key_id(key)[:8]}: {r['status']} ({r['latency'] * 1000:.0f}ms)"
+            + (f" - {r['detail']}" if r.get('detail') else '')
+            for key, r in sorted(results.items(), key=lambda item: item[1]['latency'])]
+
+
+# 키 점검 인스턴스
+key_health = KeyHealthChecker()
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    # 벤치마크: 가상의 키 20개(지연 0.2~1.5초, 일부 폐기/소진)를 순차 vs 동시 점검, 두 번째 실행은 캐시
+    class FakeAPIError(Exception):
+        def __init__(self, status_code, code=''):
+            super().__init__(code)
+            self.status_code, self.code = status_code, code
+
+    rng = random.Random(0)
+    latencies = {f"sk-bench-{i}": rng.uniform(0.2, 1.5) for i in range(20)}
+    failures = {'sk-bench-3': FakeAPIError(401), 'sk-bench-7': FakeAPIError(429, 'insufficient_quota')}
+
+    def fake_probe(key, timeout):
+        time.sleep(min(latencies[key], timeout))
+        if key in failures:
+            raise failures[key]
+
+    cache_file = os.path.join(tempfile.mkdtemp(prefix="key_health_bench_"), "key_health.json")
+    keys = list(latencies)
+    started = time.perf_counter()
+    sequential = [KeyHealthChecker(cache_file, prober=fake_probe).probe(key) for key in keys]
+    sequential_seconds = time.perf_counter() - started
+
+    checker = KeyHealthChecker(cache_file, prober=fake_probe, max_workers=20)
+    started = time.perf_counter()
+    ordered = checker.healthy(keys)
+    concurrent_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    cached = checker.healthy(keys)
+    cached_seconds = time.perf_counter() - started
+
+    print(f"순차 {sequential_seconds:.2f}초, 동시 {concurrent_seconds:.2f}초, 캐시 {cached_seconds * 1000:.1f}ms")
+    print(f"정상 키 {len(ordered)}/{len(keys)}개, 캐시 결과 일치: {ordered == cached}, "
+          f"가장 빠른 키 우선: {ordered[0] == min(latencies, key=latencies.get)}")
@@ -0,0 +1,228 @@
+# logging_setup.py
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+# 로그 파일별로 받을 모듈 (logger 이름 접두사). 어디에도 속하지 않으면 app.log
+ROUTES = {
+    'trending.log': ('trending', 'topic_queue'),
+    'script_generation.log': ('secure_generate_script', 'script_batch', 'openai_rotator', 'key_health'),
+    'audio_generation.log': ('secure_generate_audio', 'secure_text_to_audio', 'audio_postprocess', 'tts_budget',
+                             'speech_duration', 'tts_normalizer', 'streaming_pipeline'),
+    'render.log': ('render_pool', 'parallel_render', 'video_generator', 'captions', 'background_generator',
+                   'ffmpeg_utils', 'thumbnail_generator', 'encoder_autotune'),
+    'queue.log': ('job_queue', 'worker', 'quota_scheduler', 'quota_manager'),
+}
+DEFAULT_LOG = 'app.log'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['NonBlockingQueueHandler'] = None
+_lock = threading.Lock()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """호출 스레드에서는 큐에 넣기만 함. 큐가 가득 차면 기다리지 않고 버린 뒤 개수만 기록"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 메시지 병합 + 예외 텍스트만 미리 만들고, 포맷(텍스트/JSON)은 리스너의 핸들러가 결정
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SizeTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """크기(max_bytes) 또는 자정 기준 시간 간격 중 먼저 도달하는 쪽에서 번호 순환"""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval_days: int = 1):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval_days = interval_days
+        # 이전 실행에서 남은 파일이면 그 파일의 마지막 기록 시점 기준으로 다음 순환 시각 계산
+        started = os.path.getmtime(filename) if os.path.exists(filename) else time.time()
+        self.rollover_at = self._next_rollover(started)
+
+    def _next_rollover(self, since: float) -> float:
+        day = datetime.fromtimestamp(since).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (day + timedelta(days=self.interval_days)).timestamp()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at and os.path.exists(self.baseFilename):
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover(time.time())
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 하나의 JSON 객체 (extra 로 넘긴 필드 포함)"""
+
+    RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in self.RESERVED and not key.startswith('_'):
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _RouteFilter(logging.Filter):
+    def __init__(self, prefixes: Sequence[str] = (), exclude: Sequence[str] = ()):
+        super().__init__()
+        self.prefixes = tuple(prefixes)
+        self.exclude = tuple(exclude)
+
+    @staticmethod
+    def _matches(name: str, prefixes: Sequence[str]) -> bool:
+        return any(name == prefix or name.startswith(prefix + '.') for prefix in prefixes)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.prefixes:
+            return self._matches(record.name, self.prefixes)
+        return not self._matches(record.name, self.exclude)
+
+
+def setup_logging(level: Optional[str] = None, log_dir: Optional[str] = None,
+                  json_output: Optional[bool] = None, routes: Optional[Dict[str, Sequence[str]]] = None,
+                  console: bool = True, queue_size: int = 10000) -> NonBlockingQueueHandler:
+    """루트 로거에 큐 핸들러 하나만 연결하고, 파일/콘솔 기록은 백그라운드 리스너 스레드에서 처리 (여러 번 호출해도 한 번만 설정)"""
+    global _listener, _queue_handler
+    with _lock:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+        log_dir = log_dir or os.getenv('LOG_DIR', 'static/logs')
+        if json_output is None:
+            json_output = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+        routes = ROUTES if routes is None else routes
+        max_bytes = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+        backups = int(os.getenv('LOG_BACKUPS', 7))
+        os.makedirs(log_dir, exist_ok=True)
+
+        file_formatter = JsonFormatter() if json_output else logging.Formatter(LOG_FORMAT)
+        handlers = []
+        for filename, prefixes in routes.items():
+            handler = SizeTimeRotatingFileHandler(os.path.join(log_dir, filename), max_bytes, backups)
+            handler.addFilter(_RouteFilter(prefixes))
+            handlers.append(handler)
+        default = SizeTimeRotatingFileHandler(os.path.join(log_dir, DEFAULT_LOG), max_bytes, backups)
+        default.addFilter(_RouteFilter(exclude=[p for prefixes in routes.values() for p in prefixes]))
+        handlers.append(default)
+        if console:
+            stream = logging.StreamHandler(sys.stderr)
+            stream.setFormatter(logging.Formatter(LOG_FORMAT))
+            handlers.append(stream)
+        for handler in handlers:
+            if handler.formatter is None:
+                handler.setFormatter(file_formatter)
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _queue_handler
+
+
+def shutdown_logging():
+    """남은 로그를 모두 기록하고 리스너 종료"""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        if _queue_handler.dropped:
+            sys.stderr.write(f"로그 큐 포화로 {_queue_handler.dropped}건 유실\n")
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    class StallingFileHandler(logging.FileHandler):
+        """디스크 지연 시뮬레이션: stall_every 건마다 stall 초 멈춤"""
+
+        def __init__(self, filename: str, stall_every: int = 500, stall: float = 0.02):
+            super().__init__(filename, encoding='utf-8')
+            self.stall_every, self.stall, self.count = stall_every, stall, 0
+
+        def emit(self, record):
+            self.count += 1
+            if self.count % self.stall_every == 0:
+                time.sleep(self.stall)
+            super().emit(record)
+
+    def measure(logger: logging.Logger, count: int):
+        worst, started = 0.0, time.perf_counter()
+        for idx in range(count):
+            before = time.perf_counter()
+            logger.info("렌더 작업 %d 완료", idx)
+            worst = max(worst, time.perf_counter() - before)
+        return (time.perf_counter() - started) / count, worst
+
+    # 벤치마크: 동기 FileHandler vs 큐 핸들러의 호출 스레드 지연 (디스크가 가끔 멈추는 상황)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    work_dir = tempfile.mkdtemp(prefix="log_bench_")
+    bench = logging.getLogger('bench')
+    bench.setLevel(logging.INFO)
+
+    bench.propagate = False
+    sync_handler = StallingFileHandler(os.path.join(work_dir, "sync.log"))
+    bench.addHandler(sync_handler)
+    sync_mean, sync_worst = measure(bench, count)
+    bench.removeHandler(sync_handler)
+    sync_handler.close()
+
+    bench.propagate = True
+    handler = setup_logging(log_dir=work_dir, console=False, routes={}, queue_size=count + 1)
+    _listener.handlers = (StallingFileHandler(os.path.join(work_dir, "queued.log")),)
+    queued_mean, queued_worst = measure(bench, count)
+    shutdown_logging()
+
+    print(f"동기 FileHandler: 평균 {sync_mean * 1e6:.1f}µs, 최대 {sync_worst * 1000:.1f}ms")
+    print(f"큐 핸들러: 평균 {queued_mean * 1e6:.1f}µs, 최대 {queued_worst * 1000:.1f}ms (유실 {handler.dropped}건)")
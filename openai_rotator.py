@@ -3,19 +3,27 @@ import os
 import logging
 from typing import List
 import time
+from key_health import key_health, configured_keys
+
+logger = logging.getLogger(__name__)
 
 class OpenAIKeyManager:
     def __init__(self):
         self.keys = self._validate_keys()
         self.usage_counter = {key: {'count':0, 'last_used':0} for key in self.keys}
         self.circuit_breaker = {key: {'state':'closed', 'expiry':0} for key in self.keys}
-        logging.info(f"🔑 초기화 완료: {len(self.keys)}개 키 로드")
+        logger.info(f"🔑 초기화 완료: {len(self.keys)}개 키 로드")
 
     def _validate_keys(self) -> List[str]:
-        key_str = os.getenv('OPENAI_API_KEYS', '')
-        if not key_str:
-            raise EnvironmentError("OPENAI_API_KEYS 환경 변수 없음")
-        return [k.strip() for k in key_str.split(';') if k.startswith('sk-')]
+        # 워크플로우는 OPENAI_KEYS(쉼표), 로컬 .env 는 OPENAI_API_KEYS(세미콜론)를 씀
+        keys = [k for k in configured_keys() if k.startswith('sk-')]
+        if not keys:
+            raise EnvironmentError("OPENAI_KEYS / OPENAI_API_KEYS 환경 변수 없음")
+        # 폐기/잔액 소진 키는 제외하고 응답이 빠른 키부터 (get_key 정렬은 안정 정렬이라 동률이면 이 순서 유지)
+        healthy = key_health.healthy(keys)
+        if not healthy:
+            raise EnvironmentError("사용 가능한 OpenAI 키 없음 (모든 키 점검 실패)")
+        return healthy
 
     def get_key(self) -> str:
         now = time.time()
@@ -42,6 +50,8 @@ class OpenAIKeyManager:
             'state': 'open',
             'expiry': time.time() + 300  # 5분 차단
         }
+        # 다음 실행에서 캐시 대신 다시 점검
+        key_health.invalidate(key)
 
 key_rotator = OpenAIKeyManager()
 
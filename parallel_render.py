@@ -0,0 +1,173 @@
+# parallel_render.py
+import os
+import math
+import time
+import shutil
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from ffmpeg_utils import run_ffmpeg, probe_duration, is_image
+from encoder_autotune import encoder_profiles
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FPS = 30
+DEFAULT_GOP_SECONDS = 2.0
+
+
+def plan_segments(duration: float, workers: int, fps: int = DEFAULT_FPS,
+                  gop_seconds: float = DEFAULT_GOP_SECONDS) -> List[Tuple[float, int]]:
+    """타임라인을 GOP 경계에 맞춰 분할. (시작 초, 프레임 수) 목록 반환"""
+    gop_frames = max(1, int(round(gop_seconds * fps)))
+    total_frames = int(math.ceil(duration * fps))
+    total_gops = max(1, math.ceil(total_frames / gop_frames))
+    gops_per_segment = max(1, math.ceil(total_gops / max(1, workers)))
+
+    segments = []
+    frame = 0
+    while frame < total_frames:
+        frames = min(gops_per_segment * gop_frames, total_frames - frame)
+        segments.append((frame / fps, frames))
+        frame += frames
+    return segments
+
+
+def _input_args(source: str, start: float, source_duration: Optional[float], fps: int) -> List[str]:
+    if is_image(source):
+        return ["-loop", "1", "-framerate", str(fps), "-i", source]
+    # 템플릿 영상은 반복 재생하므로 템플릿 길이 기준으로 시작 위치를 접음
+    offset = start % source_duration if source_duration else start
+    return ["-stream_loop", "-1", "-ss", f"{offset:.3f}", "-i", source]
+
+
+def _video_args(fps: int, gop_frames: int, preset: str, crf: int,
+                video_filter: Optional[str], threads: int) -> List[str]:
+    vf = f"fps={fps},format=yuv420p"
+    if video_filter:
+        vf = f"{video_filter},{vf}"
+    return [
+        "-vf", vf,
+        "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+        # 고정 GOP + 장면 전환 키프레임 비활성화 → 세그먼트 경계가 항상 키프레임
+        "-g", str(gop_frames), "-keyint_min", str(gop_frames), "-sc_threshold", "0",
+        "-threads", str(threads),
+    ]
+
+
+def _encode_segment(job: dict) -> str:
+    video_filter = job['video_filter']
+    if job['timed_filter']:
+        # 자막처럼 전체 타임라인 기준 필터는 세그먼트 시작 시각으로 PTS 를 옮겨 적용
+        timed = f"setpts=PTS+{job['start']:.3f}/TB,{job['timed_filter']},setpts=PTS-STARTPTS"
+        video_filter = f"{video_filter},{timed}" if video_filter else timed
+    run_ffmpeg(
+        _input_args(job['source'], job['start'], job['source_duration'], job['fps'])
+        + ["-frames:v", str(job['frames']), "-an"]
+        + _video_args(job['fps'], job['gop_frames'], job['preset'], job['crf'],
+                      video_filter, job['threads'])
+        + [job['output']]
+    )
+    return job['output']
+
+
+def render_parallel(source: str, audio: str, output: str, fps: Optional[int] = None,
+                    preset: Optional[str] = None, crf: Optional[int] = None, video_filter: Optional[str] = None,
+                    workers: Optional[int] = None, gop_seconds: float = DEFAULT_GOP_SECONDS,
+                    max_duration: Optional[float] = None, timed_filter: Optional[str] = None,
+                    size: Optional[Tuple[int, int]] = None) -> str:
+    """세그먼트 병렬 인코딩 후 stream copy 로 이어붙이고 오디오는 마지막에 한 번만 mux"""
+    # 지정하지 않은 값은 템플릿/출력 해상도(size)별 튜닝 프로필 사용 (encoder_autotune.py)
+    preset, crf, fps = encoder_profiles.resolve(source, size, preset, crf, fps)
+    workers = workers or os.cpu_count() or 1
+    duration = probe_duration(audio)
+    if max_duration:
+        duration = min(duration, max_duration)
+    source_duration = None if is_image(source) else probe_duration(source)
+    gop_frames = max(1, int(round(gop_seconds * fps)))
+    segments = plan_segments(duration, workers, fps, gop_seconds)
+    # 코어를 세그먼트 인코더들이 나눠 쓰도록 스레드 수 제한
+    threads = max(1, (os.cpu_count() or 1) // len(segments))
+
+    work_dir = tempfile.mkdtemp(prefix="segments_")
+    try:
+        jobs = [{
+            'source': source, 'source_duration': source_duration, 'start': start,
+            'frames': frames, 'fps': fps, 'gop_frames': gop_frames, 'preset': preset,
+            'crf': crf, 'video_filter': video_filter, 'timed_filter': timed_filter, 'threads': threads,
+            'output': os.path.join(work_dir, f"seg_{idx:04d}.mp4"),
+        } for idx, (start, frames) in enumerate(segments)]
+
+        logger.info(f"🧩 병렬 인코딩: {duration:.1f}초 → {len(jobs)}개 세그먼트 "
+                    f"(워커 {min(workers, len(jobs))}개, {preset}/crf{crf}/{fps}fps)")
+        # 인코딩은 ffmpeg 자식 프로세스가 수행하므로 스레드는 감독만 담당
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            parts = list(pool.map(_encode_segment, jobs))
+
+        concat_list = os.path.join(work_dir, "concat.txt")
+        with open(concat_list, 'w') as f:
+            for part in parts:
+                f.write(f"file '{part}'\n")
+
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", concat_list,
+            "-i", audio,
+            "-map", "0:v", "-map", "1:a",
+            "-c:v", "copy", "-c:a", "aac", "-b:a", "192k",
+            "-t", f"{duration:.3f}",
+            "-movflags", "+faststart",
+            output
+        ])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.info(f"🎬 병렬 렌더링 완료: {output}")
+    return output
+
+
+def render_single(source: str, audio: str, output: str, fps: Optional[int] = None,
+                  preset: Optional[str] = None, crf: Optional[int] = None, video_filter: Optional[str] = None,
+                  gop_seconds: float = DEFAULT_GOP_SECONDS,
+                  max_duration: Optional[float] = None, timed_filter: Optional[str] = None,
+                  size: Optional[Tuple[int, int]] = None) -> str:
+    """비교 기준: 같은 설정으로 단일 libx264 프로세스 인코딩"""
+    preset, crf, fps = encoder_profiles.resolve(source, size, preset, crf, fps)
+    duration = probe_duration(audio)
+    if max_duration:
+        duration = min(duration, max_duration)
+    gop_frames = max(1, int(round(gop_seconds * fps)))
+    source_duration = None if is_image(source) else probe_duration(source)
+    if timed_filter:
+        video_filter = f"{video_filter},{timed_filter}" if video_filter else timed_filter
+    run_ffmpeg(
+        _input_args(source, 0, source_duration, fps)
+        + ["-i", audio, "-map", "0:v", "-map", "1:a", "-t", f"{duration:.3f}"]
+        + _video_args(fps, gop_frames, preset, crf, video_filter, 0)
+        + ["-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart", output]
+    )
+    return output
+
+
+if __name__ == "__main__":
+    import sys
+    from logging_setup import setup_logging
+    setup_logging()
+
+    # 사용법: python parallel_render.py [길이(초)] [배경 이미지/템플릿]
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 480
+    source = sys.argv[2] if len(sys.argv) > 2 else "background.jpg"
+    bench_dir = tempfile.mkdtemp(prefix="render_bench_")
+    audio_path = os.path.join(bench_dir, "tone.m4a")
+    run_ffmpeg(["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}", "-c:a", "aac", audio_path])
+
+    results = {}
+    for name, render in (("single", render_single), ("parallel", render_parallel)):
+        out_path = os.path.join(bench_dir, f"{name}.mp4")
+        started = time.perf_counter()
+        render(source, audio_path, out_path, video_filter="scale=1920:1080", size=(1920, 1080))
+        results[name] = time.perf_counter() - started
+        print(f"{name:>8}: {results[name]:7.2f}초, {os.path.getsize(out_path) / 1e6:.1f}MB, "
+              f"길이 {probe_duration(out_path):.2f}초")
+
+    print(f"CPU {os.cpu_count()}개, 속도 향상: x{results['single'] / results['parallel']:.2f}")
+    shutil.rmtree(bench_dir, ignore_errors=True)
@@ -1,9 +1,11 @@
 import os
 import json
 import time
+import logging
 from datetime import datetime, timedelta
 import openai
-from openai_rotator import key_rotator
+
+logger = logging.getLogger(__name__)
 
 class EnhancedQuotaManager:
     def __init__(self):
@@ -17,17 +19,65 @@ class EnhancedQuotaManager:
         self._check_reset()
 
     def _load_quota_data(self):
-        # [기존 코드 동일] (중략)
+        """저장된 쿼터 데이터 로드 (없거나 손상되면 초기화)"""
+        if os.path.exists(self.quota_file) and os.path.getsize(self.quota_file) > 0:
+            try:
+                with open(self.quota_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                # 이전 형식(월간 집계 없음) 파일도 그대로 사용
+                for service, fields in self._initialize_quota_data().items():
+                    data.setdefault(service, fields)
+                    if isinstance(fields, dict):
+                        for field, value in fields.items():
+                            data[service].setdefault(field, value)
+                return data
+            except (json.JSONDecodeError, AttributeError, TypeError) as e:
+                logger.error(f"쿼터 데이터 손상, 초기화: {str(e)}")
+        return self._initialize_quota_data()
 
     def _initialize_quota_data(self):
-        # [기존 코드 동일] (중략)
+        now = datetime.now()
+        return {
+            'youtube': {'daily_used': 0, 'monthly_used': 0},
+            'openai': {'daily_used': 0, 'monthly_used': 0, 'keys': {}},
+            'elevenlabs': {'daily_used': 0, 'monthly_used': 0},
+            'last_reset': {'daily': now.strftime("%Y-%m-%d"), 'monthly': now.strftime("%Y-%m")}
+        }
+
+    def _save_quota_data(self):
+        os.makedirs(os.path.dirname(self.quota_file), exist_ok=True)
+        tmp_path = f"{self.quota_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.quota_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.quota_file)
 
     def _check_reset(self):
-        # [기존 코드 동일] (중략)
+        """날짜/월이 바뀌었으면 일간/월간 사용량 초기화"""
+        now = datetime.now()
+        today, month = now.strftime("%Y-%m-%d"), now.strftime("%Y-%m")
+        last_reset = self.quota_data['last_reset']
+        changed = False
+
+        if last_reset.get('daily') != today:
+            for service in self.rate_limits:
+                self.quota_data[service]['daily_used'] = 0
+            self.quota_data['openai']['keys'] = {}
+            last_reset['daily'] = today
+            changed = True
+
+        if last_reset.get('monthly') != month:
+            for service in self.rate_limits:
+                self.quota_data[service]['monthly_used'] = 0
+            last_reset['monthly'] = month
+            changed = True
+
+        if changed:
+            self._save_quota_data()
 
     def _sync_with_api(self, service: str):
         """실제 API 사용량과 로컬 데이터 동기화"""
         if service == 'openai':
+            from openai_rotator import key_rotator
             for key in key_rotator.keys:
                 try:
                     client = openai.OpenAI(api_key=key)
@@ -37,10 +87,11 @@ class EnhancedQuotaManager:
                     )
                     self.quota_data['openai']['keys'][key] = usage.daily_usage
                 except Exception as e:
-                    logging.error(f"API 사용량 동기화 실패: {str(e)}")
+                    logger.error(f"API 사용량 동기화 실패: {str(e)}")
 
-    def check_quota(self, service: str, key: str = None) -> bool:
-        """향상된 쿼터 체크 로직"""
+    def check_quota(self, service: str, key: str = None, amount: int = 0) -> bool:
+        """향상된 쿼터 체크 로직 (amount: 이번 요청에 쓸 양. 일간/월간 한도 모두 확인)"""
+        self._check_reset()
         self._sync_with_api(service)
         
         if service == 'youtube':
@@ -52,21 +103,34 @@ class EnhancedQuotaManager:
             return key_usage < self.rate_limits['openai']['daily_per_key']
         
         elif service == 'elevenlabs':
-            return self.quota_data['elevenlabs']['daily_used'] < self.rate_limits['elevenlabs']['daily']
+            return self.remaining('elevenlabs') >= max(amount, 1)
         
         return False
 
+    def remaining(self, service: str) -> int:
+        """남은 일간/월간 한도 중 작은 값"""
+        self._check_reset()
+        limits = self.rate_limits[service]
+        data = self.quota_data[service]
+        left = [limits['monthly'] - data['monthly_used']]
+        if 'daily' in limits:
+            left.append(limits['daily'] - data['daily_used'])
+        return max(0, min(left))
+
     def update_usage(self, service: str, amount: int = 1, key: str = None):
-        """동적 가중치 반영 업데이트"""
-        weight = self._calculate_dynamic_weight(service)
-        adjusted_amount = int(amount * weight)
+        """동적 가중치 반영 업데이트 (ElevenLabs 는 과금 문자 수 그대로 기록)"""
+        self._check_reset()
+        if service == 'elevenlabs':
+            adjusted_amount = amount
+        else:
+            weight = self._calculate_dynamic_weight(service)
+            adjusted_amount = int(amount * weight)
         
-        if service == 'youtube':
-            self.quota_data['youtube']['daily_used'] += adjusted_amount
-        elif service == 'openai' and key:
+        if service == 'openai' and key:
             self.quota_data['openai']['keys'][key] = self.quota_data['openai']['keys'].get(key, 0) + adjusted_amount
-        elif service == 'elevenlabs':
-            self.quota_data['elevenlabs']['daily_used'] += adjusted_amount
+        if service in self.rate_limits:
+            self.quota_data[service]['daily_used'] += adjusted_amount
+            self.quota_data[service]['monthly_used'] += adjusted_amount
         
         self._save_quota_data()
 
@@ -83,7 +147,7 @@ class EnhancedQuotaManager:
     def optimize_schedule(self):
         """쿼터 사용 패턴 기반 자동 스케줄 조정"""
         avg_usage = self._calculate_avg_usage()
-        for service in self.rate_limits:
+        for service in avg_usage:
             if avg_usage[service] > 0.8:
                 self.rate_limits[service]['daily'] = int(
                     self.rate_limits[service]['daily'] * 0.9
@@ -95,6 +159,7 @@ class EnhancedQuotaManager:
             service: (self.quota_data[service]['daily_used'] / 
                      self.rate_limits[service]['daily'])
             for service in self.rate_limits
+            if 'daily' in self.rate_limits[service]
         }
 
 # Singleton 인스턴스 생성
@@ -0,0 +1,167 @@
+# quota_scheduler.py
+import os
+import json
+import uuid
+import shutil
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+from retry_policy import PermanentError
+
+logger = logging.getLogger(__name__)
+
+# 서비스별 쿼터 리셋 기준 시간대 (YouTube Data API 는 태평양 시간 자정에 리셋)
+RESET_TIMEZONES = {
+    'youtube': 'America/Los_Angeles',
+}
+
+
+class QuotaExhausted(PermanentError):
+    """서비스 일일 쿼터 소진. reset_at 이후에 다시 시도해야 함"""
+
+    def __init__(self, service: str, reset_at: datetime):
+        super().__init__(f"{service} 쿼터 소진 (리셋: {reset_at.isoformat()})")
+        self.service = service
+        self.reset_at = reset_at
+
+
+def find_quota_error(exc: Optional[BaseException]) -> Optional[QuotaExhausted]:
+    """예외 체인에서 QuotaExhausted 탐색"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, QuotaExhausted):
+            return exc
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def next_reset(service: str, now: Optional[datetime] = None) -> datetime:
+    """다음 쿼터 리셋 시각 (로컬 시간대, tz-aware)"""
+    tz = ZoneInfo(RESET_TIMEZONES[service]) if service in RESET_TIMEZONES else None
+    now = (now or datetime.now().astimezone()).astimezone(tz)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return midnight.astimezone()
+
+
+class QuotaScheduler:
+    """쿼터가 소진된 서비스의 작업만 백로그에 보관하고, 리셋 후 우선순위대로 처리"""
+
+    def __init__(self, state_file: str = 'static/logs/backlog.json', backlog_dir: str = 'static/backlog'):
+        self.state_file = state_file
+        self.backlog_dir = backlog_dir
+        self.load_state()
+
+    def load_state(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        else:
+            self.state = {}
+        self.state.setdefault('blocked_until', {})
+        self.state.setdefault('jobs', [])
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    # ========================
+    # 서비스 차단 상태
+    # ========================
+    def block(self, service: str, until: Optional[datetime] = None):
+        until = until or next_reset(service)
+        self.state['blocked_until'][service] = until.isoformat()
+        self.save_state()
+        logger.warning(f"⏸️ {service} 차단: {until.isoformat()} 까지 관련 작업 보류")
+
+    def blocked_until(self, service: str) -> Optional[datetime]:
+        value = self.state['blocked_until'].get(service)
+        if not value:
+            return None
+        until = datetime.fromisoformat(value)
+        if until <= datetime.now(until.tzinfo):
+            # 리셋 시각이 지났으면 차단 해제
+            del self.state['blocked_until'][service]
+            self.save_state()
+            return None
+        return until
+
+    def is_blocked(self, service: str) -> bool:
+        return self.blocked_until(service) is not None
+
+    # ========================
+    # 백로그
+    # ========================
+    def park(self, service: str, payload: Dict[str, Any], priority: float = 0,
+             files: Optional[List[str]] = None) -> str:
+        """작업을 백로그에 보관. files 는 백로그 디렉토리로 옮기고 payload 경로를 갱신"""
+        job_id = uuid.uuid4().hex[:12]
+        payload = dict(payload)
+        for key in files or []:
+            src = payload[key]
+            job_dir = os.path.join(self.backlog_dir, job_id)
+            os.makedirs(job_dir, exist_ok=True)
+            dst = os.path.join(job_dir, os.path.basename(src))
+            shutil.move(src, dst)
+            payload[key] = dst
+
+        self.state['jobs'].append({
+            'id': job_id,
+            'service': service,
+            'priority': priority,
+            'created_at': datetime.now().isoformat(),
+            'attempts': 0,
+            'payload': payload,
+        })
+        self.save_state()
+        logger.info(f"📦 {service} 백로그 보관: {job_id} (우선순위 {priority})")
+        return job_id
+
+    def pending(self, service: str) -> List[dict]:
+        """우선순위 내림차순, 같은 우선순위는 먼저 들어온 순"""
+        jobs = [job for job in self.state['jobs'] if job['service'] == service]
+        return sorted(jobs, key=lambda job: (-job['priority'], job['created_at']))
+
+    def _remove(self, job: dict):
+        self.state['jobs'] = [j for j in self.state['jobs'] if j['id'] != job['id']]
+        shutil.rmtree(os.path.join(self.backlog_dir, job['id']), ignore_errors=True)
+        self.save_state()
+
+    def drain(self, service: str, handler: Callable[[Dict[str, Any]], Any],
+              limit: Optional[int] = None, max_attempts: int = 3) -> int:
+        """차단되지 않은 동안 백로그를 우선순위대로 처리하고 처리 건수 반환"""
+        done = 0
+        for job in self.pending(service):
+            if limit is not None and done >= limit:
+                break
+            if self.is_blocked(service):
+                break
+            try:
+                handler(job['payload'])
+            except Exception as e:
+                quota_error = find_quota_error(e)
+                if quota_error:
+                    self.block(service, quota_error.reset_at)
+                    break
+                job['attempts'] += 1
+                logger.error(f"백로그 작업 실패 {job['id']} ({job['attempts']}/{max_attempts}): {str(e)}")
+                if job['attempts'] >= max_attempts:
+                    logger.error(f"백로그 작업 폐기: {job['id']}")
+                    self._remove(job)
+                else:
+                    self.save_state()
+                continue
+            self._remove(job)
+            done += 1
+
+        if done:
+            logger.info(f"✅ {service} 백로그 {done}건 처리 (남은 작업 {len(self.pending(service))}건)")
+        return done
+
+
+# 스케줄러 인스턴스
+quota_scheduler = QuotaScheduler()
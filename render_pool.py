@@ -0,0 +1,257 @@
+# render_pool.py
+import os
+import time
+import queue
+import atexit
+import signal
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: 최대 RSS 는 /proc 로만 측정 (없으면 0), 프로세스 그룹 없이 terminate
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerMemoryExceeded(MemoryError):
+    """렌더 워커가 RSS 한도를 넘어 강제 종료됨"""
+
+
+def _read_rss_kb(pid: int, field: str = 'VmRSS') -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _child_pids(pid: int) -> List[int]:
+    children = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def tree_rss_mb(pid: int) -> float:
+    """워커와 그 자식(ffmpeg 리더 등) 전체 RSS"""
+    total, stack, seen = 0, [pid], set()
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        total += _read_rss_kb(current)
+        stack.extend(_child_pids(current))
+    return total / 1024
+
+
+def _reset_peak_rss():
+    # 리눅스: clear_refs 에 5 를 쓰면 VmHWM(최대 RSS)이 현재 값으로 초기화됨
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    peak_kb = _read_rss_kb(os.getpid(), 'VmHWM')
+    if not peak_kb and resource:
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_kb / 1024
+
+
+def _worker_main(conn):
+    # 자체 프로세스 그룹 → 한도 초과 시 자식 프로세스까지 한 번에 정리
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        func, args, kwargs = message
+        _reset_peak_rss()
+        try:
+            result, error = func(*args, **kwargs), None
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {str(e)}"
+        conn.send((result, error, _peak_rss_mb()))
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self, force: bool = False):
+        if not force and self.process.is_alive():
+            try:
+                self.conn.send(None)
+                self.process.join(timeout=10)
+            except (OSError, EOFError):
+                pass
+        if self.process.is_alive():
+            if hasattr(os, 'killpg'):
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except OSError:
+                    self.process.kill()
+            else:
+                self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class RenderWorkerPool:
+    """재사용 가능한 렌더 워커 프로세스 풀 (RSS 한도, N회 작업 후 재생성, 작업별 최대 메모리 보고)"""
+
+    def __init__(self, size: int = 2, max_jobs_per_worker: int = 4, rss_limit_mb: float = 1536,
+                 poll_interval: float = 0.25):
+        self.size = max(1, size)
+        self.max_jobs_per_worker = max(1, max_jobs_per_worker)
+        self.rss_limit_mb = rss_limit_mb
+        self.poll_interval = poll_interval
+        self.stats = []
+        self._ctx = multiprocessing.get_context('spawn')
+        self._tasks = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._threads:
+                return
+            for slot in range(self.size):
+                thread = threading.Thread(target=self._dispatch, args=(slot,), daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.shutdown)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """func 는 워커에서 import 가능한 모듈 최상위 함수여야 함"""
+        self._ensure_started()
+        future = Future()
+        self._tasks.put((future, func, args, kwargs))
+        return future
+
+    def run(self, func: Callable, *args, **kwargs) -> Any:
+        return self.submit(func, *args, **kwargs).result()
+
+    def _dispatch(self, slot: int):
+        worker: Optional[_Worker] = None
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            future, func, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            if worker is None or not worker.process.is_alive():
+                worker = _Worker(self._ctx)
+
+            started = time.monotonic()
+            sampled_peak = 0.0
+            recycle = False
+            try:
+                worker.conn.send((func, args, kwargs))
+                while not worker.conn.poll(self.poll_interval):
+                    current = tree_rss_mb(worker.process.pid)
+                    sampled_peak = max(sampled_peak, current)
+                    if current > self.rss_limit_mb:
+                        raise WorkerMemoryExceeded(
+                            f"렌더 워커 RSS {current:.0f}MB > 한도 {self.rss_limit_mb:.0f}MB")
+                    if not worker.process.is_alive():
+                        raise RuntimeError(f"렌더 워커 비정상 종료 (exitcode={worker.process.exitcode})")
+                result, error, worker_peak = worker.conn.recv()
+            except Exception as e:
+                worker.stop(force=True)
+                worker = None
+                self._record(func, slot, started, sampled_peak, failed=True)
+                future.set_exception(e)
+                continue
+
+            worker.jobs += 1
+            peak = max(sampled_peak, worker_peak)
+            self._record(func, slot, started, peak, failed=error is not None)
+            if worker.jobs >= self.max_jobs_per_worker or peak > self.rss_limit_mb:
+                recycle = True
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(result)
+            if recycle:
+                logger.info(f"♻️ 렌더 워커 {slot} 재생성 (작업 {worker.jobs}회, 최대 {peak:.0f}MB)")
+                worker.stop()
+                worker = None
+
+        if worker is not None:
+            worker.stop()
+
+    def _record(self, func: Callable, slot: int, started: float, peak_mb: float, failed: bool):
+        entry = {
+            'job': getattr(func, '__name__', str(func)),
+            'worker': slot,
+            'seconds': round(time.monotonic() - started, 2),
+            'peak_rss_mb': round(peak_mb, 1),
+            'failed': failed,
+        }
+        self.stats.append(entry)
+        logger.info(f"🧮 렌더 작업 {entry['job']}: {entry['seconds']}초, 최대 메모리 {entry['peak_rss_mb']}MB"
+                    + (" (실패)" if failed else ""))
+
+    def shutdown(self):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._tasks.put(None)
+        for thread in threads:
+            thread.join()
+
+
+def render_template_video(audio_path: str, output_path: str, template: str = "shorts_template.mp4",
+                          captions: Optional[str] = None) -> str:
+    """템플릿 영상 + 오디오 합성 (워커 프로세스에서 실행, 클립 리소스는 반드시 해제). captions: 번인할 ASS 자막"""
+    from moviepy.editor import VideoFileClip, AudioFileClip
+
+    from encoder_autotune import encoder_profiles
+
+    video = VideoFileClip(template)
+    audio = AudioFileClip(audio_path)
+    try:
+        # 템플릿 해상도별 튜닝 프로필 (없으면 기본값)
+        preset, crf, fps = encoder_profiles.resolve(template, tuple(video.size))
+        ffmpeg_params = ['-crf', str(crf)]
+        if captions:
+            from captions import ass_filter
+            ffmpeg_params += ['-vf', ass_filter(captions)]
+        clip = video.set_audio(audio).set_duration(audio.duration)
+        clip.write_videofile(output_path, codec='libx264', fps=fps, preset=preset,
+                             ffmpeg_params=ffmpeg_params, logger=None)
+    finally:
+        audio.close()
+        video.close()
+    return output_path
+
+
+# 렌더 워커 풀 인스턴스 (첫 작업 제출 시 워커 시작)
+render_pool = RenderWorkerPool(
+    size=int(os.getenv('RENDER_WORKERS', 2)),
+    max_jobs_per_worker=int(os.getenv('RENDER_MAX_JOBS', 4)),
+    rss_limit_mb=float(os.getenv('RENDER_RSS_LIMIT_MB', 1536))
+)
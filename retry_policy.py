@@ -0,0 +1,216 @@
+# retry_policy.py
+import re
+import time
+import random
+import logging
+import email.utils
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 재시도 가치가 있는 HTTP 상태 코드 (일시적 오류 / 레이트 리밋)
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# 선택 의존성(openai, requests, httplib2)을 import 하지 않고 클래스 이름으로 판별
+RETRYABLE_EXCEPTION_NAMES = {
+    'APIConnectionError', 'APITimeoutError', 'Timeout', 'ReadTimeout',
+    'ConnectTimeout', 'ConnectionError', 'ChunkedEncodingError',
+    'RemoteDisconnected', 'IncompleteRead', 'TimeoutError'
+}
+
+# YouTube 는 레이트 리밋과 쿼터 소진을 모두 403 으로 돌려주므로 사유로 구분
+YOUTUBE_RETRYABLE_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded', 'backendError')
+
+# 스테이지별 기본 정책 (deadline: 스테이지 전체 허용 시간, 초)
+STAGE_POLICIES = {
+    'script': {'max_attempts': 3, 'base_delay': 2.0, 'max_delay': 30.0, 'deadline': 180},
+    'tts': {'max_attempts': 3, 'base_delay': 5.0, 'max_delay': 60.0, 'deadline': 900},
+    'trends': {'max_attempts': 3, 'base_delay': 1.0, 'max_delay': 20.0, 'deadline': 90},
+    'workflow': {'max_attempts': 5, 'base_delay': 5.0, 'max_delay': 300.0, 'deadline': None},
+    'thumbnail': {'max_attempts': 3, 'base_delay': 5.0, 'max_delay': 60.0, 'deadline': 300},
+}
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+class PermanentError(Exception):
+    """재시도해도 결과가 바뀌지 않는 오류 (인증 실패, 쿼터 소진 등)"""
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """예외에서 HTTP 상태 코드 추출 (openai / requests / googleapiclient 공통)"""
+    status = getattr(exc, 'status_code', None)
+    if status is None:
+        response = getattr(exc, 'response', None)
+        status = getattr(response, 'status_code', None)
+    if status is None:
+        resp = getattr(exc, 'resp', None)
+        status = getattr(resp, 'status', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _headers(exc: BaseException):
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers is None:
+        # googleapiclient HttpError.resp 는 헤더를 담은 dict 자체
+        headers = getattr(exc, 'resp', None)
+    return headers if hasattr(headers, 'items') else {}
+
+
+def _header(headers, name: str) -> Optional[str]:
+    for key, value in headers.items():
+        if str(key).lower() == name:
+            return str(value)
+    return None
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """'20ms', '1s', '6m0s', '1h2m3.5s' 형식의 OpenAI 리셋 시간 파싱"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(num) * scale[unit] for num, unit in parts)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Retry-After 및 레이트 리밋 헤더에서 서버가 요구하는 대기 시간 계산"""
+    headers = _headers(exc)
+    if not headers:
+        return None
+
+    value = _header(headers, 'retry-after-ms')
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+
+    value = _header(headers, 'retry-after')
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(value)
+                return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    waits = []
+    for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens'):
+        value = _header(headers, name)
+        if value:
+            parsed = _parse_duration(value)
+            if parsed is not None:
+                waits.append(parsed)
+    value = _header(headers, 'x-ratelimit-reset')
+    if value:
+        try:
+            reset = float(value)
+            # 큰 값은 epoch 타임스탬프, 작은 값은 남은 초
+            waits.append(reset - time.time() if reset > 1e9 else reset)
+        except ValueError:
+            pass
+    return max(0.0, max(waits)) if waits else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """예외 체인을 따라가며 재시도 가능 여부 판별"""
+    seen = set()
+    current = exc
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if getattr(current, 'retry_exhausted', False):
+            # 하위 스테이지가 이미 재시도를 소진함 → 중첩 재시도 방지
+            return False
+        if isinstance(current, (PermanentError, ConnectionAbortedError)):
+            return False
+
+        status = _status_code(current)
+        if status is not None:
+            if status == 403:
+                content = getattr(current, 'content', b'') or b''
+                if isinstance(content, bytes):
+                    content = content.decode('utf-8', 'ignore')
+                return any(reason in str(content) for reason in YOUTUBE_RETRYABLE_REASONS)
+            return status in RETRYABLE_STATUS
+
+        if type(current).__name__ in RETRYABLE_EXCEPTION_NAMES:
+            return True
+        current = current.__cause__ or current.__context__
+
+    # 분류할 수 없는 오류는 기존 동작대로 재시도 대상
+    return True
+
+
+class RetryPolicy:
+    """지수 백오프(full jitter) + Retry-After + 스테이지 마감 시간을 적용하는 재시도 정책"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 60.0,
+                 deadline: Optional[float] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.sleep = sleep
+        self.clock = clock
+
+    def compute_delay(self, attempt: int, exc: Optional[BaseException] = None) -> float:
+        """attempt(0부터)번째 실패 후 대기 시간"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        hinted = retry_after_seconds(exc) if exc is not None else None
+        return max(backoff, hinted) if hinted is not None else backoff
+
+    def run(self, operation: Callable[[int], Any], stage: str = 'default',
+            on_retry: Optional[Callable[[BaseException, int], None]] = None) -> Any:
+        """operation(attempt)을 정책에 따라 실행. 포기 시 마지막 예외를 그대로 전달"""
+        started = self.clock()
+        for attempt in range(self.max_attempts):
+            try:
+                return operation(attempt)
+            except Exception as e:
+                if not is_retryable(e):
+                    logger.error(f"[{stage}] 재시도 불가 오류: {str(e)}")
+                    raise
+
+                reason = None
+                delay = self.compute_delay(attempt, e)
+                if attempt == self.max_attempts - 1:
+                    reason = f"최대 시도 횟수({self.max_attempts}) 소진"
+                elif self.deadline is not None:
+                    remaining = self.deadline - (self.clock() - started)
+                    if delay >= remaining:
+                        reason = f"마감 시간 초과 예상 (대기 {delay:.1f}초 > 남은 {max(0.0, remaining):.1f}초)"
+
+                if reason:
+                    logger.error(f"[{stage}] {reason}. 재시도 중단: {str(e)}")
+                    try:
+                        e.retry_exhausted = True
+                    except AttributeError:
+                        pass
+                    raise
+
+                logger.warning(f"[{stage}] 시도 {attempt + 1} 실패: {str(e)} → {delay:.1f}초 후 재시도")
+                if on_retry:
+                    on_retry(e, attempt)
+                self.sleep(delay)
+
+
+def get_policy(stage: str, **overrides) -> RetryPolicy:
+    """스테이지 기본값에 overrides 를 덮어쓴 정책 생성"""
+    options = dict(STAGE_POLICIES.get(stage, {}))
+    options.update(overrides)
+    return RetryPolicy(**options)
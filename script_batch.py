@@ -0,0 +1,328 @@
+# script_batch.py
+import os
+import json
+import uuid
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+def _first_openai_key() -> str:
+    keys = [k.strip() for k in os.getenv('OPENAI_API_KEYS', '').split(';') if k.strip()]
+    keys += [k.strip() for k in os.getenv('OPENAI_KEYS', '').split(',') if k.strip()]
+    if not keys:
+        raise EnvironmentError("OPENAI_API_KEYS / OPENAI_KEYS 환경 변수 없음")
+    return keys[0]
+
+
+# ========================
+# 배치 백엔드
+# ========================
+class BatchBackend:
+    """JSONL 배치 작업 제출/조회/결과 다운로드 인터페이스"""
+    name = 'base'
+
+    def submit(self, input_path: str) -> str:
+        raise NotImplementedError
+
+    def status(self, job_id: str) -> str:
+        """'in_progress' | 'completed' | 'failed' | 'expired' | 'cancelled'"""
+        raise NotImplementedError
+
+    def download(self, job_id: str, output_path: str) -> str:
+        raise NotImplementedError
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API (24시간 처리 창, 저렴한 요금 레인)"""
+    name = 'openai'
+
+    def __init__(self, api_key: Optional[str] = None):
+        import openai
+        self.client = openai.OpenAI(api_key=api_key or _first_openai_key(), max_retries=0)
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, 'rb') as f:
+            uploaded = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window='24h'
+        )
+        return batch.id
+
+    def status(self, job_id: str) -> str:
+        status = self.client.batches.retrieve(job_id).status
+        # validating / finalizing / cancelling 등은 진행 중으로 취급
+        return status if status in ('completed', 'failed', 'expired', 'cancelled') else 'in_progress'
+
+    def download(self, job_id: str, output_path: str) -> str:
+        batch = self.client.batches.retrieve(job_id)
+        if not batch.output_file_id:
+            raise RuntimeError(f"배치 결과 파일 없음: {job_id}")
+        content = self.client.files.content(batch.output_file_id)
+        with open(output_path, 'wb') as f:
+            f.write(content.content)
+        return output_path
+
+
+def _placeholder_responder(body: Dict[str, Any]) -> str:
+    # 검증(최소 길이)을 통과하는 결정적 더미 스크립트
+    topic_line = body['messages'][-1]['content'].strip().splitlines()[-1].strip()
+    return " ".join([f"[로컬 배치 테스트] {topic_line}."] * 5)
+
+
+class LocalFileBatchBackend(BatchBackend):
+    """테스트용 파일 기반 백엔드. 첫 상태 조회 때 responder 로 요청을 처리해 OpenAI 와 같은 형식의 결과를 기록"""
+    name = 'local'
+
+    def __init__(self, root: str = 'static/batch_local',
+                 responder: Optional[Callable[[Dict[str, Any]], str]] = None):
+        self.root = root
+        self.responder = responder or _placeholder_responder
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def submit(self, input_path: str) -> str:
+        job_id = f"local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._job_dir(job_id), exist_ok=True)
+        with open(input_path, 'rb') as src, open(os.path.join(self._job_dir(job_id), 'input.jsonl'), 'wb') as dst:
+            dst.write(src.read())
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        output_path = os.path.join(self._job_dir(job_id), 'output.jsonl')
+        if not os.path.exists(output_path):
+            with open(os.path.join(self._job_dir(job_id), 'input.jsonl'), 'r', encoding='utf-8') as src, \
+                    open(output_path, 'w', encoding='utf-8') as dst:
+                for line in src:
+                    if not line.strip():
+                        continue
+                    request = json.loads(line)
+                    content = self.responder(request['body'])
+                    dst.write(json.dumps({
+                        'id': f"resp_{uuid.uuid4().hex[:8]}",
+                        'custom_id': request['custom_id'],
+                        'response': {'status_code': 200, 'body': {
+                            'choices': [{'message': {'role': 'assistant', 'content': content}}]
+                        }},
+                        'error': None,
+                    }, ensure_ascii=False) + "\n")
+        return 'completed'
+
+    def download(self, job_id: str, output_path: str) -> str:
+        with open(os.path.join(self._job_dir(job_id), 'output.jsonl'), 'rb') as src, open(output_path, 'wb') as dst:
+            dst.write(src.read())
+        return output_path
+
+
+BACKENDS = {
+    'openai': OpenAIBatchBackend,
+    'local': LocalFileBatchBackend,
+}
+
+
+# ========================
+# 스크립트 저장소
+# ========================
+class ScriptStore:
+    """미리 생성된 스크립트를 날짜별로 보관. 다음 실행이 꺼내 쓰면 consumed 처리"""
+
+    def __init__(self, store_file: str = 'static/scripts/store.json', keep_days: int = 7):
+        self.store_file = store_file
+        self.keep_days = keep_days
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.store_file):
+            with open(self.store_file, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        else:
+            self.data = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.store_file), exist_ok=True)
+        tmp_path = f"{self.store_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.store_file)
+
+    def put(self, target_date: str, key: str, trend: Dict[str, Any], script: str):
+        self.data.setdefault(target_date, {})[key] = {'trend': trend, 'script': script, 'consumed': False}
+        cutoff = (date.today() - timedelta(days=self.keep_days)).isoformat()
+        for old in [d for d in self.data if d < cutoff]:
+            del self.data[old]
+        self.save()
+
+    def available(self, target_date: Optional[str] = None) -> int:
+        entries = self.data.get(target_date or date.today().isoformat(), {})
+        return sum(1 for entry in entries.values() if not entry['consumed'])
+
+    def pending(self, target_date: Optional[str] = None) -> List[Tuple[str, Dict[str, Any], str]]:
+        """아직 쓰지 않은 (key, trend, script) 목록"""
+        entries = self.data.get(target_date or date.today().isoformat(), {})
+        return [(key, entry['trend'], entry['script']) for key, entry in entries.items() if not entry['consumed']]
+
+    def take(self, target_date: Optional[str] = None, topic: Optional[str] = None,
+             key: Optional[str] = None) -> Optional[Tuple[Dict[str, Any], str]]:
+        """(trend, script) 하나를 꺼냄. key 가 주어지면 해당 항목, topic 이 주어지면 같은 주제를 우선"""
+        entries = self.data.get(target_date or date.today().isoformat(), {})
+        if key is not None:
+            entries = {key: entries[key]} if key in entries else {}
+        candidates = [entry for entry in entries.values() if not entry['consumed']]
+        if topic:
+            candidates.sort(key=lambda entry: entry['trend'].get('topic') != topic)
+        if not candidates:
+            return None
+        entry = candidates[0]
+        entry['consumed'] = True
+        self.save()
+        return entry['trend'], entry['script']
+
+
+# ========================
+# 지연 배치 작업 관리
+# ========================
+class DeferredScriptJobs:
+    """내일 주제의 ScriptGenerator 요청을 배치 작업으로 제출하고, 완료되면 ScriptStore 에 적재"""
+
+    def __init__(self, state_file: str = 'static/logs/script_batch_jobs.json',
+                 work_dir: str = 'static/batch', store: Optional[ScriptStore] = None):
+        self.state_file = state_file
+        self.work_dir = work_dir
+        self.store = store or script_store
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self.jobs = json.load(f)
+        else:
+            self.jobs = []
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.jobs, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    def write_jsonl(self, trends: List[Dict[str, Any]], target_date: str,
+                    target_duration: int = 60) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+        from secure_generate_script import script_generator
+
+        os.makedirs(self.work_dir, exist_ok=True)
+        path = os.path.join(self.work_dir, f"scripts_{target_date}_{uuid.uuid4().hex[:6]}.jsonl")
+        items = {}
+        with open(path, 'w', encoding='utf-8') as f:
+            for idx, trend in enumerate(trends):
+                custom_id = f"{target_date}-{idx}"
+                items[custom_id] = trend
+                f.write(json.dumps({
+                    'custom_id': custom_id,
+                    'method': 'POST',
+                    'url': BATCH_ENDPOINT,
+                    'body': script_generator.build_request(trend, target_duration),
+                }, ensure_ascii=False) + "\n")
+        return path, items
+
+    def submit(self, trends: List[Dict[str, Any]], target_date: Optional[str] = None,
+               backend: Optional[BatchBackend] = None) -> str:
+        target_date = target_date or (date.today() + timedelta(days=1)).isoformat()
+        existing = [job for job in self.jobs
+                    if job['target_date'] == target_date and job['status'] in ('in_progress', 'completed')]
+        if existing:
+            # 하루 여러 번 실행되는 워크플로우에서 같은 날짜를 중복 제출하지 않음
+            logger.info(f"{target_date}용 스크립트 배치가 이미 있음: {existing[0]['job_id']}")
+            return existing[0]['job_id']
+        backend = backend or OpenAIBatchBackend()
+        path, items = self.write_jsonl(trends, target_date)
+        job_id = backend.submit(path)
+        self.jobs.append({
+            'job_id': job_id,
+            'backend': backend.name,
+            'target_date': target_date,
+            'submitted_at': datetime.now().isoformat(),
+            'status': 'in_progress',
+            'items': items,
+        })
+        self.save()
+        logger.info(f"📤 스크립트 배치 제출: {job_id} ({len(items)}개, {target_date}용)")
+        return job_id
+
+    def poll(self, backends: Optional[Dict[str, BatchBackend]] = None) -> int:
+        """진행 중인 작업을 조회하고 완료된 결과를 저장소에 적재. 적재한 스크립트 수 반환"""
+        from secure_generate_script import script_generator
+
+        backends = backends or {}
+        loaded = 0
+        for job in self.jobs:
+            if job['status'] != 'in_progress':
+                continue
+            backend = backends.get(job['backend']) or BACKENDS[job['backend']]()
+            backends[job['backend']] = backend
+            status = backend.status(job['job_id'])
+            if status == 'in_progress':
+                continue
+            job['status'] = status
+            if status != 'completed':
+                logger.error(f"스크립트 배치 {job['job_id']} 종료 상태: {status}")
+                continue
+
+            output_path = backend.download(job['job_id'], os.path.join(self.work_dir, f"{job['job_id']}_output.jsonl"))
+            with open(output_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    result = json.loads(line)
+                    trend = job['items'].get(result.get('custom_id'))
+                    response = result.get('response') or {}
+                    if trend is None or result.get('error') or response.get('status_code') != 200:
+                        logger.warning(f"배치 항목 실패: {result.get('custom_id')} {result.get('error')}")
+                        continue
+                    script = response['body']['choices'][0]['message']['content'].strip()
+                    reason = script_generator.validate_script(script)
+                    if reason:
+                        logger.warning(f"배치 항목 검증 실패: {result['custom_id']} - {reason}")
+                        continue
+                    self.store.put(job['target_date'], result['custom_id'], trend, script)
+                    loaded += 1
+        self.save()
+        if loaded:
+            logger.info(f"📥 배치 스크립트 {loaded}개 적재")
+        return loaded
+
+
+# 스크립트 저장소 인스턴스
+script_store = ScriptStore()
+
+if __name__ == "__main__":
+    import sys
+    from dotenv import load_dotenv
+    load_dotenv()
+    from logging_setup import setup_logging
+    from transport import install as install_transport
+    setup_logging()
+    # TRANSPORT_MODE=record|replay: API 응답을 카세트로 녹화/재생 (개발·프로파일링용)
+    install_transport()
+
+    # 사용법: python script_batch.py submit [openai|local] [개수] / python script_batch.py poll
+    command = sys.argv[1] if len(sys.argv) > 1 else 'poll'
+    jobs = DeferredScriptJobs()
+    if command == 'submit':
+        from trending import trend_analyzer
+        from topic_queue import topic_queue
+        backend_name = sys.argv[2] if len(sys.argv) > 2 else 'openai'
+        count = int(sys.argv[3]) if len(sys.argv) > 3 else int(os.getenv('DAILY_VIDEOS', 8))
+        # 조회 결과는 주제 큐로 들어가므로 큐의 상위 주제(미게시, 감쇠 점수 순)로 스크립트 생성
+        topics = trend_analyzer.get_trending_topics()
+        trends = topic_queue.peek(count) or [{'topic': t['query'], 'category': t['keyword'], 'score': t['value']}
+                                             for t in topics[:count]]
+        jobs.submit(trends, backend=BACKENDS[backend_name]())
+    else:
+        print(f"적재된 스크립트: {jobs.poll()}개, 오늘 사용 가능: {script_store.available()}개")
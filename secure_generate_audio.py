@@ -1,23 +1,25 @@
 import os
 import logging
 import hashlib
-import time
 import json
+import base64
 from typing import Optional
 from quota_manager import quota_manager
+from quota_scheduler import QuotaExhausted, next_reset
+from retry_policy import get_policy
+from captions import alignment_path, save_spoken_text
+from audio_postprocess import audio_postprocessor
+from tts_budget import billed_chars
+from tts_normalizer import tts_normalizer
+from speech_duration import speech_model, DEFAULT_TARGET_SECONDS
+from ffmpeg_utils import probe_duration
 from dotenv import load_dotenv
 import requests
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('static/logs/audio_generation.log'),
-        logging.StreamHandler()
-    ]
-)
 
 class AudioGenerator:
     def __init__(self):
@@ -25,16 +27,18 @@ class AudioGenerator:
         self.api_key = os.getenv('ELEVENLABS_KEY')
         self.max_retries = 3
         self.timeout = 300
+        # 개발/벤치마크용 대체 서버 주소 (기본: ElevenLabs)
+        self.base_url = os.getenv('ELEVENLABS_BASE_URL', 'https://api.elevenlabs.io').rstrip('/')
         self._validate_voice_id()
 
     def _validate_voice_id(self):
         """Voice ID 검증"""
         if not self.voice_id:
-            logging.error("ELEVENLABS_VOICE_ID 환경 변수가 설정되지 않았습니다.")
+            logger.error("ELEVENLABS_VOICE_ID 환경 변수가 설정되지 않았습니다.")
             raise ValueError("ELEVENLABS_VOICE_ID is required")
 
         if not self.api_key:
-            logging.error("ELEVENLABS_KEY 환경 변수가 설정되지 않았습니다.")
+            logger.error("ELEVENLABS_KEY 환경 변수가 설정되지 않았습니다.")
             raise ValueError("ELEVENLABS_KEY is required")
 
     def _get_audio_filename(self, text: str) -> str:
@@ -42,69 +46,122 @@ class AudioGenerator:
         text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
         return f"audio_{text_hash}.mp3"
 
-    def text_to_speech(self, text: str, output_dir: str = "static/audio") -> Optional[str]:
-        """텍스트를 음성으로 변환하여 파일로 저장"""
+    def text_to_speech(self, text: str, output_dir: str = "static/audio",
+                       with_timestamps: bool = False, postprocess: bool = True,
+                       max_seconds: Optional[float] = DEFAULT_TARGET_SECONDS) -> Optional[str]:
+        """텍스트를 음성으로 변환하여 파일로 저장 (with_timestamps: 자막용 문자 타임스탬프도 저장,
+        postprocess: 무음 트리밍 + 라우드니스 정규화된 파일 경로 반환, max_seconds: 예상 낭독 길이 상한)"""
         if not text or len(text.strip()) < 10:
-            logging.error("텍스트가 너무 짧아 오디오 생성 불가")
+            logger.error("텍스트가 너무 짧아 오디오 생성 불가")
             return None
+        # 합성/과금/캐시 키는 정규화된 낭독용 텍스트 기준 (원문은 자막·설명용으로 호출부에 남음)
+        text = tts_normalizer.for_tts(text)
+        if max_seconds:
+            text = speech_model.fit(text, self.voice_id, max_seconds)
 
         os.makedirs(output_dir, exist_ok=True)
         filename = self._get_audio_filename(text)
         output_path = os.path.join(output_dir, filename)
 
         # 이미 존재하는 파일 체크
-        if os.path.exists(output_path):
-            logging.info(f"기존 오디오 파일 재사용: {output_path}")
-            return output_path
-
-        # 쿼터 체크
-        if not quota_manager.check_quota('elevenlabs'):
-            logging.error("ElevenLabs 일일 쿼터 초과")
+        if os.path.exists(output_path) and (not with_timestamps or os.path.exists(alignment_path(output_path))):
+            logger.info(f"기존 오디오 파일 재사용: {output_path}")
+            final_path = audio_postprocessor.process(output_path) if postprocess else output_path
+            save_spoken_text(final_path, text)
+            return final_path
+
+        # 쿼터 체크 (이번 요청의 과금 문자 수가 일간/월간 잔여 예산에 들어가는지)
+        chars = billed_chars(text)
+        if not quota_manager.check_quota('elevenlabs', amount=chars):
+            logger.error(f"ElevenLabs 문자 예산 부족 (필요 {chars}자, 잔여 {quota_manager.remaining('elevenlabs')}자)")
             return None
 
-        for attempt in range(self.max_retries):
-            try:
-                logging.info(f"시도 {attempt + 1}: 오디오 생성 (길이: {len(text)}자)")
-
-                headers = {
-                    "Accept": "audio/mpeg",
-                    "Content-Type": "application/json",
-                    "xi-api-key": self.api_key
-                }
-
-                data = {
-                    "text": text,
-                    "model_id": "eleven_multilingual_v2",
-                    "voice_settings": {
-                        "stability": 0.7,
-                        "similarity_boost": 0.8
-                    }
+        def _attempt(attempt: int) -> str:
+            logger.info(f"시도 {attempt + 1}: 오디오 생성 (길이: {len(text)}자)")
+
+            headers = {
+                "Accept": "audio/mpeg",
+                "Content-Type": "application/json",
+                "xi-api-key": self.api_key
+            }
+
+            data = {
+                "text": text,
+                "model_id": "eleven_multilingual_v2",
+                "voice_settings": {
+                    "stability": 0.7,
+                    "similarity_boost": 0.8
                 }
-
-                response = requests.post(
-                    f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}",
-                    json=data,
-                    headers=headers,
-                    timeout=self.timeout
-                )
-                response.raise_for_status()
-
+            }
+
+            url = f"{self.base_url}/v1/text-to-speech/{self.voice_id}"
+            if with_timestamps:
+                url += "/with-timestamps"
+            response = requests.post(
+                url,
+                json=data,
+                headers=headers,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+
+            if with_timestamps:
+                # 오디오는 base64, 문자별 시작/끝 시간은 alignment 로 함께 반환됨
+                payload = response.json()
+                with open(output_path, 'wb') as f:
+                    f.write(base64.b64decode(payload['audio_base64']))
+                with open(alignment_path(output_path), 'w', encoding='utf-8') as f:
+                    json.dump(payload['alignment'], f, ensure_ascii=False)
+            else:
                 with open(output_path, 'wb') as f:
                     f.write(response.content)
 
-                # 쿼터 업데이트 (문자 단위)
-                quota_manager.update_usage('elevenlabs', len(text))
+            # 쿼터 업데이트 (문자 단위)
+            quota_manager.update_usage('elevenlabs', chars)
 
-                logging.info(f"오디오 파일 저장 완료: {output_path}")
-                return output_path
+            logger.info(f"오디오 파일 저장 완료: {output_path}")
+            return output_path
 
-            except Exception as e:
-                logging.error(f"시도 {attempt + 1} 실패: {str(e)}")
-                if attempt == self.max_retries - 1:
-                    raise
-                time.sleep(5 * (attempt + 1))
+        output_path = get_policy('tts', max_attempts=self.max_retries).run(_attempt, stage='tts')
+        final_path = audio_postprocessor.process(output_path) if postprocess else output_path
+        speech_model.record(self.voice_id, text, probe_duration(final_path))
+        # 자막은 실제로 읽은(정규화·트리밍된) 텍스트 기준으로 시간을 맞춤
+        save_spoken_text(final_path, text)
+        return final_path
+
+    def synthesize_segment(self, text: str, output_path: str, previous_text: str = '') -> str:
+        """정규화된 문장(들) 하나를 합성 (스트리밍 파이프라인용: 캐시/후처리 없음,
+        previous_text: 앞 문장을 넘겨 조각 사이 억양이 이어지도록 함)"""
+        chars = billed_chars(text)
+        if not quota_manager.check_quota('elevenlabs', amount=chars):
+            raise QuotaExhausted('elevenlabs', next_reset('elevenlabs'))
+
+        def _attempt(attempt: int) -> str:
+            data = {
+                "text": text,
+                "model_id": "eleven_multilingual_v2",
+                "voice_settings": {
+                    "stability": 0.7,
+                    "similarity_boost": 0.8
+                }
+            }
+            if previous_text:
+                data["previous_text"] = previous_text
+            response = requests.post(
+                f"{self.base_url}/v1/text-to-speech/{self.voice_id}",
+                json=data,
+                headers={"Accept": "audio/mpeg", "Content-Type": "application/json", "xi-api-key": self.api_key},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            tmp_path = f"{output_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp_path, output_path)
+            quota_manager.update_usage('elevenlabs', chars)
+            return output_path
 
-        return None
+        return get_policy('tts', max_attempts=self.max_retries).run(_attempt, stage='tts')
 
 # 오디오 생성기 인스턴스
 audio_generator = AudioGenerator()
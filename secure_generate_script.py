@@ -1,108 +1,350 @@
 import os
+import re
+import json
 import logging
+import itertools
 import openai
-from openai_manager import openai_manager
 from quota_manager import quota_manager
-from typing import Optional, Dict, Any
+from retry_policy import get_policy
+from speech_duration import speech_model, shorten_messages
+from typing import Optional, Dict, Any, Iterator, List
 from datetime import datetime
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('static/logs/script_generation.log'),
-        logging.StreamHandler()
-    ]
-)
+logger = logging.getLogger(__name__)
+
+def _key_rotator():
+    """OpenAI 키 순환기 (import 시점에 키 점검이 돌지 않도록 처음 쓸 때 로드: 배치 local 백엔드는 키 불필요)"""
+    from openai_rotator import key_rotator
+    return key_rotator
+
+
+SYSTEM_PROMPT = "당신은 유튜브 쇼츠 전문 작가입니다. 간결하고 흥미로운 스크립트를 작성하세요."
+
+# 요청마다 바뀌지 않는 지침 (단일/일괄/배치 작업이 같은 지침을 사용하고 주제만 뒤에 붙임)
+SCRIPT_GUIDELINES = """
+        요청: 아래 주제에 대한 흥미로운 한국어 유튜브 쇼츠(Shorts) 스크립트를 작성해주세요.
+        - 총 길이: 정확히 {target_duration}초 (약 150-200단어)
+        - 대상: 일반 시청자 (전문 용어 최소화)
+        - 톤: 친근하고 재미있게
+        - 구조:
+          1. 훅 (3-5초): 강렬한 시작
+          2. 본문 (40-50초): 핵심 내용 2-3가지
+          3. 결론 (5-7초): 요약 및 CTA
+        - 추가 요구사항:
+          - 이모지 적절히 사용 (예: 🔥, 🤖, 💡)
+          - 문장은 짧고 간결하게
+          - 숫자/사례 구체적으로 제시
+          #해시태그 포함하지 마세요
+"""
+
+BATCH_INSTRUCTIONS = """
+        여러 주제가 JSON 배열로 주어집니다. 각 주제마다 위 지침을 따르는 스크립트를 하나씩 작성하고,
+        다른 설명 없이 다음 JSON 형식으로만 응답하세요:
+        {"scripts": [{"id": <주제 id>, "script": "<스크립트>"}]}
+"""
+
 
 class ScriptGenerator:
     def __init__(self):
         self.max_retries = 3
         self.fallback_models = ['gpt-3.5-turbo', 'gpt-3.5-turbo-16k', 'gpt-4', 'gpt-4-1106-preview']
         self.default_model = 'gpt-3.5-turbo'
+        # 일괄 요청은 JSON 모드(response_format)를 지원하는 모델로 고정 (대체 모델 중 gpt-3.5-turbo-16k/gpt-4 는 400 거부)
+        self.batch_model = 'gpt-3.5-turbo'
+        self.max_completion_tokens = 4096
+        self.max_batch_size = 4
+        self.min_script_chars = 150
+        self.max_script_chars = 700
+        self.usage_log = []
+        self.voice_id = os.getenv('ELEVENLABS_VOICE_ID', '')
 
     def _get_openai_client(self, api_key: str):
         """OpenAI 클라이언트 생성"""
         return openai.OpenAI(
             api_key=api_key,
             timeout=30.0,
-            max_retries=3
+            max_retries=0  # 재시도는 retry_policy 에서만 수행
         )
 
     def _estimate_token_usage(self, text: str) -> int:
         """대략적인 토큰 사용량 추정 (간단한 버전)"""
         return len(text) // 4  # 대략적인 추정
 
-    def generate_script(self, trend_data: Dict[str, Any], target_duration: int = 60) -> Optional[str]:
-        """트렌드 데이터를 기반으로 스크립트 생성"""
+    @staticmethod
+    def _topic_line(trend_data: Dict[str, Any]) -> str:
         topic = trend_data.get('topic', '인기 있는 기술 트렌드')
         category = trend_data.get('category', '기술')
         score = trend_data.get('score', 50)
-        
-        prompt = f"""
-        주제: "{topic}" (카테고리: {category}, 인기 점수: {score}/100)
+        return f'주제: "{topic}" (카테고리: {category}, 인기 점수: {score}/100)'
 
-        요청: 위 주제에 대한 흥미로운 한국어 유튜브 쇼츠(Shorts) 스크립트를 작성해주세요.
-        - 총 길이: 정확히 {target_duration}초 (약 150-200단어)
-        - 대상: 일반 시청자 (전문 용어 최소화)
-        - 톤: 친근하고 재미있게
-        - 구조:
-          1. 훅 (3-5초): 강렬한 시작
-          2. 본문 (40-50초): 핵심 내용 2-3가지
-          3. 결론 (5-7초): 요약 및 CTA
-        - 추가 요구사항:
-          - 이모지 적절히 사용 (예: 🔥, 🤖, ��)
-          - 문장은 짧고 간결하게
-          - 숫자/사례 구체적으로 제시
-          #해시태그 포함하지 마세요
-        """
+    def _record_usage(self, mode: str, scripts: int, response, fallback_tokens: int) -> int:
+        """응답의 실제 토큰 사용량 기록 (usage 가 없으면 추정치)"""
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = getattr(usage, 'prompt_tokens', None) or fallback_tokens
+        completion_tokens = getattr(usage, 'completion_tokens', None) or 0
+        details = getattr(usage, 'prompt_tokens_details', None)
+        self.usage_log.append({
+            'mode': mode,
+            'scripts': scripts,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'cached_tokens': getattr(details, 'cached_tokens', 0) or 0,
+        })
+        return prompt_tokens + completion_tokens
 
-        for attempt in range(self.max_retries):
-            try:
-                api_key = openai_manager.get_valid_key()
-                client = self._get_openai_client(api_key)
-                model = self._select_model(attempt)
-
-                logging.info(f"시도 {attempt + 1}: '{topic}' 주제로 스크립트 생성 (모델: {model})")
-
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": "당신은 유튜브 쇼츠 전문 작가입니다. 간결하고 흥미로운 스크립트를 작성하세요."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=800,
-                    top_p=0.9
-                )
-
-                script = response.choices[0].message.content.strip()
-                token_usage = self._estimate_token_usage(prompt + script)
-
-                # 쿼터 업데이트
-                quota_manager.update_usage('openai', token_usage // 1000 + 1, api_key)
-
-                logging.info(f"스크립트 생성 성공! (길이: {len(script)}자, 예상 토큰: ~{token_usage})")
-                return script
-
-            except openai.RateLimitError:
-                logging.warning(f"시도 {attempt + 1}: API Rate Limit 도달. 키 변경 중...")
-                openai_manager.report_key_failure(api_key)
-                continue
-            except openai.APIError as e:
-                logging.error(f"시도 {attempt + 1}: OpenAI API 오류: {str(e)}")
-                if attempt == self.max_retries - 1:
-                    raise
-                continue
-            except Exception as e:
-                logging.error(f"시도 {attempt + 1}: 예상치 못한 오류: {str(e)}")
-                if attempt == self.max_retries - 1:
-                    raise
+    def usage_report(self) -> Dict[str, Dict[str, float]]:
+        """모드(single/batch)별 스크립트 1개당 평균 토큰"""
+        report = {}
+        for mode in ('single', 'batch'):
+            entries = [entry for entry in self.usage_log if entry['mode'] == mode]
+            scripts = sum(entry['scripts'] for entry in entries)
+            if not scripts:
                 continue
+            report[mode] = {
+                key: round(sum(entry[key] for entry in entries) / scripts, 1)
+                for key in ('prompt_tokens', 'completion_tokens', 'cached_tokens')
+            }
+            report[mode]['requests'] = len(entries)
+            report[mode]['scripts'] = scripts
+        return report
 
-        logging.error("모든 시도 실패. 스크립트 생성 불가")
+    def validate_script(self, script: Any) -> Optional[str]:
+        """문제 없으면 None, 아니면 실패 사유"""
+        if not isinstance(script, str) or not script.strip():
+            return "빈 스크립트"
+        length = len(script.strip())
+        if length < self.min_script_chars:
+            return f"너무 짧음 ({length}자)"
+        if length > self.max_script_chars:
+            return f"너무 김 ({length}자)"
+        if re.search(r'(^|\s)#\w', script):
+            return "해시태그 포함"
         return None
 
+    def build_request(self, trend_data: Dict[str, Any], target_duration: int = 60,
+                      model: Optional[str] = None) -> Dict[str, Any]:
+        """chat.completions 요청 본문 (즉시 호출과 배치 작업 JSONL 이 같은 본문을 사용)"""
+        prompt = SCRIPT_GUIDELINES.format(target_duration=target_duration) + "\n        " + self._topic_line(trend_data)
+        return {
+            'model': model or self.default_model,
+            'messages': [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': 800,
+            'top_p': 0.9,
+        }
+
+    def generate_script(self, trend_data: Dict[str, Any], target_duration: int = 60) -> Optional[str]:
+        """트렌드 데이터를 기반으로 스크립트 생성"""
+        topic = trend_data.get('topic', '인기 있는 기술 트렌드')
+
+        state = {'api_key': None}
+
+        def _attempt(attempt: int) -> str:
+            api_key = _key_rotator().get_key()
+            state['api_key'] = api_key
+            client = self._get_openai_client(api_key)
+            model = self._select_model(attempt)
+
+            logger.info(f"시도 {attempt + 1}: '{topic}' 주제로 스크립트 생성 (모델: {model})")
+
+            request = self.build_request(trend_data, target_duration, model)
+            response = client.chat.completions.create(**request)
+
+            script = response.choices[0].message.content.strip()
+            token_usage = self._record_usage(
+                'single', 1, response, self._estimate_token_usage(request['messages'][1]['content'] + script)
+            )
+
+            # 쿼터 업데이트
+            quota_manager.update_usage('openai', token_usage // 1000 + 1, api_key)
+
+            logger.info(f"스크립트 생성 성공! (길이: {len(script)}자, 토큰: {token_usage})")
+            return script
+
+        def _on_retry(error: BaseException, attempt: int):
+            if isinstance(error, openai.RateLimitError):
+                logger.warning(f"시도 {attempt + 1}: API Rate Limit 도달. 키 변경 중...")
+                _key_rotator().report_error(state['api_key'])
+
+        try:
+            script = get_policy('script', max_attempts=self.max_retries).run(
+                _attempt, stage='script', on_retry=_on_retry
+            )
+        except openai.RateLimitError:
+            logger.error("모든 시도 실패. 스크립트 생성 불가")
+            return None
+        return self.fit_duration(script, target_duration)
+
+    def stream_script(self, trend_data: Dict[str, Any], target_duration: int = 60) -> Iterator[str]:
+        """stream=True 로 생성되는 대로 스크립트 조각 반환 (재시도는 첫 조각을 받기 전까지만: 이어 받기 불가)"""
+        topic = trend_data.get('topic', '인기 있는 기술 트렌드')
+        state = {'api_key': None}
+
+        def _attempt(attempt: int):
+            api_key = _key_rotator().get_key()
+            state['api_key'] = api_key
+            client = self._get_openai_client(api_key)
+            model = self._select_model(attempt)
+            logger.info(f"시도 {attempt + 1}: '{topic}' 주제로 스크립트 스트리밍 생성 (모델: {model})")
+
+            request = dict(self.build_request(trend_data, target_duration, model),
+                           stream=True, stream_options={"include_usage": True})
+            chunks = iter(client.chat.completions.create(**request))
+            # 인증/속도 제한 오류는 첫 조각을 읽을 때 드러나므로 여기까지 재시도 대상
+            return request, chunks, next(chunks, None)
+
+        def _on_retry(error: BaseException, attempt: int):
+            if isinstance(error, openai.RateLimitError):
+                logger.warning(f"시도 {attempt + 1}: API Rate Limit 도달. 키 변경 중...")
+                _key_rotator().report_error(state['api_key'])
+
+        request, chunks, first = get_policy('script', max_attempts=self.max_retries).run(
+            _attempt, stage='script', on_retry=_on_retry
+        )
+        parts, usage_chunk = [], None
+        for chunk in itertools.chain([first] if first is not None else [], chunks):
+            # include_usage: 마지막 조각에만 usage 가 있고 choices 는 비어 있음
+            if getattr(chunk, 'usage', None):
+                usage_chunk = chunk
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
+
+        script = ''.join(parts).strip()
+        token_usage = self._record_usage(
+            'single', 1, usage_chunk, self._estimate_token_usage(request['messages'][1]['content'] + script)
+        )
+        quota_manager.update_usage('openai', token_usage // 1000 + 1, state['api_key'])
+        logger.info(f"스크립트 스트리밍 완료 (길이: {len(script)}자, 토큰: {token_usage})")
+
+    def fit_duration(self, script: str, target_duration: int = 60) -> str:
+        """보이스별 낭독 길이 추정으로 목표 길이를 넘는 스크립트를 TTS 전에 줄임"""
+        return speech_model.fit(script, self.voice_id, target_duration, shorten=lambda text, max_chars:
+                                self.shorten_script(text, max_chars, target_duration))
+
+    def shorten_script(self, script: str, max_chars: int, target_duration: int = 60) -> Optional[str]:
+        """목표 글자 수를 명시한 축약 요청 (한 번만 시도, 실패하면 None)"""
+        api_key = _key_rotator().get_key()
+        client = self._get_openai_client(api_key)
+        messages = shorten_messages(script, max_chars, target_duration)
+        response = client.chat.completions.create(
+            model=self.default_model, messages=messages, temperature=0.3, max_tokens=800
+        )
+        shortened = response.choices[0].message.content.strip()
+        token_usage = self._record_usage('shorten', 1, response,
+                                         self._estimate_token_usage(messages[1]['content'] + shortened))
+        quota_manager.update_usage('openai', token_usage // 1000 + 1, api_key)
+        return shortened
+
+    def _batch_messages(self, items: List[Dict[str, Any]], target_duration: int) -> List[Dict[str, str]]:
+        """고정 접두사(시스템 + 지침 + 형식) 뒤에 이번 요청의 주제 목록만 붙임"""
+        topics = json.dumps(
+            [{'id': item['id'], 'topic': self._topic_line(item['trend'])} for item in items],
+            ensure_ascii=False
+        )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": SCRIPT_GUIDELINES.format(target_duration=target_duration)
+             + BATCH_INSTRUCTIONS + "\n        주제 목록: " + topics},
+        ]
+
+    def _batch_tokens(self, count: int) -> int:
+        """응답 토큰 상한: 한국어는 글자당 1토큰 이상이라 최대 길이 스크립트 기준 글자당 2토큰 + 항목별 JSON 여유"""
+        return (self.max_script_chars * 2 + 64) * count + 32
+
+    @property
+    def batch_size(self) -> int:
+        """응답 토큰 한도 안에서 JSON 이 잘리지 않는 주제 수"""
+        fits = max(1, (self.max_completion_tokens - 32) // (self.max_script_chars * 2 + 64))
+        return min(self.max_batch_size, fits)
+
+    def _request_batch(self, items: List[Dict[str, Any]], target_duration: int) -> Dict[int, Any]:
+        """주제 여러 개를 한 번의 JSON 응답으로 요청. {id: script} 반환"""
+        state = {'api_key': None}
+        messages = self._batch_messages(items, target_duration)
+
+        def _attempt(attempt: int) -> Dict[int, Any]:
+            api_key = _key_rotator().get_key()
+            state['api_key'] = api_key
+            client = self._get_openai_client(api_key)
+            model = self.batch_model
+            logger.info(f"시도 {attempt + 1}: 스크립트 {len(items)}개 일괄 생성 (모델: {model})")
+
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0.7,
+                max_tokens=min(self.max_completion_tokens, self._batch_tokens(len(items))),
+                top_p=0.9
+            )
+            content = response.choices[0].message.content
+            token_usage = self._record_usage(
+                'batch', len(items), response,
+                self._estimate_token_usage(json.dumps(messages, ensure_ascii=False) + (content or ''))
+            )
+            quota_manager.update_usage('openai', token_usage // 1000 + 1, api_key)
+
+            # 형식이 깨진 응답은 전체 실패가 아니라 항목별 검증 실패로 처리
+            try:
+                entries = json.loads(content or '{}').get('scripts', [])
+            except (json.JSONDecodeError, AttributeError):
+                logger.warning("일괄 응답 JSON 파싱 실패")
+                entries = []
+            results = {}
+            for entry in entries if isinstance(entries, list) else []:
+                if isinstance(entry, dict) and 'id' in entry:
+                    try:
+                        results[int(entry['id'])] = entry.get('script')
+                    except (TypeError, ValueError):
+                        continue
+            return results
+
+        def _on_retry(error: BaseException, attempt: int):
+            if isinstance(error, openai.RateLimitError):
+                _key_rotator().report_error(state['api_key'])
+
+        return get_policy('script', max_attempts=self.max_retries).run(
+            _attempt, stage='script', on_retry=_on_retry
+        )
+
+    def generate_scripts_batch(self, trends: List[Dict[str, Any]], target_duration: int = 60,
+                               max_rounds: int = 3) -> List[Optional[str]]:
+        """여러 트렌드의 스크립트를 묶어서 생성. 검증에 실패한 항목만 다시 요청 (입력 순서대로 반환)"""
+        scripts: List[Optional[str]] = [None] * len(trends)
+        pending = list(range(len(trends)))
+
+        for round_no in range(max_rounds):
+            if not pending:
+                break
+            failed = []
+            for offset in range(0, len(pending), self.batch_size):
+                chunk = pending[offset:offset + self.batch_size]
+                items = [{'id': idx, 'trend': trends[idx]} for idx in chunk]
+                try:
+                    results = self._request_batch(items, target_duration)
+                except Exception as e:
+                    logger.error(f"일괄 요청 실패 ({len(chunk)}개): {str(e)}")
+                    failed.extend(chunk)
+                    continue
+
+                for idx in chunk:
+                    reason = self.validate_script(results.get(idx))
+                    if reason:
+                        logger.warning(f"라운드 {round_no + 1}: 스크립트 {idx} 검증 실패 - {reason}")
+                        failed.append(idx)
+                    else:
+                        scripts[idx] = self.fit_duration(results[idx].strip(), target_duration)
+            pending = failed
+
+        if pending:
+            logger.error(f"일괄 생성 최종 실패: {len(pending)}개 ({pending})")
+        logger.info(f"일괄 생성 완료: {len(trends) - len(pending)}/{len(trends)}개, 토큰/스크립트: {self.usage_report()}")
+        return scripts
+
     def _select_model(self, attempt: int) -> str:
         """재시도 횟수에 따라 모델 선택"""
         if attempt == 0:
@@ -129,5 +371,11 @@ if __name__ == "__main__":
         print("\n=== 스크립트 통계 ===")
         print(f"길이: {len(script)}자")
         print(f"줄 수: {len(script.splitlines())}")
+
+        batch_trends = [test_trend, {'topic': '자율주행 택시', 'category': '기술', 'score': 70},
+                        {'topic': '비트코인 반감기', 'category': '암호화폐', 'score': 65}]
+        scripts = script_generator.generate_scripts_batch(batch_trends)
+        print(f"\n=== 일괄 생성: {sum(1 for s in scripts if s)}/{len(scripts)}개 ===")
+        print("토큰/스크립트 (단일 vs 일괄):", script_generator.usage_report())
     except Exception as e:
         print(f"스크립트 생성 실패: {e}")
@@ -1,18 +1,35 @@
 # secure_main.py
 import os
 import sys
+import json
 import time
-import random
 import subprocess
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
 from openai import OpenAI
 from elevenlabs import Voice, VoiceSettings, generate as eleven_generate
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload
 from moviepy.editor import *
-from PIL import Image, ImageDraw, ImageFont
 from pydantic import root_validator
+from retry_policy import get_policy
+from audio_postprocess import audio_postprocessor
+from parallel_render import render_parallel
+from render_pool import render_pool, render_template_video
+from script_batch import script_store
+from tts_budget import tts_planner, billed_chars, TTS_REQUEST_CAP
+from quota_scheduler import quota_scheduler, QuotaExhausted, next_reset
+from upload_ledger import upload_ledger
+from thumbnail_generator import thumbnail_encoder, thumbnail_uploader
+from topic_queue import topic_queue
+from trending import trend_analyzer
+from tts_normalizer import tts_normalizer
+from key_health import key_health
+from speech_duration import speech_model, shorten_messages, DEFAULT_TARGET_SECONDS
+from ffmpeg_utils import probe_duration
+from captions import write_captions, save_spoken_text, ass_filter
 
 # ========================
 # 🛠️ 강화된 호환성 패치
@@ -59,7 +76,26 @@ class YouTubeAutomationPro:
             'elevenlabs': {'daily':0, 'monthly':0, 'limit_daily':9500, 'limit_monthly':295000}
         }
         self._last_reset = datetime.now()
+        self.tracker_file = 'static/logs/quota_tracker.json'
+        self._load_tracker()
+        # TTS 요청 최대 길이 (사전 생성 스크립트가 없을 때 이 길이까지 과금될 수 있다고 보고 예산 확인)
+        self.tts_char_cap = int(os.getenv('TTS_CHAR_CAP', TTS_REQUEST_CAP))
+        # 낭독 길이 목표 (넘을 것 같은 스크립트는 TTS 전에 줄임)
+        self.target_seconds = DEFAULT_TARGET_SECONDS
+        self.tts_queue = []
+        # 마지막으로 만든 스크립트의 주제 (게시 후 주제 큐에서 중복 제외 처리)
+        self.current_trend = None
         self.max_retries = 5
+        # parallel: 롱폼 영상을 세그먼트 단위로 병렬 인코딩
+        self.render_mode = os.getenv('RENDER_MODE', 'moviepy')
+        # 1: 새 스크립트는 스트리밍으로 생성하면서 완성된 문장부터 바로 TTS (streaming_pipeline.py)
+        self.script_streaming = os.getenv('SCRIPT_STREAMING', '0') == '1'
+        # 영상 1개당 할당된 시간 슬롯 안에서만 재시도
+        self.workflow_policy = get_policy(
+            'workflow',
+            max_attempts=self.max_retries,
+            deadline=3600 // int(os.getenv('DAILY_VIDEOS', 3))
+        )
 
     def _init_apis(self):
         load_dotenv()
@@ -68,7 +104,11 @@ class YouTubeAutomationPro:
         self.openai_keys = [k.strip() for k in os.getenv('OPENAI_KEYS', '').split(',') if k.strip()]
         if not self.openai_keys:
             raise ValueError("❌ OPENAI_KEYS 환경변수 오류")
-        self.current_key = random.randint(0, len(self.openai_keys)-1)
+        # 동시 점검(캐시 TTL 내면 생략)으로 정상 키만 남기고 응답이 빠른 키부터 사용
+        self.openai_keys = key_health.healthy(self.openai_keys)
+        if not self.openai_keys:
+            raise ValueError("❌ 사용 가능한 OpenAI 키 없음 (폐기/잔액 소진)")
+        self.current_key = 0
         
         # 🔊 ElevenLabs 초기화
         self.voice_config = Voice(
@@ -80,7 +120,11 @@ class YouTubeAutomationPro:
         )
         
         # 📺 YouTube API 빌드
-        self.youtube = build('youtube', 'v3', credentials=Credentials.from_authorized_user_info({
+        self.youtube = self.build_youtube()
+
+    def build_youtube(self):
+        """YouTube 서비스 (httplib2.Http 는 스레드 안전하지 않으므로 스레드마다 따로 만들어 씀)"""
+        return build('youtube', 'v3', credentials=Credentials.from_authorized_user_info({
             'client_id': os.getenv('GOOGLE_CLIENT_ID'),
             'client_secret': os.getenv('GOOGLE_CLIENT_SECRET'),
             'refresh_token': os.getenv('GOOGLE_REFRESH_TOKEN')
@@ -96,108 +140,334 @@ class YouTubeAutomationPro:
     # ========================
     # ⚙️ 쿼터 관리 시스템
     # ========================
-    def _check_quota(self, service):
+    def _load_tracker(self):
+        # 실행마다 프로세스가 새로 뜨므로 사용량은 파일로 이어받음
+        if os.path.exists(self.tracker_file):
+            with open(self.tracker_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            for s, counts in saved.get('usage', {}).items():
+                if s in self.quota_tracker:
+                    self.quota_tracker[s].update(daily=counts['daily'], monthly=counts['monthly'])
+            self._last_reset = datetime.fromisoformat(saved['last_reset'])
+        self._reset_counters()
+
+    def _save_tracker(self):
+        os.makedirs(os.path.dirname(self.tracker_file), exist_ok=True)
+        tmp_path = f"{self.tracker_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'last_reset': self._last_reset.isoformat(),
+                'usage': {s: {'daily': q['daily'], 'monthly': q['monthly']} for s, q in self.quota_tracker.items()}
+            }, f, indent=2)
+        os.replace(tmp_path, self.tracker_file)
+
+    def _record_usage(self, service, amount):
+        self._reset_counters()
+        self.quota_tracker[service]['daily'] += amount
+        self.quota_tracker[service]['monthly'] += amount
+        self._save_tracker()
+
+    def _reset_counters(self):
         now = datetime.now()
-        if (now - self._last_reset).days >= 1:
+        if now.date() != self._last_reset.date():
             for s in self.quota_tracker:
                 self.quota_tracker[s]['daily'] = 0
+                if (now.year, now.month) != (self._last_reset.year, self._last_reset.month):
+                    self.quota_tracker[s]['monthly'] = 0
             self._last_reset = now
-        
-        if self.quota_tracker[service]['daily'] >= self.quota_tracker[service]['limit_daily']:
-            sleep_time = (now.replace(hour=0, minute=0, second=0) + timedelta(days=1) - now).seconds
-            time.sleep(sleep_time)
-            self._check_quota(service)
+
+    def _remaining(self, service):
+        """오늘/이번 달 남은 한도 중 작은 값"""
+        self._reset_counters()
+        q = self.quota_tracker[service]
+        return max(0, min(q['limit_daily'] - q['daily'], q['limit_monthly'] - q['monthly']))
+
+    def _check_quota(self, service, amount=1):
+        # 프로세스를 재우지 않고 해당 서비스만 리셋 시각까지 차단
+        if self._remaining(service) < amount:
+            quota_scheduler.block(service, next_reset(service))
+        until = quota_scheduler.blocked_until(service)
+        if until:
+            raise QuotaExhausted(service, until)
+
+    def _live_script_chars(self):
+        """새로 생성할 스크립트 1개에 예약할 문자 수 (TTS 전에 목표 낭독 길이로 맞추므로 그 길이의 글자 수)"""
+        return min(speech_model.max_chars(self.voice_config.voice_id, self.target_seconds), self.tts_char_cap)
+
+    def _live_script_fits(self):
+        return self._remaining('elevenlabs') >= self._live_script_chars()
+
+    def plan_tts_queue(self, slots):
+        """사전 생성 스크립트 중 남은 ElevenLabs 문자 예산에 들어가면서 트렌드 점수 합이 최대인 조합 선택"""
+        # 이미 게시한 주제의 사전 생성 스크립트는 제외
+        pending = [item for item in script_store.pending() if not topic_queue.is_published(item[1].get('topic', ''))]
+        chosen = tts_planner.plan_scripts([(trend, script) for _, trend, script in pending],
+                                          self._remaining('elevenlabs'), limit=slots, cap=self.tts_char_cap)
+        self.tts_queue = [(pending[i][0], billed_chars(pending[i][2], self.tts_char_cap)) for i in chosen]
+        return len(self.tts_queue)
 
     # ========================
     # 🎨 콘텐츠 생성 모듈
     # ========================
-    def generate_script(self):
-        for attempt in range(self.max_retries):
-            try:
-                self._check_quota('openai')
-                client = OpenAI(api_key=self.openai_keys[self.current_key])
-                response = client.chat.completions.create(
-                    model="gpt-4-turbo",
-                    messages=[{
-                        "role": "system",
-                        "content": f"한국어 YouTube 스크립트 생성 (800자 이상). 키워드: {os.getenv('TREND_KEYWORDS')}"
-                    }]
-                )
-                self.quota_tracker['openai']['daily'] += 1
-                return response.choices[0].message.content.strip()
-            except Exception as e:
-                self._rotate_key()
-                time.sleep(2 ** attempt)
-        raise Exception("스크립트 생성 실패")
-
-    def text_to_speech(self, text):
-        self._check_quota('elevenlabs')
+    def generate_script(self, trend=None):
+        # 전날 배치 작업으로 미리 만들어 둔 스크립트 중 예산 계획에서 선택된 것부터 사용
+        while self.tts_queue:
+            key, _ = self.tts_queue.pop(0)
+            stored = script_store.take(key=key)
+            if stored:
+                trend, script = stored
+                print(f"📦 사전 생성 스크립트 사용: {trend.get('topic')}")
+                self.current_trend = trend
+                return script
+
+        # 새로 생성할 스크립트는 목표 낭독 길이만큼 과금된다고 보고, 음성 변환 예산이 없으면 OpenAI 호출 전에 중단
+        # (서비스 차단은 하지 않음: 더 짧은 사전 생성 스크립트는 다음 실행에서 들어갈 수 있음)
+        if not self._live_script_fits():
+            raise QuotaExhausted('elevenlabs', next_reset('elevenlabs'))
+
+        # 주제를 지정하지 않으면 주제 큐에서 지금 가장 신선하고 점수가 높은 주제를 꺼냄
+        claimed = trend is None
+        if claimed:
+            trend = trend_analyzer.get_daily_trend()
+        self.current_trend = trend
+        keywords = trend.get('topic') or os.getenv('TREND_KEYWORDS')
+        max_chars = speech_model.max_chars(self.voice_config.voice_id, self.target_seconds)
+
+        def _attempt(attempt):
+            self._check_quota('openai')
+            # 재시도는 retry_policy 에서만 수행 (SDK 내부 재시도와 중첩 방지)
+            client = OpenAI(api_key=self.openai_keys[self.current_key], max_retries=0)
+            response = client.chat.completions.create(
+                model="gpt-4-turbo",
+                messages=[{
+                    "role": "system",
+                    "content": f"한국어 YouTube Shorts 스크립트 생성 (낭독 {self.target_seconds:.0f}초, "
+                               f"{max_chars}자 이내). 키워드: {keywords}"
+                }]
+            )
+            self._record_usage('openai', 1)
+            return response.choices[0].message.content.strip()
+
+        try:
+            script = get_policy('script', max_attempts=self.max_retries).run(
+                _attempt, stage='script', on_retry=lambda e, attempt: self._rotate_key()
+            )
+        except Exception as e:
+            if claimed:
+                topic_queue.release(trend)
+            raise Exception("스크립트 생성 실패") from e
+        return speech_model.fit(script, self.voice_config.voice_id, self.target_seconds,
+                                shorten=self._shorten_script)
+
+    def stream_script_to_audio(self, trend=None, output_path="audio.mp3"):
+        """스크립트 생성과 음성 변환을 겹쳐 실행 → {'script': 원문, 'spoken', 'audio', ...}"""
+        from streaming_pipeline import stream_script_to_audio
+        # 예산 확인은 generate_script 와 동일 (목표 낭독 길이만큼 과금된다고 보고 호출 전에 중단)
+        if not self._live_script_fits():
+            raise QuotaExhausted('elevenlabs', next_reset('elevenlabs'))
+        self._check_quota('openai')
+        claimed = trend is None
+        if claimed:
+            trend = trend_analyzer.get_daily_trend()
+        self.current_trend = trend
+        try:
+            result = stream_script_to_audio(trend, output_path, target_duration=int(self.target_seconds))
+        except Exception as e:
+            if claimed:
+                topic_queue.release(trend)
+            raise Exception(f"스트리밍 스크립트/음성 생성 실패: {str(e)}") from e
+        self._record_usage('openai', 1)
+        self._record_usage('elevenlabs', billed_chars(result['spoken']))
+        return result
+
+    def _shorten_script(self, script, max_chars):
+        """목표 길이를 크게 넘는 스크립트 축약 요청 (쿼터가 없으면 None → 문장 삭제로 대체)"""
+        if self._remaining('openai') < 1:
+            return None
+        client = OpenAI(api_key=self.openai_keys[self.current_key], max_retries=0)
+        response = client.chat.completions.create(
+            model="gpt-4-turbo",
+            messages=shorten_messages(script, max_chars, self.target_seconds)
+        )
+        self._record_usage('openai', 1)
+        return response.choices[0].message.content.strip()
+
+    def text_to_speech(self, text, output_path="audio.mp3"):
+        voice_id = self.voice_config.voice_id
+        # 이모지/마크업/연출 지시 제거 + 숫자 읽기 (원래 스크립트는 호출부에 그대로 남음)
+        text = tts_normalizer.for_tts(text)
+        # 잘려 나갈 오디오까지 과금되지 않도록 합성 전에 목표 길이로 맞춤 (사전 생성 스크립트 포함)
+        text = speech_model.fit(text, voice_id, self.target_seconds)[:self.tts_char_cap]
+        chars = billed_chars(text)
+        self._check_quota('elevenlabs', amount=chars)
         try:
             audio = eleven_generate(
-                text=text[:5000],
+                text=text,
                 voice=self.voice_config,
                 model="eleven_multilingual_v2"
             )
-            with open("audio.mp3", "wb") as f:
+            with open(output_path, "wb") as f:
                 f.write(audio)
-            self.quota_tracker['elevenlabs']['daily'] += len(text)
-            return "audio.mp3"
+            self._record_usage('elevenlabs', chars)
+            # 무음 트리밍 + 라우드니스 정규화 (입력 해시 기준 캐시)
+            processed = audio_postprocessor.process(output_path)
+            speech_model.record(voice_id, text, probe_duration(processed))
+            # 자막은 실제로 읽은(정규화·트리밍된) 텍스트 기준으로 시간을 맞춤
+            save_spoken_text(processed, text)
+            return processed
         except Exception as e:
-            raise Exception(f"음성 변환 실패: {str(e)}")
+            raise Exception(f"음성 변환 실패: {str(e)}") from e
 
     # ========================
     # 🖼️ 썸네일 & 영상 처리
     # ========================
-    def create_thumbnail(self, title):
+    def create_thumbnail(self, title, output_path="thumbnail.jpg"):
+        """영상 제작과 동시에 백그라운드에서 썸네일 렌더링/인코딩 (Future 반환)"""
+        return thumbnail_encoder.submit(title, output_path)
+
+    def _thumbnail_path(self, pending):
         try:
-            img = Image.new('RGB', (1280, 720), color=(30,30,30))
-            d = ImageDraw.Draw(img)
-            font_path = "malgun.ttf" if os.name == 'nt' else "/usr/share/fonts/truetype/nanum/NanumGothic.ttf"
-            try:
-                font = ImageFont.truetype(font_path, 60)
-            except:
-                font = ImageFont.load_default()
-            wrapped_title = "\n".join([title[i:i+20] for i in range(0, len(title), 20)])
-            d.multiline_text((100, 200), wrapped_title, fill=(255,255,0), font=font, spacing=30)
-            img.save("thumbnail.jpg")
-            return "thumbnail.jpg"
+            return pending.result()['path'] if pending is not None else None
         except Exception as e:
-            print("⚠️ 썸네일 생성 실패. 기본 이미지 사용")
-            return "default_thumbnail.jpg"
+            print(f"⚠️ 썸네일 생성 실패. 썸네일 없이 업로드: {str(e)}")
+            return None
 
-    def create_video(self, audio_path):
+    def make_captions(self, script, audio_path):
+        """원래 스크립트를 표시 텍스트로, 실제 음성에 맞춘 ASS 자막 생성 (실패해도 자막 없이 렌더링)"""
         try:
-            video = VideoFileClip("shorts_template.mp4")
-            audio = AudioFileClip(audio_path)
-            return video.set_audio(audio).set_duration(audio.duration)
+            return write_captions(script, audio_path, os.path.splitext(audio_path)[0] + ".ass")
         except Exception as e:
-            raise Exception(f"영상 합성 오류: {str(e)}")
+            print(f"⚠️ 자막 생성 실패. 자막 없이 렌더링: {str(e)}")
+            return None
+
+    def render(self, audio_path, output_path="final.mp4", captions=None):
+        if self.render_mode == 'parallel':
+            return render_parallel("shorts_template.mp4", audio_path, output_path,
+                                   timed_filter=ass_filter(captions) if captions else None)
+        return self.create_video(audio_path, output_path, captions)
+
+    def create_video(self, audio_path, output_path="final.mp4", captions=None):
+        try:
+            # 렌더링은 메모리 한도가 있는 워커 프로세스에서 수행 (클립 리소스는 워커에서 해제)
+            return render_pool.run(render_template_video, audio_path, output_path, captions=captions)
+        except Exception as e:
+            raise Exception(f"영상 합성 오류: {str(e)}") from e
 
     # ========================
     # 🚀 업로드 모듈
     # ========================
-    def upload_video(self, file_path):
+    def make_title(self):
+        """영상 1개당 한 번만 생성 (재시도마다 바뀌면 업로드 기록과 대조할 수 없음)"""
+        return f"{os.getenv('VIDEO_PREFIX')} {datetime.now().strftime('%Y-%m-%d %H:%M')}"[:100]
+
+    def recent_uploads(self, limit=25):
+        """채널 업로드 목록 최근 항목 (목록 조회는 1 unit, videos.insert 는 1600 units)"""
+        channels = self.youtube.channels().list(part="contentDetails", mine=True).execute()
+        playlist_id = channels['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+        items = self.youtube.playlistItems().list(
+            part="snippet", playlistId=playlist_id, maxResults=min(limit, 50)
+        ).execute().get('items', [])
+        return [{
+            'id': item['snippet']['resourceId']['videoId'],
+            'title': item['snippet']['title'],
+            'published_at': item['snippet']['publishedAt'],
+        } for item in items]
+
+    def reconcile_uploads(self):
+        """응답을 받지 못한 업로드가 있으면 채널 업로드 목록과 대조"""
+        if not upload_ledger.pending():
+            return 0
+        try:
+            return upload_ledger.reconcile(self.recent_uploads())
+        except Exception as e:
+            print(f"⚠️ 업로드 목록 대조 실패: {str(e)}")
+            return 0
+
+    def upload_video(self, file_path, title=None, thumbnail=None):
+        title = title or self.make_title()
+        entry = upload_ledger.begin(file_path, title)
+        if entry['attempts'] > 1 and not entry['video_id'] and self.reconcile_uploads():
+            entry = upload_ledger.get(entry['key'])
+        if entry['video_id']:
+            # 같은 영상(내용 해시 + 제목)은 다시 올리지 않음
+            print(f"♻️ 이미 업로드된 영상: {entry['video_id']}")
+            return entry['video_id']
+
         self._check_quota('youtube')
+        request = None
         try:
-            title = f"{os.getenv('VIDEO_PREFIX')} {datetime.now().strftime('%Y-%m-%d %H:%M')}"
             request = self.youtube.videos().insert(
                 part="snippet,status",
                 body={
                     "snippet": {
-                        "title": title[:100],
+                        "title": title,
                         "description": f"🔗 자동 생성 콘텐츠\n키워드: {os.getenv('TREND_KEYWORDS')}",
-                        "categoryId": "22",
-                        "thumbnails": {"default": {"url": self.create_thumbnail(title)}}
+                        "categoryId": "22"
                     },
                     "status": {"privacyStatus": "public"}
                 },
-                media_body=file_path
+                media_body=MediaFileUpload(file_path, chunksize=8 * 1024 * 1024, resumable=True)
             )
-            response = request.execute()
-            self.quota_tracker['youtube']['daily'] += 1
+            response = None
+            if entry['session_uri']:
+                # 이전 세션 이어서 업로드: 서버에 실제로 받은 위치부터
+                state, value = self._upload_status(request.http, entry['session_uri'], os.path.getsize(file_path))
+                if state == 'completed':
+                    response = value
+                elif state == 'resume':
+                    request.resumable_uri = entry['session_uri']
+                    request.resumable_progress = value
+                    print(f"⏯️ 업로드 이어서 진행: {value / 1024 / 1024:.1f}MB 부터")
+                else:
+                    upload_ledger.set_session(entry['key'], None)
+                    entry['session_uri'] = None
+            while response is None:
+                try:
+                    _, response = request.next_chunk()
+                except HttpError as e:
+                    if entry['session_uri'] and e.resp.status in (404, 410):
+                        # 만료된 세션: 새 세션으로 처음부터
+                        upload_ledger.set_session(entry['key'], None)
+                        entry['session_uri'] = None
+                        request.resumable_uri = None
+                        request.resumable_progress = 0
+                        continue
+                    raise
+                if request.resumable_uri and request.resumable_uri != entry['session_uri']:
+                    upload_ledger.set_session(entry['key'], request.resumable_uri)
+                    entry['session_uri'] = request.resumable_uri
+            upload_ledger.complete(entry['key'], response['id'])
+            self._record_usage('youtube', 1)
+            if thumbnail:
+                # 썸네일은 영상 ID 가 생긴 뒤에만 설정 가능 → 업로드 흐름을 막지 않도록 백그라운드 처리
+                thumbnail_uploader.submit(self.build_youtube, response['id'], thumbnail)
             return response['id']
         except Exception as e:
-            raise Exception(f"업로드 실패: {str(e)}")
+            if request is not None and request.resumable_uri and request.resumable_uri != entry['session_uri']:
+                upload_ledger.set_session(entry['key'], request.resumable_uri)
+            if 'quotaExceeded' in str(getattr(e, 'content', b'')):
+                reset_at = next_reset('youtube')
+                quota_scheduler.block('youtube', reset_at)
+                raise QuotaExhausted('youtube', reset_at) from e
+            raise Exception(f"업로드 실패: {str(e)}") from e
+
+    @staticmethod
+    def _upload_status(http, session_uri, size):
+        """재개 가능한 업로드 세션 상태 조회 (빈 PUT + Content-Range: bytes */크기)
+
+        ('completed', 응답 본문) | ('resume', 다음에 보낼 바이트 위치) | ('expired', None)
+        """
+        resp, content = http.request(session_uri, 'PUT', body=b'',
+                                     headers={'Content-Range': f'bytes */{size}', 'Content-Length': '0'})
+        if resp.status in (200, 201):
+            return 'completed', json.loads(content)
+        if resp.status == 308:
+            # Range: bytes=0-N (받은 마지막 바이트). 헤더가 없으면 아직 받은 것이 없음
+            received = resp.get('range')
+            return 'resume', int(received.rsplit('-', 1)[1]) + 1 if received else 0
+        if resp.status in (404, 410):
+            return 'expired', None
+        raise HttpError(resp, content, uri=session_uri)
 
     def post_comment(self, video_id):
         try:
@@ -220,36 +490,96 @@ class YouTubeAutomationPro:
     # ========================
     # �� 안정화 워크플로우
     # ========================
+    def _publish(self, payload):
+        video_id = self.upload_video(payload['video'], payload.get('title'), payload.get('thumbnail'))
+        self.post_comment(video_id)
+        print(f"✅ 성공: https://youtu.be/{video_id}")
+        return video_id
+
+    def _park_upload(self, file_path, title=None, thumbnail=None, trend=None):
+        # 주제의 현재(감쇠) 트렌드 점수가 높은 영상부터 업로드되도록 우선순위로 사용
+        priority = topic_queue.current_score(trend) if trend else 0
+        quota_scheduler.park('youtube', {'video': file_path, 'title': title, 'thumbnail': thumbnail},
+                             priority=priority, files=['video', 'thumbnail'] if thumbnail else ['video'])
+        print(f"⏸️ YouTube 쿼터 소진: 렌더링된 영상을 업로드 대기열에 보관")
+
+    def drain_upload_backlog(self):
+        """YouTube 쿼터가 남아 있으면 대기 중인 영상을 우선순위대로 업로드"""
+        return quota_scheduler.drain('youtube', self._publish)
+
+    def is_production_blocked(self):
+        if quota_scheduler.is_blocked('openai') or quota_scheduler.is_blocked('elevenlabs'):
+            return True
+        # 계획된 스크립트를 다 썼고 새 스크립트가 들어갈 문자 예산도 없으면 생산 중단
+        return not self.tts_queue and not self._live_script_fits()
+
     def execute_workflow(self):
-        for attempt in range(self.max_retries):
-            try:
-                script = self.generate_script()
-                audio = self.text_to_speech(script)
-                video = self.create_video(audio)
-                video.write_videofile("final.mp4", codec='libx264', logger=None)
-                
-                video_id = self.upload_video("final.mp4")
-                self.post_comment(video_id)
-                
-                print(f"✅ 성공: https://youtu.be/{video_id}")
-                return True
-            except Exception as e:
-                print(f"🔄 재시도 {attempt+1}/{self.max_retries}")
-                time.sleep(5 ** attempt)
-        return False
+        # 재시도 시 이미 끝난 단계는 다시 실행하지 않음 (제목도 영상 1개당 한 번만 정함)
+        done = {'title': self.make_title()}
+        pending_thumbnail = self.create_thumbnail(done['title'])
+
+        def _attempt(attempt):
+            # 사전 생성 스크립트가 없으면 스크립트와 음성을 한 번에 (SCRIPT_STREAMING=1)
+            if 'script' not in done and self.script_streaming and not self.tts_queue:
+                streamed = self.stream_script_to_audio()
+                done.update(script=streamed['script'], audio=streamed['audio'], trend=self.current_trend)
+            if 'script' not in done:
+                done['script'] = self.generate_script()
+                done['trend'] = self.current_trend
+            if 'audio' not in done:
+                done['audio'] = self.text_to_speech(done['script'])
+            if 'video' not in done:
+                done['video'] = self.render(done['audio'], "final.mp4",
+                                            self.make_captions(done['script'], done['audio']))
+
+            if 'thumbnail' not in done:
+                done['thumbnail'] = self._thumbnail_path(pending_thumbnail)
+
+            # 업로드만 막힌 경우 생산은 계속하고 영상은 백로그로
+            if quota_scheduler.is_blocked('youtube'):
+                self._park_upload(done['video'], done['title'], done['thumbnail'], done['trend'])
+            else:
+                try:
+                    self._publish({'video': done['video'], 'title': done['title'], 'thumbnail': done['thumbnail']})
+                except QuotaExhausted:
+                    self._park_upload(done['video'], done['title'], done['thumbnail'], done['trend'])
+            # 업로드 대기열로 간 영상도 게시 예정이므로 같은 주제를 다시 만들지 않음
+            topic_queue.mark_published(done['trend'] or {})
+            return True
+
+        def _on_retry(error, attempt):
+            print(f"🔄 재시도 {attempt+1}/{self.max_retries}")
+
+        try:
+            return self.workflow_policy.run(_attempt, stage='workflow', on_retry=_on_retry)
+        except Exception as e:
+            print(f"❌ 워크플로우 중단: {str(e)}")
+            return False
 
 # ========================
 # 🚀 실행 블록
 # ========================
 if __name__ == "__main__":
+    from logging_setup import setup_logging
+    from transport import install as install_transport
+    setup_logging()
+    # TRANSPORT_MODE=record|replay: API 응답을 카세트로 녹화/재생 (개발·프로파일링용)
+    install_transport()
     bot = YouTubeAutomationPro()
     total = int(os.getenv('DAILY_VIDEOS', 3))
-    
+    bot.reconcile_uploads()
+    bot.drain_upload_backlog()
+    bot.plan_tts_queue(total)
+
     for idx in range(1, total+1):
+        if bot.is_production_blocked():
+            print("⏸️ 스크립트/음성 쿼터 소진: 남은 제작은 다음 실행으로 연기")
+            break
         print(f"\n🎬 {idx}/{total} 영상 제작 시작")
         if bot.execute_workflow():
             print(f"✔️ {idx}번 완료")
         else:
             print(f"❌ {idx}번 실패 (모든 재시도 소진)")
         time.sleep(3600//total)
+    thumbnail_uploader.wait()
 
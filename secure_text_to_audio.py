@@ -3,37 +3,50 @@ import requests
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
+from retry_policy import get_policy
+from quota_manager import quota_manager
+from quota_scheduler import QuotaExhausted, next_reset
+from tts_budget import billed_chars
+from tts_normalizer import tts_normalizer
+from speech_duration import speech_model, DEFAULT_TARGET_SECONDS
+from ffmpeg_utils import probe_duration
+from captions import save_spoken_text
+
+logger = logging.getLogger(__name__)
 
 # 환경 변수 로드
 load_dotenv()
 
-# 로그 설정
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-# ElevenLabs 무료 티어의 대략적인 월간 한도 (참고용)
-ELEVENLABS_FREE_TIER_CHARS = 10000
 
 # *** 함수명을 text_to_speech 로 변경 ***
-def text_to_speech(text, voice_id, output_folder="generated_audio", stability=0.7, similarity_boost=0.8):
-    """텍스트를 오디오로 변환하고 파일로 저장 (requests 사용, elevenlabs==0.2.x 호환)"""
+def text_to_speech(text, voice_id, output_folder="generated_audio", stability=0.7, similarity_boost=0.8,
+                   max_seconds=DEFAULT_TARGET_SECONDS):
+    """텍스트를 오디오로 변환하고 파일로 저장 (requests 사용, elevenlabs==0.2.x 호환, max_seconds: 예상 낭독 길이 상한)"""
 
     api_key = os.getenv("ELEVENLABS_API_KEY")
     if not api_key:
-        logging.error("ElevenLabs API key not found in environment variables (ELEVENLABS_API_KEY).")
+        logger.error("ElevenLabs API key not found in environment variables (ELEVENLABS_API_KEY).")
         raise ValueError("Missing ElevenLabs API Key")
 
     if not text:
-        logging.error("Input text for audio generation is empty.")
+        logger.error("Input text for audio generation is empty.")
         raise ValueError("Input text cannot be empty.")
     if not voice_id:
-        logging.error("ElevenLabs Voice ID is not provided.")
+        logger.error("ElevenLabs Voice ID is not provided.")
         raise ValueError("Voice ID must be provided.")
 
-    text_length = len(text)
-    logging.info(f"Requesting audio generation for {text_length} characters.")
-    logging.warning("ElevenLabs API calls consume character quota and may incur costs if free tier limit is exceeded.")
-    if text_length > ELEVENLABS_FREE_TIER_CHARS * 0.1:
-         logging.warning(f"Requested text length ({text_length}) is significant compared to the estimated monthly free tier ({ELEVENLABS_FREE_TIER_CHARS}). Monitor your usage.")
+    # Strip emoji/markup/stage directions and spell out numbers; the caller keeps the original script
+    text = tts_normalizer.for_tts(text)
+    if max_seconds:
+        # Trim before synthesis so we never pay for audio that would be cut at render time
+        text = speech_model.fit(text, voice_id, max_seconds)
+    text_length = billed_chars(text)
+    logger.info(f"Requesting audio generation for {text_length} characters.")
+    # 예산에 들어가지 않는 요청은 보내지 않음 (일간/월간 잔여 문자 수 기준)
+    if not quota_manager.check_quota('elevenlabs', amount=text_length):
+        logger.error(f"ElevenLabs character budget exceeded: need {text_length}, "
+                     f"remaining {quota_manager.remaining('elevenlabs')}.")
+        raise QuotaExhausted('elevenlabs', next_reset('elevenlabs'))
 
     # ElevenLabs API 엔드포인트 (v1)
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
@@ -56,14 +69,19 @@ def text_to_speech(text, voice_id, output_folder="generated_audio", stability=0.
     }
 
     try:
-        logging.info(f"Sending request to ElevenLabs API for voice ID: {voice_id}")
-        response = requests.post(url, json=data, headers=headers, timeout=180) # 타임아웃 3분 설정
-        response.raise_for_status() # 오류 발생 시 예외 발생 (4xx, 5xx)
+        logger.info(f"Sending request to ElevenLabs API for voice ID: {voice_id}")
+        def _attempt(attempt):
+            response = requests.post(url, json=data, headers=headers, timeout=180) # 타임아웃 3분 설정
+            response.raise_for_status() # 오류 발생 시 예외 발생 (4xx, 5xx)
+            return response
+
+        # 429/5xx 및 네트워크 오류만 재시도 (401/402 는 즉시 실패)
+        response = get_policy('tts').run(_attempt, stage='tts')
 
         # 출력 폴더 생성
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
-            logging.info(f"Created output folder: {output_folder}")
+            logger.info(f"Created output folder: {output_folder}")
 
         # 파일 저장 경로
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -77,27 +95,32 @@ def text_to_speech(text, voice_id, output_folder="generated_audio", stability=0.
                 if chunk:
                     f.write(chunk)
 
-        logging.info(f"Audio file successfully saved to: {audio_path}")
+        quota_manager.update_usage('elevenlabs', text_length)
+        speech_model.record(voice_id, text, probe_duration(audio_path))
+        # Keep the text actually spoken next to the audio so captions are timed against it
+        save_spoken_text(audio_path, text)
+        logger.info(f"Audio file successfully saved to: {audio_path}")
         return audio_path
 
     except requests.exceptions.RequestException as e:
-        logging.error(f"Network or request error during ElevenLabs API call: {e}")
+        logger.error(f"Network or request error during ElevenLabs API call: {e}")
         # 응답 내용 로깅 시도
         if e.response is not None:
-            logging.error(f"Response status code: {e.response.status_code}")
-            logging.error(f"Response text: {e.response.text}")
+            logger.error(f"Response status code: {e.response.status_code}")
+            logger.error(f"Response text: {e.response.text}")
         # 할당량 초과 또는 인증 오류 확인
         if e.response is not None and e.response.status_code in [401, 402]:
-             logging.error("Authentication error or quota exceeded likely for ElevenLabs.")
+             logger.error("Authentication error or quota exceeded likely for ElevenLabs.")
              # 재시도 의미 없음
              raise ConnectionAbortedError("ElevenLabs authentication/quota error.") from e
         raise ConnectionError(f"Failed to get audio from ElevenLabs: {e}") from e
     except Exception as e:
-        logging.error(f"Unexpected error during audio generation: {str(e)}")
+        logger.error(f"Unexpected error during audio generation: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
+    from logging_setup import setup_logging
+    setup_logging()
 
     test_text = "이것은 elevenlabs 0.2.12 버전 호환성 테스트입니다. requests 라이브러리를 사용합니다."
     test_voice_id = os.getenv("ELEVENLABS_VOICE_ID")
@@ -0,0 +1,200 @@
+# speech_duration.py
+import os
+import re
+import json
+import logging
+import threading
+import numpy as np
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Shorts 최대 길이 (렌더 단계에서 잘리지 않도록 약간의 여유를 둔 기본 목표)
+SHORTS_MAX_SECONDS = 60
+DEFAULT_TARGET_SECONDS = float(os.getenv('SHORTS_TARGET_SECONDS', 58))
+# 보정 데이터가 없을 때의 사전값: (기본 지연 초, 음절당 초, 문장 끝 쉼당 초)
+PRIOR = (0.3, 0.16, 0.35)
+
+HANGUL_RE = re.compile(r'[가-힣]')
+LATIN_RE = re.compile(r'[A-Za-z]')
+DIGIT_RE = re.compile(r'\d')
+PAUSE_RE = re.compile(r'[.!?。…]+|\n+')
+SENTENCE_RE = re.compile(r'[^.!?。…\n]+(?:[.!?。…]+|\n+|$)\s*')
+
+SHORTEN_PROMPT = """
+        아래 유튜브 쇼츠 스크립트를 낭독 {target_seconds:.0f}초 안에 끝나도록 {max_chars}자 이내로 줄여주세요.
+        - 첫 문장(훅)과 마지막 문장(요약/CTA)은 유지하고 본문에서 덜 중요한 내용부터 줄이세요
+        - 새로운 내용은 추가하지 마세요
+        - 줄인 스크립트만 출력하세요
+"""
+
+
+def speech_units(text: str) -> Tuple[float, int]:
+    """(낭독 음절 수 근사, 문장 끝 쉼 수). 한글 1음절, 영문자 0.5, 숫자 1.5, 나머지(공백/이모지/기호) 0"""
+    units = (len(HANGUL_RE.findall(text)) + 0.5 * len(LATIN_RE.findall(text))
+             + 1.5 * len(DIGIT_RE.findall(text)))
+    return units, len(PAUSE_RE.findall(text.strip()))
+
+
+def shorten_messages(script: str, max_chars: int, target_seconds: float) -> List[Dict[str, str]]:
+    """대상 길이를 명시한 축약 요청 (chat.completions messages)"""
+    return [
+        {"role": "system", "content": "당신은 유튜브 쇼츠 전문 편집자입니다."},
+        {"role": "user", "content": SHORTEN_PROMPT.format(target_seconds=target_seconds, max_chars=max_chars)
+         + "\n        스크립트:\n" + script},
+    ]
+
+
+class SpeechDurationModel:
+    """보이스별 낭독 길이 추정 (과거 TTS 결과의 문자 수 대 실제 오디오 길이로 보정)"""
+
+    def __init__(self, calibration_file: str = 'static/logs/speech_calibration.json',
+                 max_samples: int = 200, prior_weight: float = 3.0, max_trim_ratio: float = 0.25):
+        self.calibration_file = calibration_file
+        self.max_samples = max_samples
+        # 사전값을 표본 몇 개 분량으로 취급할지 (표본이 적을 때 추정이 튀지 않도록)
+        self.prior_weight = prior_weight
+        # 문장 삭제로 이보다 많이 잘려 나가면 축약 요청을 우선
+        self.max_trim_ratio = max_trim_ratio
+        self._lock = threading.Lock()
+        self._coefficients: Dict[str, Tuple[float, float, float]] = {}
+
+    def _load(self) -> Dict[str, List[List[float]]]:
+        if os.path.exists(self.calibration_file):
+            with open(self.calibration_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def _save(self, samples: Dict[str, List[List[float]]]):
+        os.makedirs(os.path.dirname(self.calibration_file) or '.', exist_ok=True)
+        tmp_path = f"{self.calibration_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(samples, f)
+        os.replace(tmp_path, self.calibration_file)
+
+    # ========================
+    # 보정
+    # ========================
+    def record(self, voice: str, text: str, seconds: float):
+        """TTS 결과 1건 기록 (seconds: 실제 오디오 길이)"""
+        units, pauses = speech_units(text)
+        if units <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            samples = self._load()
+            rows = samples.setdefault(voice or 'default', [])
+            rows.append([units, pauses, round(seconds, 3)])
+            del rows[:-self.max_samples]
+            self._save(samples)
+            self._coefficients.pop(voice or 'default', None)
+        predicted = self.estimate(text, voice)
+        logger.info(f"⏱️ 낭독 길이 보정: {voice} {units:.0f}음절 → {seconds:.1f}초 (현재 추정 {predicted:.1f}초)")
+
+    def coefficients(self, voice: str) -> Tuple[float, float, float]:
+        """(기본 지연, 음절당 초, 쉼당 초). 사전값 쪽으로 당기는 리지 최소제곱"""
+        voice = voice or 'default'
+        with self._lock:
+            if voice in self._coefficients:
+                return self._coefficients[voice]
+            rows = self._load().get(voice, [])
+        prior = np.array(PRIOR)
+        if rows:
+            data = np.array(rows, dtype=np.float64)
+            X = np.column_stack([np.ones(len(data)), data[:, 0], data[:, 1]])
+            y = data[:, 2]
+            # 특성 크기가 달라서 계수별 벌점은 전형적인 스크립트(400음절, 쉼 30개) 기준으로 맞춤
+            penalty = self.prior_weight * np.diag(np.array([1.0, 400.0, 30.0]) ** 2)
+            coef = np.linalg.solve(X.T @ X + penalty, X.T @ y + penalty @ prior)
+            if coef[1] <= 0:
+                coef = prior
+            coef = (max(0.0, float(coef[0])), float(coef[1]), max(0.0, float(coef[2])))
+        else:
+            coef = tuple(PRIOR)
+        with self._lock:
+            self._coefficients[voice] = coef
+        return coef
+
+    # ========================
+    # 추정 / 길이 맞추기
+    # ========================
+    def estimate(self, text: str, voice: str) -> float:
+        intercept, per_unit, per_pause = self.coefficients(voice)
+        units, pauses = speech_units(text)
+        return intercept + per_unit * units + per_pause * pauses
+
+    def max_chars(self, voice: str, target_seconds: float) -> int:
+        """목표 길이 안에 들어가는 대략적인 글자 수 (프롬프트용: 문장당 약 25자 기준 쉼 포함)"""
+        intercept, per_unit, per_pause = self.coefficients(voice)
+        return max(50, int((target_seconds - intercept) / (per_unit + per_pause / 25)))
+
+    def trim(self, text: str, voice: str, target_seconds: float) -> str:
+        """본문 문장을 뒤에서부터 빼서 목표 길이에 맞춤 (첫 문장 훅과 마지막 문장 CTA 는 유지)"""
+        sentences = [s for s in SENTENCE_RE.findall(text) if s.strip()]
+        kept = list(sentences)
+        # 위치로 삭제 (같은 문장이 반복되는 스크립트에서 다른 위치의 문장이 지워지지 않도록).
+        # 뒤에서부터 지우므로 idx 앞쪽 위치는 그대로
+        for idx in range(len(sentences) - 2, 0, -1):
+            if self.estimate(''.join(kept), voice) <= target_seconds:
+                break
+            del kept[idx]
+        # 훅 + CTA 만으로도 길면 둘 다 지킬 수 없으므로 CTA 를 빼고 훅만 남김
+        while len(kept) > 1 and self.estimate(''.join(kept), voice) > target_seconds:
+            kept.pop()
+        return ''.join(kept).strip()
+
+    def fit(self, text: str, voice: str, target_seconds: float = DEFAULT_TARGET_SECONDS,
+            shorten: Optional[Callable[[str, int], Optional[str]]] = None) -> str:
+        """목표 길이를 넘을 것 같으면 TTS 전에 줄임. shorten(text, max_chars): 축약 요청 함수(선택)"""
+        estimated = self.estimate(text, voice)
+        if estimated <= target_seconds:
+            return text
+
+        result = self.trim(text, voice, target_seconds)
+        if shorten and len(result) < len(text) * (1 - self.max_trim_ratio):
+            # 문장을 많이 들어내야 하면 내용을 살려 다시 쓰도록 요청 (결과가 여전히 길면 문장 삭제로 마무리)
+            try:
+                candidate = shorten(text, self.max_chars(voice, target_seconds))
+            except Exception as e:
+                logger.warning(f"⚠️ 스크립트 축약 요청 실패, 문장 삭제로 대체: {str(e)}")
+                candidate = None
+            if candidate:
+                result = self.trim(candidate.strip(), voice, target_seconds)
+
+        logger.info(f"✂️ 스크립트 길이 조정: 예상 {estimated:.1f}초 → {self.estimate(result, voice):.1f}초 "
+                    f"(목표 {target_seconds:.0f}초, {len(text)}자 → {len(result)}자)")
+        return result
+
+
+# 낭독 길이 모델 인스턴스
+speech_model = SpeechDurationModel()
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    # 벤치마크: 가상의 보이스(실제 계수를 모름)로 보정 전/후 추정 오차와 절약되는 과금 문자 수
+    true_coef = (0.5, 0.19, 0.45)
+    rng = random.Random(0)
+    model = SpeechDurationModel(os.path.join(tempfile.mkdtemp(prefix="speech_bench_"), "calibration.json"))
+
+    def synth_script(sentences: int) -> str:
+        return ' '.join('가' * rng.randint(12, 35) + rng.choice(['.', '!', '?']) for _ in range(sentences))
+
+    def true_seconds(text: str) -> float:
+        units, pauses = speech_units(text)
+        return (true_coef[0] + true_coef[1] * units + true_coef[2] * pauses) * rng.uniform(0.97, 1.03)
+
+    tests = [synth_script(rng.randint(8, 30)) for _ in range(50)]
+    before = np.mean([abs(model.estimate(t, 'bench') - true_seconds(t)) for t in tests])
+    for _ in range(20):
+        text = synth_script(rng.randint(8, 30))
+        model.record('bench', text, true_seconds(text))
+    after = np.mean([abs(model.estimate(t, 'bench') - true_seconds(t)) for t in tests])
+    print(f"평균 절대 오차: 보정 전 {before:.2f}초 → 보정 후 {after:.2f}초 (표본 20개)")
+
+    long_scripts = [synth_script(rng.randint(20, 30)) for _ in range(20)]
+    fitted = [model.fit(t, 'bench', 58) for t in long_scripts]
+    overs = sum(1 for t in fitted if true_seconds(t) > SHORTS_MAX_SECONDS)
+    print(f"긴 스크립트 20개: 과금 문자 {sum(map(len, long_scripts))} → {sum(map(len, fitted))}자, "
+          f"조정 후 {SHORTS_MAX_SECONDS}초 초과 {overs}개")
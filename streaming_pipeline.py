@@ -0,0 +1,279 @@
+# streaming_pipeline.py
+import os
+import re
+import time
+import shutil
+import hashlib
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from audio_postprocess import audio_postprocessor
+from tts_normalizer import tts_normalizer
+from speech_duration import speech_model, DEFAULT_TARGET_SECONDS
+from ffmpeg_utils import run_ffmpeg, probe_duration
+from captions import save_spoken_text
+
+logger = logging.getLogger(__name__)
+
+# 문장 끝: 문장부호(+닫는 따옴표/괄호) 뒤에 공백이 와야 확정 ('73.5%' 의 '.' 에서 자르지 않도록), 또는 줄바꿈
+SENTENCE_END_RE = re.compile(r'[.!?。…]+["\'”’」』)]*(?=\s)|\n')
+# ElevenLabs previous_text 로 넘길 앞 문맥 길이
+PREVIOUS_TEXT_CHARS = 300
+
+
+class SentenceSplitter:
+    """토큰 조각을 받아 완성된 문장만 내보냄 (남은 조각은 다음 feed 또는 flush 에서)"""
+
+    def __init__(self):
+        self.buffer = ''
+
+    def feed(self, delta: str) -> List[str]:
+        self.buffer += delta
+        sentences, start = [], 0
+        for match in SENTENCE_END_RE.finditer(self.buffer):
+            sentences.append(self.buffer[start:match.end()])
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return [s for s in sentences if s.strip()]
+
+    def flush(self) -> List[str]:
+        rest, self.buffer = self.buffer, ''
+        return [rest] if rest.strip() else []
+
+
+class StreamingSpeechPipeline:
+    """스크립트 생성(stream)과 TTS 를 겹쳐 실행: 완성된 문장부터 합성 요청 → 끝나면 순서대로 이어 붙임
+
+    synthesize(text, output_path, previous_text): 조각 1개 합성 (예: AudioGenerator.synthesize_segment)
+    """
+
+    def __init__(self, synthesize: Callable[[str, str, str], str], voice_id: str = '',
+                 segment_dir: str = 'static/audio/segments', max_workers: Optional[int] = None,
+                 min_chars: int = 30, target_seconds: float = DEFAULT_TARGET_SECONDS,
+                 segment_ttl_hours: Optional[float] = None):
+        self.synthesize = synthesize
+        self.voice_id = voice_id
+        self.segment_dir = segment_dir
+        # 동시 합성 수는 ElevenLabs 요금제의 동시 요청 한도 안에서
+        self.max_workers = max_workers or int(os.getenv('TTS_STREAM_WORKERS', 3))
+        # 너무 짧은 문장은 다음 문장과 묶음 (요청당 고정 지연 + 조각 경계의 억양 끊김 감소)
+        self.min_chars = min_chars
+        self.target_seconds = target_seconds
+        # 조각 캐시는 워크플로우 재시도 동안만 필요 → 마지막 사용 후 TTL 이 지나면 삭제
+        self.segment_ttl = (segment_ttl_hours or float(os.getenv('TTS_SEGMENT_TTL_HOURS', 24))) * 3600
+
+    def evict_segments(self) -> int:
+        """마지막 사용 시각(mtime)이 TTL 을 넘은 조각 삭제, 삭제한 개수 반환"""
+        if not os.path.isdir(self.segment_dir):
+            return 0
+        cutoff, removed = time.time() - self.segment_ttl, 0
+        for name in os.listdir(self.segment_dir):
+            path = os.path.join(self.segment_dir, name)
+            try:
+                if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                # 다른 프로세스가 먼저 지웠거나 쓰는 중
+                continue
+        if removed:
+            logger.info(f"🧹 오래된 TTS 조각 {removed}개 삭제: {self.segment_dir}")
+        return removed
+
+    def _segment(self, text: str, previous_text: str) -> str:
+        """같은 문장/문맥/보이스면 같은 파일 → 워크플로우 재시도 시 이미 합성한 조각은 재사용"""
+        digest = hashlib.sha256(f"{self.voice_id}|{previous_text}|{text}".encode('utf-8')).hexdigest()[:24]
+        path = os.path.join(self.segment_dir, f"seg_{digest}.mp3")
+        if os.path.exists(path):
+            # 재사용한 조각은 사용 시각 갱신 (evict_segments 에서 지워지지 않도록)
+            os.utime(path)
+            return path
+        return self.synthesize(text, path, previous_text)
+
+    def _concat(self, segments: List[str], output_path: str) -> str:
+        if len(segments) == 1:
+            shutil.copyfile(segments[0], output_path)
+            return output_path
+        list_path = f"{output_path}.concat.txt"
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for path in segments:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path])
+        finally:
+            os.remove(list_path)
+        return output_path
+
+    def run(self, deltas: Iterable[str], output_path: str = "audio.mp3", postprocess: bool = True) -> Dict[str, Any]:
+        """{'script': 원문 전체, 'spoken': 합성한 텍스트, 'audio': 오디오 경로, 'segments', 'timings'}
+
+        스트리밍 중에는 전체 길이를 모르므로 낭독 예상 길이가 목표를 넘는 시점부터 나머지 문장은 합성하지 않음
+        """
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self.evict_segments()
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        splitter = SentenceSplitter()
+        parts: List[str] = []
+        spoken: List[str] = []
+        futures: List[Future] = []
+        pending = ''
+        budget_reached = False
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='tts-stream')
+
+        def dispatch(text: str):
+            nonlocal budget_reached
+            if budget_reached or not text:
+                return
+            if speech_model.estimate(' '.join(spoken + [text]), self.voice_id) > self.target_seconds:
+                budget_reached = True
+                logger.info(f"✂️ 목표 {self.target_seconds:.0f}초 도달: 이후 문장은 합성하지 않음")
+                return
+            previous_text = ' '.join(spoken)[-PREVIOUS_TEXT_CHARS:]
+            spoken.append(text)
+            futures.append(pool.submit(self._segment, text, previous_text))
+            timings.setdefault('first_dispatch', time.perf_counter() - started)
+
+        try:
+            for delta in deltas:
+                timings.setdefault('first_token', time.perf_counter() - started)
+                parts.append(delta)
+                for sentence in splitter.feed(delta):
+                    pending = f"{pending} {tts_normalizer.normalize(sentence)}".strip()
+                    if len(pending) >= self.min_chars:
+                        dispatch(pending)
+                        pending = ''
+            for sentence in splitter.flush():
+                pending = f"{pending} {tts_normalizer.normalize(sentence)}".strip()
+            dispatch(pending)
+            timings['script_done'] = time.perf_counter() - started
+            segments = [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            pool.shutdown(wait=False)
+
+        if not segments:
+            raise ValueError("합성할 문장이 없음 (빈 스크립트)")
+        timings['tts_done'] = time.perf_counter() - started
+        audio_path = self._concat(segments, output_path)
+        if postprocess:
+            audio_path = audio_postprocessor.process(audio_path)
+        spoken_text = ' '.join(spoken)
+        speech_model.record(self.voice_id, spoken_text, probe_duration(audio_path))
+        # 자막은 실제로 합성한 문장 기준으로 시간을 맞춤 (목표 길이에서 잘린 문장은 자막에서도 빠짐)
+        save_spoken_text(audio_path, spoken_text)
+        timings['audio_ready'] = time.perf_counter() - started
+
+        logger.info(f"🎙️ 스트리밍 합성: 조각 {len(segments)}개, 첫 토큰 {timings.get('first_token', 0):.2f}초, "
+                    f"스크립트 완료 {timings['script_done']:.2f}초, 오디오 준비 {timings['audio_ready']:.2f}초")
+        return {'script': ''.join(parts).strip(), 'spoken': spoken_text, 'audio': audio_path,
+                'segments': segments, 'timings': {k: round(v, 3) for k, v in timings.items()}}
+
+
+def stream_script_to_audio(trend_data: Dict[str, Any], output_path: str = "audio.mp3", target_duration: int = 60,
+                           postprocess: bool = True) -> Dict[str, Any]:
+    """ScriptGenerator 스트리밍 + AudioGenerator 조각 합성 (작업 시작 → 오디오 준비 ≈ max(LLM, TTS))"""
+    from secure_generate_script import script_generator
+    from secure_generate_audio import audio_generator
+    pipeline = StreamingSpeechPipeline(audio_generator.synthesize_segment, audio_generator.voice_id,
+                                       target_seconds=min(target_duration, DEFAULT_TARGET_SECONDS))
+    return pipeline.run(script_generator.stream_script(trend_data, target_duration), output_path, postprocess)
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    # 벤치마크: 로컬 대체 서버(LLM: 조각당 지연, TTS: 기본 지연 + 글자당 지연)로
+    # 순차(완성 응답 → 전체 TTS) vs 스트리밍(문장별 동시 TTS) 작업 시작~오디오 준비 시간 비교
+    token_delay = float(sys.argv[1]) if len(sys.argv) > 1 else 0.03
+    tts_base, tts_per_char = 0.4, 0.008
+    script = (
+        "여러분, 오늘은 인공지능이 바꾸는 일상에 대해 이야기해 볼게요! "
+        "요즘 스마트폰 사진 앱은 AI가 자동으로 보정을 해줘요. "
+        "번역 앱은 실시간 대화까지 통역해 주고요. "
+        "병원에서는 AI가 엑스레이 사진을 보고 의사보다 먼저 이상 징후를 찾아내기도 합니다. "
+        "물론 개인정보 문제 같은 숙제도 남아 있어요. "
+        "그래도 우리 생활이 더 편해지고 있다는 건 분명하죠. "
+        "여러분은 어떤 AI 서비스를 가장 많이 쓰시나요? 댓글로 알려주세요!"
+    )
+    chunks = [script[i:i + 3] for i in range(0, len(script), 3)]
+
+    work_dir = tempfile.mkdtemp(prefix="stream_bench_")
+    os.chdir(work_dir)  # 쿼터/보정/캐시 파일이 실제 static/ 에 섞이지 않도록
+    silence = os.path.join(work_dir, "tone.mp3")
+    run_ffmpeg(["-f", "lavfi", "-i", "sine=frequency=440:duration=1", "-c:a", "libmp3lame", "-b:a", "64k", silence])
+    with open(silence, 'rb') as f:
+        audio_bytes = f.read()
+
+    class StandIn(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body: bytes, content_type: str):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])) or b'{}')
+            if self.path.endswith('/chat/completions'):
+                if not payload.get('stream'):
+                    time.sleep(token_delay * len(chunks))
+                    body = {'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': script},
+                                         'finish_reason': 'stop'}], 'usage': None}
+                    return self._send(json.dumps(body).encode(), 'application/json')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for chunk in chunks:
+                    time.sleep(token_delay)
+                    event = {'choices': [{'index': 0, 'delta': {'content': chunk}, 'finish_reason': None}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                return
+            time.sleep(tts_base + tts_per_char * len(payload.get('text', '')))
+            self._send(audio_bytes, 'audio/mpeg')
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update(ELEVENLABS_BASE_URL=base_url, ELEVENLABS_KEY='local', ELEVENLABS_VOICE_ID='bench')
+
+    import openai
+    from secure_generate_audio import AudioGenerator
+    client = openai.OpenAI(api_key='sk-local', base_url=f"{base_url}/v1", max_retries=0)
+    generator = AudioGenerator()
+    request = {'model': 'gpt-3.5-turbo', 'messages': [{'role': 'user', 'content': 'bench'}]}
+
+    started = time.perf_counter()
+    full = client.chat.completions.create(**request).choices[0].message.content
+    llm_seconds = time.perf_counter() - started
+    tts_started = time.perf_counter()
+    generator.synthesize_segment(tts_normalizer.normalize(full), os.path.join(work_dir, "sequential.mp3"))
+    tts_seconds = time.perf_counter() - tts_started
+    sequential = time.perf_counter() - started
+
+    def deltas():
+        for chunk in client.chat.completions.create(stream=True, **request):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    pipeline = StreamingSpeechPipeline(generator.synthesize_segment, 'bench', os.path.join(work_dir, "segments"),
+                                       target_seconds=600)
+    result = pipeline.run(deltas(), os.path.join(work_dir, "streamed.mp3"), postprocess=False)
+    server.shutdown()
+
+    print(f"LLM {llm_seconds:.2f}초, TTS(전체) {tts_seconds:.2f}초 → 순차 {sequential:.2f}초")
+    print(f"스트리밍: 조각 {len(result['segments'])}개, 첫 합성 요청 {result['timings']['first_dispatch']:.2f}초, "
+          f"오디오 준비 {result['timings']['tts_done']:.2f}초 (max(LLM, TTS) = {max(llm_seconds, tts_seconds):.2f}초)")
@@ -1,6 +1,7 @@
 # test_env.py 파일 생성 후 실행
 import os
 from dotenv import load_dotenv
+from key_health import key_health, configured_keys, format_report
 
 load_dotenv()
 
@@ -19,3 +20,8 @@ for key in required_keys:
 # OPENAI 키 개수 확인
 if os.getenv('OPENAI_API_KEYS'):
     print(f"\nOPENAI 키 개수: {len(os.getenv('OPENAI_API_KEYS').split(';'))}")
+
+# OPENAI 키 상태 (캐시 무시하고 다시 점검)
+if configured_keys():
+    for line in format_report(key_health.check(configured_keys(), force=True)):
+        print(line)
@@ -0,0 +1,43 @@
+# tests/test_tts_normalizer.py
+import pytest
+from tts_normalizer import TTSNormalizer
+
+# 입력 → 기대 낭독
+READINGS = [
+    ('2024년', '이천이십사년'),
+    ('1,200억 달러', '천이백억 달러'),
+    ('73.5%', '칠십삼점오퍼센트'),
+    ('$300', '삼백달러'),
+    ('5000mAh', '오천밀리암페어시'),
+    ('3가지', '세가지'),
+    ('21명', '스물한명'),
+    ('20살', '스무살'),
+    ('12개월', '십이개월'),
+    ('3~5개', '세에서 다섯개'),
+    ('1번째 이유', '첫 번째 이유'),
+    ('2번째', '두번째'),
+    ('1~3번째', '첫 번째에서 세번째'),
+    ('100km/h', '시속 백킬로미터'),
+    ('시속 60km/h로', '시속 육십킬로미터로'),
+    ('10m/s 바람', '초속 십미터 바람'),
+    ('초속 10m/s', '초속 십미터'),
+    ('1km', '일킬로미터'),
+    ('10ms', '십밀리초'),
+    ('010', '영일영'),
+    ('GPT-4', 'GPT-4'),
+]
+
+
+@pytest.mark.parametrize('text, spoken', READINGS)
+def test_readings(text, spoken):
+    assert TTSNormalizer.normalize(text) == spoken
+
+
+def test_markup_removed():
+    script = "**1. 훅 (3-5초):** 🔥 여러분, 알고 계셨나요?!\n[효과음: 띠링]\n#AI #트렌드"
+    assert TTSNormalizer.normalize(script) == "여러분, 알고 계셨나요?!"
+
+
+def test_idempotent():
+    spoken = TTSNormalizer.normalize("시속 60km/h, 1번째로 3~5개 → 구독!")
+    assert TTSNormalizer.normalize(spoken) == spoken
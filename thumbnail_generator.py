@@ -1,23 +1,275 @@
 # thumbnail_generator.py
-from PIL import Image, ImageDraw, ImageFont
+import io
 import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from retry_policy import get_policy
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (1280, 720)
+# YouTube thumbnails.set 업로드 한도
+MAX_THUMBNAIL_BYTES = 2 * 1024 * 1024
+# Pillow subsampling 값 → 크로마 샘플링
+SUBSAMPLING = {0: '4:4:4', 1: '4:2:2', 2: '4:2:0'}
+
+
+def _load_font(size: int):
+    font_path = "malgun.ttf" if os.name == 'nt' else "/usr/share/fonts/truetype/nanum/NanumGothic.ttf"
+    for path in (font_path, "malgun.ttf", "arial.ttf"):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def render_thumbnail(title: str, background: Optional[str] = None,
+                     size: Tuple[int, int] = THUMBNAIL_SIZE) -> Image.Image:
+    """제목 배경 이미지 위에 제목 텍스트를 그린 썸네일 (인코딩 전 원본)"""
+    if background is None:
+        from background_generator import background_library
+        background = background_library.get(title, size=size)
+    img = Image.open(background).convert('RGB')
+    if img.size != size:
+        img = img.resize(size, Image.LANCZOS)
+    d = ImageDraw.Draw(img)
+    font = _load_font(60)
+    wrapped_title = "\n".join([title[i:i+20] for i in range(0, len(title), 20)])
+    d.multiline_text((100, 200), wrapped_title, fill=(255, 255, 0), font=font, spacing=30)
+    return img
+
+
+def psnr(reference: np.ndarray, decoded: np.ndarray) -> float:
+    mse = np.mean((reference.astype(np.float32) - decoded.astype(np.float32)) ** 2)
+    return float('inf') if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+
+class ThumbnailEncoder:
+    """2MB 이하 + 목표 PSNR 이상을 만족하는 가장 작은 JPEG 을 품질/프로그레시브/크로마 샘플링 탐색으로 선택"""
+
+    def __init__(self, max_bytes: int = MAX_THUMBNAIL_BYTES, min_psnr: float = 38.0,
+                 quality_range: Tuple[int, int] = (40, 95), workers: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.min_psnr = float(os.getenv('THUMBNAIL_MIN_PSNR', min_psnr))
+        self.quality_range = quality_range
+        # Pillow 는 JPEG 인코딩 중 GIL 을 풀기 때문에 스레드로도 코어 수만큼 병렬 인코딩됨
+        self.workers = workers or int(os.getenv('THUMBNAIL_WORKERS', os.cpu_count() or 2))
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    @staticmethod
+    def _encode(image: Image.Image, quality: int, subsampling: int, progressive: bool) -> bytes:
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=quality, subsampling=subsampling,
+                   progressive=progressive, optimize=True)
+        return buffer.getvalue()
+
+    # ========================
+    # 탐색
+    # ========================
+    def search(self, image: Image.Image) -> Tuple[bytes, Dict[str, Any]]:
+        """(JPEG 바이트, 선택된 설정). 목표 PSNR 을 못 맞추면 한도 안에서 가장 높은 PSNR 로 대체"""
+        image = image.convert('RGB')
+        reference = np.asarray(image)
+        low, high = self.quality_range
+        best: Optional[Tuple[bytes, Dict[str, Any]]] = None
+        fallback: Optional[Tuple[bytes, Dict[str, Any]]] = None
+
+        for subsampling in SUBSAMPLING:
+            # 화질은 quality/subsampling 으로만 정해지므로(프로그레시브는 같은 계수의 저장 순서만 다름) 기준 인코딩으로 탐색
+            trials: Dict[int, Tuple[bytes, float]] = {}
+
+            def trial(quality: int) -> Tuple[bytes, float]:
+                if quality not in trials:
+                    data = self._encode(image, quality, subsampling, False)
+                    decoded = np.asarray(Image.open(io.BytesIO(data)).convert('RGB'))
+                    trials[quality] = (data, psnr(reference, decoded))
+                return trials[quality]
+
+            # 목표 PSNR 을 만족하는 최저 품질 (PSNR 은 품질에 대해 단조 증가)
+            lo, hi, found = low, high, None
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                if trial(mid)[1] >= self.min_psnr:
+                    found, hi = mid, mid - 1
+                else:
+                    lo = mid + 1
+
+            if found is None:
+                # 목표 미달: 한도 안에서 가장 높은 품질을 대체 후보로
+                for quality in sorted(trials, reverse=True):
+                    data, score = trials[quality]
+                    if len(data) <= self.max_bytes:
+                        if fallback is None or score > fallback[1]['psnr']:
+                            fallback = (data, self._info(data, quality, subsampling, False, score))
+                        break
+                continue
+
+            baseline, score = trial(found)
+            for progressive, data in ((False, baseline), (True, self._encode(image, found, subsampling, True))):
+                if len(data) <= self.max_bytes and (best is None or len(data) < best[1]['bytes']):
+                    best = (data, self._info(data, found, subsampling, progressive, score))
+
+        result = best or fallback
+        if result is None:
+            raise ValueError(f"썸네일을 {self.max_bytes}바이트 이하로 인코딩할 수 없음")
+        if best is None:
+            logger.warning(f"⚠️ 썸네일 목표 PSNR {self.min_psnr}dB 미달: {result[1]['psnr']:.1f}dB 로 대체")
+        return result
+
+    @staticmethod
+    def _info(data: bytes, quality: int, subsampling: int, progressive: bool, score: float) -> Dict[str, Any]:
+        return {'bytes': len(data), 'quality': quality, 'subsampling': SUBSAMPLING[subsampling],
+                'progressive': progressive, 'psnr': round(score, 2)}
+
+    def encode(self, image: Image.Image, output_path: str) -> Dict[str, Any]:
+        data, info = self.search(image)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, output_path)
+        info['path'] = output_path
+        logger.info(f"🖼️ 썸네일 인코딩: {output_path} {info['bytes'] / 1024:.0f}KB "
+                    f"(q{info['quality']}, {info['subsampling']}, "
+                    f"{'progressive' if info['progressive'] else 'baseline'}, {info['psnr']}dB)")
+        return info
+
+    def make(self, title: str, output_path: str = "thumbnail.jpg") -> Dict[str, Any]:
+        return self.encode(render_thumbnail(title), output_path)
+
+    # ========================
+    # 백그라운드 / 일괄 처리
+    # ========================
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='thumbnail')
+            return self._pool
+
+    def submit(self, title: str, output_path: str = "thumbnail.jpg") -> Future:
+        """영상 제작과 동시에 썸네일을 미리 렌더링/인코딩 (결과: make() 의 info)"""
+        return self.pool.submit(self.make, title, output_path)
+
+    def encode_batch(self, jobs: Sequence[Tuple[str, str]]) -> List[Optional[Dict[str, Any]]]:
+        """(제목, 출력 경로) 목록을 병렬 인코딩. 실패한 항목은 None"""
+        futures = [self.submit(title, path) for title, path in jobs]
+        results = []
+        for (title, _), future in zip(jobs, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"❌ 썸네일 생성 실패 ({title}): {str(e)}")
+                results.append(None)
+        return results
+
+
+class ThumbnailUploader:
+    """thumbnails.set 을 백그라운드 스레드에서 실행 → 영상 업로드/다음 작업을 막지 않음
+
+    업로드/댓글 요청과 같은 클라이언트를 쓰면 httplib2.Http 를 여러 스레드가 공유하게 되므로
+    작업 스레드마다 service_factory 로 만든 별도 서비스를 사용
+    """
+
+    def __init__(self, workers: int = 2):
+        self.policy = get_policy('thumbnail')
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail-upload')
+        self._pending: List[Future] = []
+        self._local = threading.local()
+
+    def _service(self, service_factory: Callable[[], Any]):
+        # 바운드 메서드는 접근할 때마다 새 객체라서 동일성 대신 == 로 비교
+        if getattr(self._local, 'factory', None) != service_factory:
+            self._local.factory = service_factory
+            self._local.youtube = service_factory()
+        return self._local.youtube
+
+    def _set(self, service_factory: Callable[[], Any], video_id: str, path: str) -> bool:
+        from googleapiclient.http import MediaFileUpload
+
+        def _attempt(attempt):
+            youtube = self._service(service_factory)
+            return youtube.thumbnails().set(
+                videoId=video_id,
+                media_body=MediaFileUpload(path, mimetype='image/jpeg')
+            ).execute()
+
+        try:
+            self.policy.run(_attempt, stage='thumbnail')
+            logger.info(f"🖼️ 썸네일 설정 완료: {video_id}")
+            return True
+        except Exception as e:
+            # 썸네일 실패는 영상 업로드 실패가 아님 (예: 맞춤 썸네일 미인증 채널)
+            logger.error(f"❌ 썸네일 설정 실패 ({video_id}): {str(e)}")
+            return False
+
+    def submit(self, service_factory: Callable[[], Any], video_id: str, path: str) -> Future:
+        """service_factory: 인증된 YouTube 서비스를 새로 만드는 함수 (스레드별로 한 번 호출)"""
+        future = self._pool.submit(self._set, service_factory, video_id, path)
+        self._pending = [f for f in self._pending if not f.done()] + [future]
+        return future
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """대기 중인 썸네일 업로드 완료까지 대기. 성공 개수 반환"""
+        pending, self._pending = self._pending, []
+        done = 0
+        for future in pending:
+            try:
+                done += bool(future.result(timeout))
+            except Exception:
+                continue
+        return done
+
 
 def generate_thumbnail(text, output_path="thumbnail.jpg"):
-    width, height = 1280, 720
+    width, height = THUMBNAIL_SIZE
     image = Image.new("RGB", (width, height), color="black")
     draw = ImageDraw.Draw(image)
-
-    try:
-        font = ImageFont.truetype("arial.ttf", 60)
-    except:
-        font = ImageFont.load_default()
+    font = _load_font(60)
 
     text = text[:50]
-    textwidth, textheight = draw.textsize(text, font=font)
-    x = (width - textwidth) / 2
-    y = (height - textheight) / 2
+    # Pillow 10 에서 textsize 제거 → textbbox 로 크기 계산
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    x = (width - (right - left)) / 2 - left
+    y = (height - (bottom - top)) / 2 - top
 
     draw.text((x, y), text, font=font, fill="white")
-    image.save(output_path)
-    return output_path
+    return thumbnail_encoder.encode(image, output_path)['path']
+
+
+# 썸네일 인코더 / 업로더 인스턴스
+thumbnail_encoder = ThumbnailEncoder()
+thumbnail_uploader = ThumbnailUploader()
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import tempfile
+    from logging_setup import setup_logging
+    setup_logging()
+
+    # 벤치마크: 고정 설정(q95, 4:4:4) 대비 크기 + 순차 vs 병렬 일괄 인코딩 시간
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    work_dir = tempfile.mkdtemp(prefix="thumb_bench_")
+    jobs = [(f"오늘의 트렌드 {idx}번 주제 정리", os.path.join(work_dir, f"thumb_{idx}.jpg")) for idx in range(count)]
+    images = [render_thumbnail(title) for title, _ in jobs]
+
+    naive = sum(len(ThumbnailEncoder._encode(image, 95, 0, False)) for image in images)
+    started = time.perf_counter()
+    for image, (_, path) in zip(images, jobs):
+        thumbnail_encoder.encode(image, path)
+    sequential = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = thumbnail_encoder.encode_batch(jobs)
+    parallel = time.perf_counter() - started
+    searched = sum(info['bytes'] for info in results if info)
 
+    print(f"고정 q95: 평균 {naive / count / 1024:.0f}KB, 탐색: 평균 {searched / count / 1024:.0f}KB")
+    print(f"순차 {sequential:.2f}초, 병렬({thumbnail_encoder.workers}) {parallel:.2f}초")
@@ -0,0 +1,216 @@
+# topic_queue.py
+import os
+import re
+import json
+import math
+import time
+import heapq
+import logging
+import unicodedata
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: 단일 프로세스 실행만 가정
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_topic(topic: str) -> str:
+    """중복 판정용 주제 키 (전각/대소문자/공백/문장부호 차이 무시)"""
+    text = unicodedata.normalize('NFKC', topic or '').lower()
+    return re.sub(r'[\W_]+', '', text)
+
+
+class TopicQueue:
+    """트렌드 주제 우선순위 큐. 점수 = 트렌드 값 × 반감기 감쇠, 이미 게시한 주제는 제외
+
+    log(값 × 2^-(now - seen_at)/반감기) = [log(값) + λ·seen_at] - λ·now 이므로
+    대괄호 부분(priority)만 힙 키로 쓰면 시간이 지나도 순서가 변하지 않아 재정렬이 필요 없음
+    """
+
+    def __init__(self, queue_file: str = 'static/logs/topic_queue.json', half_life_hours: Optional[float] = None,
+                 min_score: float = 1.0, claim_ttl_hours: float = 24, keep_published_days: int = 30):
+        self.queue_file = queue_file
+        half_life = half_life_hours or float(os.getenv('TOPIC_HALF_LIFE_HOURS', 12))
+        self.decay = math.log(2) / (half_life * 3600)
+        self.min_score = min_score
+        self.claim_ttl = claim_ttl_hours * 3600
+        self.keep_published = keep_published_days * 86400
+
+    # ========================
+    # 저장소 (읽기-수정-쓰기 전체를 파일 잠금으로 보호)
+    # ========================
+    def _load(self) -> Dict[str, Any]:
+        if os.path.exists(self.queue_file):
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        else:
+            state = {}
+        state.setdefault('heap', [])
+        state.setdefault('entries', {})
+        state.setdefault('claimed', {})
+        state.setdefault('published', {})
+        return state
+
+    def _save(self, state: Dict[str, Any]):
+        tmp_path = f"{self.queue_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.queue_file)
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(os.path.dirname(self.queue_file) or '.', exist_ok=True)
+        with open(f"{self.queue_file}.lock", 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            state = self._load()
+            self._expire(state, time.time())
+            yield state
+            self._save(state)
+
+    # ========================
+    # 점수
+    # ========================
+    def priority(self, value: float, seen_at: float) -> float:
+        return math.log(value) + self.decay * seen_at
+
+    def score(self, entry: Dict[str, Any], now: Optional[float] = None) -> float:
+        """현재 시각 기준 감쇠된 트렌드 값"""
+        return math.exp(entry['priority'] - self.decay * (now or time.time()))
+
+    def _push(self, state: Dict[str, Any], entry: Dict[str, Any]):
+        state['entries'][entry['key']] = entry
+        # 힙에는 음수 priority (heapq 는 최소 힙). 갱신된 항목의 옛 힙 원소는 pop 시 건너뜀
+        heapq.heappush(state['heap'], [-entry['priority'], entry['key']])
+
+    def _expire(self, state: Dict[str, Any], now: float):
+        # 처리 중에 죽은 작업의 주제는 다시 큐로
+        for key, entry in list(state['claimed'].items()):
+            if now - entry['claimed_at'] > self.claim_ttl:
+                del state['claimed'][key]
+                if key not in state['published'] and key not in state['entries']:
+                    self._push(state, {k: v for k, v in entry.items() if k != 'claimed_at'})
+        for key, published_at in list(state['published'].items()):
+            if now - published_at > self.keep_published:
+                del state['published'][key]
+        # 감쇠로 의미가 없어진 주제 제거 + 힙을 살아 있는 항목만으로 재구성
+        for key, entry in list(state['entries'].items()):
+            if self.score(entry, now) < self.min_score:
+                del state['entries'][key]
+        if len(state['heap']) > 2 * len(state['entries']) + 16:
+            state['heap'] = [[-entry['priority'], key] for key, entry in state['entries'].items()]
+            heapq.heapify(state['heap'])
+
+    # ========================
+    # 큐 연산
+    # ========================
+    def push_many(self, trends: Sequence[Dict[str, Any]], seen_at: Optional[float] = None) -> int:
+        """trends: {'topic', 'category', 'score'}. 새로 들어가거나 점수가 올라간 주제 수 반환"""
+        seen_at = seen_at or time.time()
+        added = 0
+        with self._locked() as state:
+            for trend in trends:
+                key = normalize_topic(trend.get('topic', ''))
+                value = float(trend.get('score') or 0)
+                if not key or value <= 0 or key in state['published'] or key in state['claimed']:
+                    continue
+                priority = self.priority(value, seen_at)
+                current = state['entries'].get(key)
+                if current and current['priority'] >= priority:
+                    continue
+                self._push(state, {'key': key, 'topic': trend['topic'], 'category': trend.get('category', ''),
+                                   'score': value, 'seen_at': seen_at, 'priority': priority})
+                added += 1
+            queued = len(state['entries'])
+        logger.info(f"📈 주제 큐: {added}개 추가/갱신 (대기 {queued}개)")
+        return added
+
+    def pop(self) -> Optional[Dict[str, Any]]:
+        """현재 점수가 가장 높은 주제를 꺼내 처리 중으로 표시. 큐가 비었으면 None"""
+        now = time.time()
+        with self._locked() as state:
+            while state['heap']:
+                neg_priority, key = heapq.heappop(state['heap'])
+                entry = state['entries'].get(key)
+                if entry is None or entry['priority'] != -neg_priority:
+                    continue
+                del state['entries'][key]
+                state['claimed'][key] = dict(entry, claimed_at=now)
+                return self._as_trend(entry, now)
+        return None
+
+    def peek(self, count: int = 10) -> List[Dict[str, Any]]:
+        """꺼내지 않고 상위 count 개 조회 (예: 다음 날 배치 스크립트 주제)"""
+        now = time.time()
+        state = self._load()
+        entries = [e for e in state['entries'].values() if e['key'] not in state['published']]
+        top = heapq.nlargest(count, entries, key=lambda e: e['priority'])
+        return [self._as_trend(entry, now) for entry in top]
+
+    def release(self, trend: Dict[str, Any]):
+        """처리하지 못한 주제를 원래 점수 그대로 큐에 되돌림"""
+        key = normalize_topic(trend.get('topic', ''))
+        with self._locked() as state:
+            entry = state['claimed'].pop(key, None)
+            if entry and key not in state['published']:
+                self._push(state, {k: v for k, v in entry.items() if k != 'claimed_at'})
+
+    def mark_published(self, trend: Dict[str, Any]):
+        key = normalize_topic(trend.get('topic', ''))
+        if not key:
+            return
+        with self._locked() as state:
+            state['claimed'].pop(key, None)
+            state['entries'].pop(key, None)
+            state['published'][key] = time.time()
+
+    def current_score(self, trend: Dict[str, Any]) -> float:
+        """처리 중/대기 중인 주제의 지금 시점 감쇠 점수 (큐에 없으면 trend 의 점수)"""
+        key = normalize_topic(trend.get('topic', ''))
+        state = self._load()
+        entry = state['claimed'].get(key) or state['entries'].get(key)
+        return round(self.score(entry), 1) if entry else float(trend.get('score') or 0)
+
+    def is_published(self, topic: str) -> bool:
+        return normalize_topic(topic) in self._load()['published']
+
+    def __len__(self) -> int:
+        return len(self._load()['entries'])
+
+    def _as_trend(self, entry: Dict[str, Any], now: float) -> Dict[str, Any]:
+        return {'topic': entry['topic'], 'category': entry['category'],
+                'score': round(self.score(entry, now), 1), 'trend_value': entry['score']}
+
+
+# 주제 큐 인스턴스
+topic_queue = TopicQueue()
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    # 벤치마크: 불변 키 힙 vs 매번 감쇠 점수로 전체 정렬
+    count = 20000
+    bench = TopicQueue(os.path.join(tempfile.mkdtemp(prefix="topic_bench_"), "queue.json"), min_score=0.01)
+    rng = random.Random(0)
+    now = time.time()
+    entries = [{'key': f"t{i}", 'topic': f"주제 {i}", 'category': '', 'score': rng.randint(1, 100),
+                'seen_at': now - rng.uniform(0, 72 * 3600)} for i in range(count)]
+    for entry in entries:
+        entry['priority'] = bench.priority(entry['score'], entry['seen_at'])
+
+    started = time.perf_counter()
+    heap = [[-e['priority'], e['key']] for e in entries]
+    heapq.heapify(heap)
+    heap_order = [heapq.heappop(heap)[1] for _ in range(100)]
+    heap_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    sorted_order = [e['key'] for e in sorted(entries, key=lambda e: -e['score'] * 2 ** (
+        -(now - e['seen_at']) * bench.decay / math.log(2)))][:100]
+    sort_ms = (time.perf_counter() - started) * 1000
+    print(f"힙: {heap_ms:.1f}ms, 정렬: {sort_ms:.1f}ms, 상위 100개 순서 일치: {heap_order == sorted_order}")
@@ -0,0 +1,306 @@
+# transport.py
+import io
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from retry_policy import PermanentError
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'record', 'replay')
+# 키에서 제외할 값 (인증 정보는 카세트에 남기지 않음)
+SECRET_PARAMS = {'key', 'api_key', 'access_token', 'token', 'client_secret', 'refresh_token'}
+SECRET_HEADERS = {'authorization', 'proxy-authorization', 'xi-api-key', 'api-key', 'cookie', 'set-cookie',
+                  'x-goog-api-key'}
+# 응답 본문(JSON)에서 가릴 필드 (OAuth 토큰 갱신 응답의 access_token/id_token 등)
+SECRET_FIELDS = SECRET_PARAMS | {'id_token'}
+TOKEN_ENDPOINT_RE = re.compile(r'/(?:o/)?oauth2/.*token|/token$')
+REDACTED = 'REDACTED'
+BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?')
+
+
+class CassetteMiss(PermanentError):
+    """재생 모드에서 녹화되지 않은 요청 (재시도해도 결과가 같으므로 즉시 실패)"""
+
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def _body_digest(body: Any, content_type: str = '') -> str:
+    if body is None:
+        return ''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if not isinstance(body, (bytes, bytearray)):
+        return '<stream>'
+    body = bytes(body)
+    match = BOUNDARY_RE.search(content_type or '')
+    if match:
+        # multipart 경계 문자열은 요청마다 무작위라서 고정값으로 치환
+        body = body.replace(match.group(1).encode('ascii', 'ignore'), b'BOUNDARY')
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False).encode('utf-8')
+    except ValueError:
+        pass
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SECRET_FIELDS else _redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def redact_body(url: str, content: bytes) -> bytes:
+    """카세트에 저장할 본문에서 토큰/시크릿 값을 가림. 읽을 수 없는 토큰 엔드포인트 응답은 저장하지 않음"""
+    try:
+        data = json.loads(content)
+    except (ValueError, UnicodeDecodeError):
+        if TOKEN_ENDPOINT_RE.search(urlsplit(url).path):
+            logger.warning(f"📼 토큰 응답을 해석할 수 없어 본문 없이 녹화: {_normalize_url(url)}")
+            return b''
+        return content
+    redacted = _redact(data)
+    return content if redacted == data else json.dumps(redacted, ensure_ascii=False).encode('utf-8')
+
+
+class Cassette:
+    """요청 키별 응답을 녹화 순서대로 저장. 본문은 내용 해시로 한 번만 저장(압축되면 zlib)"""
+
+    def __init__(self, root: str, latency: float = 0.0):
+        self.root = root
+        self.latency = latency
+        self.index_file = os.path.join(root, 'cassette.json')
+        self.bodies_dir = os.path.join(root, 'bodies')
+        self._lock = threading.Lock()
+        self._cursor: Dict[str, int] = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.interactions: List[Dict[str, Any]] = json.load(f)
+        else:
+            self.interactions = []
+
+    @staticmethod
+    def make_key(method: str, url: str, body: Any, content_type: str = '') -> Tuple[str, str]:
+        """(정확한 키, 느슨한 키). 느슨한 키는 본문을 무시하고 메서드+경로만 사용"""
+        normalized = _normalize_url(url)
+        exact = f"{method.upper()} {normalized} {_body_digest(body, content_type)}"
+        loose = f"{method.upper()} {urlsplit(normalized).netloc}{urlsplit(normalized).path}"
+        return exact, loose
+
+    # ========================
+    # 녹화
+    # ========================
+    def _put_body(self, content: bytes) -> Dict[str, Any]:
+        digest = hashlib.sha256(content).hexdigest()
+        compressed = zlib.compress(content, 6)
+        use_zlib = len(compressed) < len(content) * 0.9
+        name = f"{digest[:32]}.{'z' if use_zlib else 'bin'}"
+        path = os.path.join(self.bodies_dir, name)
+        if not os.path.exists(path):
+            os.makedirs(self.bodies_dir, exist_ok=True)
+            with open(f"{path}.tmp", 'wb') as f:
+                f.write(compressed if use_zlib else content)
+            os.replace(f"{path}.tmp", path)
+        return {'body': name, 'size': len(content)}
+
+    def record(self, method: str, url: str, body: Any, content_type: str, status: int,
+               headers: Dict[str, str], content: bytes, elapsed: float, reason: str = ''):
+        exact, loose = self.make_key(method, url, body, content_type)
+        entry = {
+            'key': exact,
+            'loose': loose,
+            'status': status,
+            'reason': reason,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in SECRET_HEADERS},
+            'elapsed': round(elapsed, 4),
+            **self._put_body(redact_body(url, content)),
+        }
+        with self._lock:
+            self.interactions.append(entry)
+            self.save()
+        logger.info(f"📼 녹화: {method.upper()} {_normalize_url(url)} → {status} ({entry['size']}B)")
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.interactions, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.index_file)
+
+    # ========================
+    # 재생
+    # ========================
+    def _read_body(self, name: str) -> bytes:
+        with open(os.path.join(self.bodies_dir, name), 'rb') as f:
+            data = f.read()
+        return zlib.decompress(data) if name.endswith('.z') else data
+
+    def replay(self, method: str, url: str, body: Any, content_type: str = '') -> Dict[str, Any]:
+        """같은 요청이 여러 번 녹화됐으면 호출 순서대로 반환 (마지막 이후는 마지막 응답 반복)"""
+        exact, loose = self.make_key(method, url, body, content_type)
+        with self._lock:
+            for field, key in (('key', exact), ('loose', loose)):
+                matches = [entry for entry in self.interactions if entry[field] == key]
+                if matches:
+                    cursor = self._cursor.get(f"{field}:{key}", 0)
+                    self._cursor[f"{field}:{key}"] = cursor + 1
+                    entry = matches[min(cursor, len(matches) - 1)]
+                    if field == 'loose':
+                        logger.warning(f"📼 본문이 다른 요청을 경로 기준으로 재생: {loose}")
+                    break
+            else:
+                raise CassetteMiss(f"녹화되지 않은 요청: {exact}")
+        if self.latency:
+            time.sleep(entry['elapsed'] * self.latency)
+        return {
+            'status': entry['status'],
+            'reason': entry.get('reason', ''),
+            'headers': dict(entry['headers']),
+            'content': self._read_body(entry['body']),
+            'elapsed': entry['elapsed'],
+        }
+
+
+# ========================
+# 라이브러리별 패치 (설치된 것만)
+# ========================
+_state: Dict[str, Any] = {'mode': 'off', 'cassette': None, 'originals': {}}
+
+
+def _content_type(headers) -> str:
+    return (headers or {}).get('Content-Type') or (headers or {}).get('content-type') or ''
+
+
+def _patch_requests():
+    import requests
+
+    original = requests.Session.send
+
+    def send(session, request, **kwargs):
+        cassette: Cassette = _state['cassette']
+        content_type = _content_type(request.headers)
+        if _state['mode'] == 'replay':
+            recorded = cassette.replay(request.method, request.url, request.body, content_type)
+            response = requests.Response()
+            response.status_code = recorded['status']
+            response.reason = recorded['reason']
+            response.headers = requests.structures.CaseInsensitiveDict(recorded['headers'])
+            response._content = recorded['content']
+            # 이미 읽은 응답처럼: iter_content 는 _content 를 잘라서, raw.read() 는 같은 바이트를 반환
+            response._content_consumed = True
+            response.raw = io.BytesIO(recorded['content'])
+            response.url = request.url
+            response.request = request
+            response.elapsed = timedelta(seconds=recorded['elapsed'])
+            return response
+        response = original(session, request, **kwargs)
+        content = response.content
+        cassette.record(request.method, request.url, request.body, content_type, response.status_code,
+                        dict(response.headers), content, response.elapsed.total_seconds(), response.reason or '')
+        return response
+
+    _state['originals']['requests'] = (requests.Session, 'send', original)
+    requests.Session.send = send
+
+
+def _patch_httpx():
+    import httpx
+
+    original = httpx.HTTPTransport.handle_request
+
+    def handle_request(transport, request):
+        cassette: Cassette = _state['cassette']
+        body = request.read()
+        content_type = request.headers.get('content-type', '')
+        if _state['mode'] == 'replay':
+            recorded = cassette.replay(request.method, str(request.url), body, content_type)
+            return httpx.Response(recorded['status'], headers=recorded['headers'], content=recorded['content'],
+                                  request=request)
+        started = time.monotonic()
+        response = original(transport, request)
+        # 압축 해제 전 원본 바이트를 저장 → 재생 시 httpx 가 헤더대로 다시 디코딩
+        raw = b''.join(response.iter_raw())
+        response.close()
+        cassette.record(request.method, str(request.url), body, content_type, response.status_code,
+                        dict(response.headers), raw, time.monotonic() - started)
+        return httpx.Response(response.status_code, headers=response.headers, content=raw, request=request)
+
+    _state['originals']['httpx'] = (httpx.HTTPTransport, 'handle_request', original)
+    httpx.HTTPTransport.handle_request = handle_request
+
+
+def _patch_httplib2():
+    import httplib2
+
+    original = httplib2.Http.request
+
+    def request(http, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        cassette: Cassette = _state['cassette']
+        content_type = _content_type(headers)
+        if _state['mode'] == 'replay':
+            recorded = cassette.replay(method, uri, body, content_type)
+            return httplib2.Response(dict(recorded['headers'], status=str(recorded['status']))), recorded['content']
+        started = time.monotonic()
+        response, content = original(http, uri, method, body, headers, *args, **kwargs)
+        cassette.record(method, uri, body, content_type, response.status,
+                        {k: v for k, v in response.items() if k != 'status'}, content,
+                        time.monotonic() - started, response.reason or '')
+        return response, content
+
+    _state['originals']['httplib2'] = (httplib2.Http, 'request', original)
+    httplib2.Http.request = request
+
+
+PATCHES = {
+    'requests': _patch_requests,   # ElevenLabs (requests.post), pytrends(TrendReq)
+    'httpx': _patch_httpx,         # openai SDK, elevenlabs SDK
+    'httplib2': _patch_httplib2,   # googleapiclient (YouTube), OAuth 토큰 갱신 포함
+}
+
+
+def install(mode: Optional[str] = None, cassette_dir: Optional[str] = None,
+            latency: Optional[float] = None) -> Optional[Cassette]:
+    """TRANSPORT_MODE=record|replay 이면 HTTP 라이브러리 호출을 카세트로 녹화/재생. off 면 아무것도 하지 않음"""
+    mode = (mode or os.getenv('TRANSPORT_MODE', 'off')).lower()
+    if mode not in MODES:
+        raise ValueError(f"지원하지 않는 TRANSPORT_MODE: {mode}")
+    if mode == 'off':
+        return None
+    if _state['cassette'] is not None:
+        uninstall()
+
+    cassette_dir = cassette_dir or os.getenv('CASSETTE_DIR', 'static/cassettes/default')
+    if latency is None:
+        # REPLAY_LATENCY: 녹화된 응답 시간에 곱할 배율 (0 = 지연 없이 최대 속도)
+        latency = float(os.getenv('REPLAY_LATENCY', 0))
+    _state.update(mode=mode, cassette=Cassette(cassette_dir, latency if mode == 'replay' else 0.0))
+
+    patched = []
+    for name, patch in PATCHES.items():
+        try:
+            patch()
+            patched.append(name)
+        except ImportError:
+            continue
+    logger.info(f"📼 전송 계층 {mode} 모드: {cassette_dir} ({', '.join(patched)})")
+    return _state['cassette']
+
+
+def uninstall():
+    for owner, attr, original in _state['originals'].values():
+        setattr(owner, attr, original)
+    _state.update(mode='off', cassette=None, originals={})
@@ -1,18 +1,14 @@
 from pytrends.request import TrendReq
 import logging
+import json
 import os
 import random
 from typing import Optional, List
 from datetime import datetime, timedelta
+from retry_policy import get_policy
+from topic_queue import topic_queue
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('static/logs/trending.log'),
-        logging.StreamHandler()
-    ]
-)
+logger = logging.getLogger(__name__)
 
 DEFAULT_KEYWORDS = [
     'AI', '머신러닝', '딥러닝', '기술', '프로그래밍', 
@@ -29,8 +25,8 @@ class TrendAnalyzer:
             hl='ko-KR',
             tz=540,  # KST (UTC+9)
             timeout=(10, 25),
-            retries=3,
-            backoff_factor=0.3
+            retries=0,  # 재시도는 retry_policy 에서만 수행
+            backoff_factor=0
         )
         self.cache_file = 'static/logs/trend_cache.json'
         self.cache_expiry = timedelta(hours=6)
@@ -38,17 +34,30 @@ class TrendAnalyzer:
         self.cached_data = None
 
     def _load_cached_data(self):
+        """(트렌드 목록, 조회 시각) 또는 None"""
         if os.path.exists(self.cache_file):
             try:
                 with open(self.cache_file, 'r') as f:
                     data = json.load(f)
                     cache_time = datetime.fromisoformat(data['timestamp'])
                     if datetime.now() - cache_time < self.cache_expiry:
-                        return data['trends']
+                        return data['trends'], cache_time
             except:
                 pass
         return None
 
+    @staticmethod
+    def _feed_queue(trends, seen_at: datetime):
+        # 관측 시각 기준 우선순위라 같은 캐시를 다시 넣어도 점수가 중복으로 오르지 않음 (게시/처리 중 주제는 큐에서 제외)
+        topic_queue.push_many([{'topic': t['query'], 'category': t['keyword'], 'score': t['value']}
+                               for t in trends], seen_at=seen_at.timestamp())
+
+    @staticmethod
+    def _fallback_topic() -> str:
+        """아직 게시하지 않은 기본 키워드 중 랜덤 (모두 게시했으면 전체에서)"""
+        unpublished = [k for k in DEFAULT_KEYWORDS if not topic_queue.is_published(k)]
+        return random.choice(unpublished or DEFAULT_KEYWORDS)
+
     def _save_to_cache(self, trends):
         os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
         with open(self.cache_file, 'w') as f:
@@ -63,24 +72,29 @@ class TrendAnalyzer:
             # 캐시 확인
             cached = self._load_cached_data()
             if cached:
-                logging.info("캐시된 트렌드 데이터 사용")
-                return cached
+                logger.info("캐시된 트렌드 데이터 사용")
+                trends, cache_time = cached
+                self._feed_queue(trends, cache_time)
+                return trends[:10]
 
             if not keywords:
                 env_keywords = os.getenv("TREND_KEYWORDS")
                 keywords = [k.strip() for k in env_keywords.split(',')] if env_keywords else DEFAULT_KEYWORDS
 
-            # 지난 3일간의 데이터 요청
-            self.pytrends.build_payload(
-                keywords,
-                cat=0,
-                timeframe='now 3-d',
-                geo='KR',
-                gprop=''
-            )
-
-            # 관련 쿼리 가져오기
-            related_queries = self.pytrends.related_queries()
+            def _fetch(attempt):
+                # 지난 3일간의 데이터 요청
+                self.pytrends.build_payload(
+                    keywords,
+                    cat=0,
+                    timeframe='now 3-d',
+                    geo='KR',
+                    gprop=''
+                )
+
+                # 관련 쿼리 가져오기
+                return self.pytrends.related_queries()
+
+            related_queries = get_policy('trends').run(_fetch, stage='trends')
             trending_topics = []
 
             for kw in keywords:
@@ -90,43 +104,42 @@ class TrendAnalyzer:
                         trending_topics.append({
                             'keyword': kw,
                             'query': row['query'],
-                            'value': row['value']
+                            'value': int(row['value'])
                         })
 
             # 결과가 없으면 기본 키워드 중 랜덤 선택
             if not trending_topics:
-                logging.warning("트렌드 데이터 없음. 기본 키워드 사용")
-                return [{'keyword': '기술', 'query': random.choice(DEFAULT_KEYWORDS), 'value': 50}]
+                logger.warning("트렌드 데이터 없음. 기본 키워드 사용")
+                return [{'keyword': '기술', 'query': self._fallback_topic(), 'value': 50}]
 
             # 값에 따라 정렬
             trending_topics.sort(key=lambda x: x['value'], reverse=True)
 
-            # 캐시 저장
+            # 캐시 저장 + 주제 큐에 공급
             self._save_to_cache(trending_topics)
+            self._feed_queue(trending_topics, datetime.now())
 
             return trending_topics[:10]  # 상위 10개만 반환
 
         except Exception as e:
-            logging.error(f"트렌드 분석 실패: {str(e)}")
+            logger.error(f"트렌드 분석 실패: {str(e)}")
             # 실패 시 기본 키워드 반환
-            return [{'keyword': '기술', 'query': random.choice(DEFAULT_KEYWORDS), 'value': 50}]
+            return [{'keyword': '기술', 'query': self._fallback_topic(), 'value': 50}]
 
     def get_daily_trend(self) -> dict:
-        """일일 최고 트렌드 주제 반환"""
-        trends = self.get_trending_topics()
-        if not trends:
+        """주제 큐에서 지금 가장 점수가 높은(신선도 감쇠 반영) 미게시 주제를 꺼내 반환"""
+        trend = topic_queue.pop()
+        if trend is None:
+            # 큐가 비었으면 트렌드를 새로 조회해 채운 뒤 다시 시도
+            self.get_trending_topics()
+            trend = topic_queue.pop()
+        if trend is None:
             return {
-                'topic': random.choice(DEFAULT_KEYWORDS),
+                'topic': self._fallback_topic(),
                 'score': 50,
                 'category': '기술'
             }
-        
-        top_trend = trends[0]
-        return {
-            'topic': top_trend['query'],
-            'score': top_trend['value'],
-            'category': top_trend['keyword']
-        }
+        return trend
 
 # 트렌드 분석기 인스턴스
 trend_analyzer = TrendAnalyzer()
@@ -138,10 +151,9 @@ if __name__ == "__main__":
         for i, trend in enumerate(trends[:5], 1):
             print(f"{i}. {trend['query']} (관련어: {trend['keyword']}, 점수: {trend['value']})")
         
-        daily_trend = trend_analyzer.get_daily_trend()
-        print("\n=== 오늘의 추천 주제 ===")
-        print(f"주제: {daily_trend['topic']}")
-        print(f"카테고리: {daily_trend['category']}")
-        print(f"인기 점수: {daily_trend['score']}")
+        # 조회만 하고 꺼내지 않음 (get_daily_trend 는 주제를 처리 중으로 표시)
+        print("\n=== 제작 대기 주제 (감쇠 점수 순) ===")
+        for i, trend in enumerate(topic_queue.peek(5), 1):
+            print(f"{i}. {trend['topic']} (카테고리: {trend['category']}, 점수: {trend['score']})")
     except Exception as e:
         print(f"트렌드 분석 중 오류 발생: {e}")
@@ -0,0 +1,103 @@
+# tts_budget.py
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from tts_normalizer import tts_normalizer
+
+logger = logging.getLogger(__name__)
+
+# ElevenLabs 는 요청 텍스트의 문자 수(공백/문장부호 포함)로 과금
+TTS_REQUEST_CAP = 5000
+
+
+def billed_chars(text: str, cap: Optional[int] = None) -> int:
+    """TTS 요청 시 실제로 과금되는 문자 수 (정규화 후 길이, cap: 호출부에서 잘라 보내는 최대 길이)"""
+    length = len(tts_normalizer.normalize(text or ''))
+    return min(length, cap) if cap else length
+
+
+def trend_value(trend: Optional[Dict[str, Any]]) -> float:
+    """트렌드 점수를 선택 가치로 사용 (점수가 없으면 ScriptGenerator 기본값과 같은 50)"""
+    try:
+        return max(0.0, float((trend or {}).get('score', 50)))
+    except (TypeError, ValueError):
+        return 50.0
+
+
+class TTSBudgetPlanner:
+    """남은 문자 예산 안에서 트렌드 가치 합이 최대가 되는 스크립트 조합 선택 (0/1 배낭 문제)"""
+
+    def __init__(self, granularity: int = 10):
+        # 문자 수를 granularity 단위로 올림 → 테이블 크기를 줄이면서 예산 초과는 절대 없음
+        self.granularity = max(1, granularity)
+
+    def plan(self, candidates: Sequence[Tuple[int, float]], budget: int,
+             limit: Optional[int] = None) -> List[int]:
+        """candidates: (과금 문자 수, 가치) 목록. 선택된 인덱스를 가치 높은 순으로 반환"""
+        capacity = max(0, budget) // self.granularity
+        limit = len(candidates) if limit is None else max(0, min(limit, len(candidates)))
+        weights = [-(-chars // self.granularity) for chars, _ in candidates]
+
+        # best[k][c]: 최대 k개, 예산 c 단위 이내에서 얻을 수 있는 최대 가치
+        best = [[0.0] * (capacity + 1) for _ in range(limit + 1)]
+        taken = []
+        for idx, (weight, (_, value)) in enumerate(zip(weights, candidates)):
+            keep = [[False] * (capacity + 1) for _ in range(limit + 1)]
+            if value > 0 and weight <= capacity:
+                for k in range(limit, 0, -1):
+                    row, prev = best[k], best[k - 1]
+                    for c in range(capacity, weight - 1, -1):
+                        gain = prev[c - weight] + value
+                        if gain > row[c]:
+                            row[c] = gain
+                            keep[k][c] = True
+            taken.append(keep)
+
+        # 역추적
+        selected, k, c = [], limit, capacity
+        for idx in range(len(candidates) - 1, -1, -1):
+            if k > 0 and taken[idx][k][c]:
+                selected.append(idx)
+                c -= weights[idx]
+                k -= 1
+        selected.sort(key=lambda i: (-candidates[i][1], candidates[i][0]))
+        return selected
+
+    def plan_scripts(self, entries: Sequence[Tuple[Dict[str, Any], str]], budget: int,
+                     limit: Optional[int] = None, cap: Optional[int] = None) -> List[int]:
+        """(trend, script) 목록에서 TTS 를 돌릴 항목 선택 + 결과 로그"""
+        candidates = [(billed_chars(script, cap), trend_value(trend)) for trend, script in entries]
+        selected = self.plan(candidates, budget, limit)
+        used = sum(candidates[i][0] for i in selected)
+        value = sum(candidates[i][1] for i in selected)
+        logger.info(f"🧮 TTS 예산 계획: {len(selected)}/{len(entries)}개 선택, "
+                    f"{used}/{budget}자 사용, 트렌드 가치 {value:.0f}")
+        return selected
+
+
+# TTS 예산 플래너 인스턴스
+tts_planner = TTSBudgetPlanner()
+
+if __name__ == "__main__":
+    import time
+    import random
+    from logging_setup import setup_logging
+    setup_logging()
+
+    rng = random.Random(0)
+    entries = [({'topic': f"주제 {i}", 'score': rng.randint(10, 100)}, "가" * rng.randint(150, 700))
+               for i in range(16)]
+    budget = 3000
+
+    started = time.perf_counter()
+    chosen = tts_planner.plan_scripts(entries, budget, limit=8)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    # 비교: 점수 순 탐욕 선택
+    greedy, used = [], 0
+    for idx in sorted(range(len(entries)), key=lambda i: -entries[i][0]['score']):
+        chars = len(entries[idx][1])
+        if len(greedy) < 8 and used + chars <= budget:
+            greedy.append(idx)
+            used += chars
+    print(f"배낭: 가치 {sum(entries[i][0]['score'] for i in chosen)} ({elapsed:.1f}ms), "
+          f"점수순 탐욕: 가치 {sum(entries[i][0]['score'] for i in greedy)}")
@@ -0,0 +1,234 @@
+# tts_normalizer.py
+import re
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ========================
+# 변환 테이블
+# ========================
+# 스크립트 구성 표시 (음성으로 읽으면 안 되는 라벨)
+SECTION_LABELS = (
+    '훅', '후크', '인트로', '오프닝', '도입', '본문', '본론', '전개', '결론', '요약', '마무리', '클로징', '아웃트로',
+    'CTA', '나레이션', '내레이션', '효과음', '배경음악', 'BGM', '음악', '화면', '자막', '장면', '컷', '전환',
+    'Hook', 'Intro', 'Body', 'Outro', 'Scene', 'SFX',
+)
+_LABELS = '|'.join(sorted(map(re.escape, SECTION_LABELS), key=len, reverse=True))
+
+# 읽을 수 있는 기호 → 읽기
+SYMBOL_READINGS = {'&': ' 앤 ', '+': ' 플러스 ', '=': ' 는 ', '→': ', ', '·': ', '}
+
+# 이모지/변형 선택자/결합 문자 (str.translate 용 삭제 테이블)
+EMOJI_RANGES = (
+    (0x1F000, 0x1FAFF), (0x2600, 0x27BF), (0x2B00, 0x2BFF), (0x2190, 0x21FF),
+    (0xFE00, 0xFE0F), (0x200D, 0x200D), (0x20E3, 0x20E3), (0xE0020, 0xE007F),
+)
+# 자막용: 이모지만 삭제 (읽기가 있는 기호 '→' 등은 화면에 그대로)
+DISPLAY_TABLE: Dict[int, object] = {cp: None for start, end in EMOJI_RANGES for cp in range(start, end + 1)
+                                    if chr(cp) not in SYMBOL_READINGS}
+# 낭독용: 이모지 삭제 + 기호 읽기
+TRANSLATE_TABLE: Dict[int, object] = {**DISPLAY_TABLE, **{ord(k): v for k, v in SYMBOL_READINGS.items()}}
+
+# 단위 (숫자 바로 뒤, 긴 것부터 매칭)
+UNIT_READINGS = {
+    'km/h': '킬로미터', 'm/s': '미터', 'kWh': '킬로와트시', 'mAh': '밀리암페어시', 'GHz': '기가헤르츠', 'MHz': '메가헤르츠',
+    'Hz': '헤르츠', 'km': '킬로미터', 'cm': '센티미터', 'mm': '밀리미터', 'm': '미터', 'kg': '킬로그램',
+    'mg': '밀리그램', 'g': '그램', 'TB': '테라바이트', 'GB': '기가바이트', 'MB': '메가바이트', 'KB': '킬로바이트',
+    'kW': '킬로와트', 'W': '와트', 'ms': '밀리초', '%': '퍼센트', '°C': '도', '℃': '도', 'x': '배',
+}
+# 속력 단위는 '시속 육십킬로미터' 처럼 앞에 붙여 읽음 (원문에 이미 '시속' 이 있으면 생략)
+SPEED_PREFIX = {'km/h': '시속', 'm/s': '초속'}
+CURRENCY_PREFIX = {'$': '달러', '₩': '원', '€': '유로', '¥': '엔', '£': '파운드'}
+# 고유어 수사로 읽는 단위 명사 (1~99). '개월' 처럼 한자어로 읽는 것은 예외로 먼저 매칭
+NATIVE_COUNTERS = ('번째', '시간', '가지', '마리', '군데', '개', '명', '살', '시', '번', '잔', '권', '달', '곳', '대')
+SINO_COUNTERS = ('개월',)
+
+SINO_DIGITS = '영일이삼사오육칠팔구'
+SMALL_UNITS = ('', '십', '백', '천')
+LARGE_UNITS = ('', '만', '억', '조', '경')
+NATIVE_ONES = ('', '한', '두', '세', '네', '다섯', '여섯', '일곱', '여덟', '아홉')
+NATIVE_TENS = ('', '열', '스물', '서른', '마흔', '쉰', '예순', '일흔', '여든', '아흔')
+
+# ========================
+# 미리 컴파일한 규칙 (순서대로 적용)
+# ========================
+MARKUP_RULES: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r'https?://\S+|www\.\S+'), ''),
+    (re.compile(r'\[([^\]\n]+)\]\([^)\n]+\)'), r'\1'),                                 # [텍스트](링크)
+    (re.compile(r'[\[【][^\]】\n]{0,40}[\]】]'), ''),                                     # [효과음], 【화면】
+    (re.compile(rf'\(\s*(?:{_LABELS})[^)\n]{{0,20}}\)', re.IGNORECASE), ''),           # (훅), (효과음: 쾅)
+    (re.compile(r'\(\s*\d+\s*(?:[-~]\s*\d+\s*)?초\s*\)'), ''),                        # (3-5초)
+    (re.compile(rf'(?m)^[ \t]*(?:[#>*\-•]+[ \t]*)?(?:\d+[.)][ \t]*)?[*_]*(?:{_LABELS})[*_]*[ \t]*'
+                rf'(?:\([^)\n]*\))?[ \t]*[:：][ \t]*', re.IGNORECASE), ''),              # "1. 훅 (3-5초):"
+    (re.compile(r'(?m)^[ \t]*(?:#{1,6}|[*\-•>]|\d+[.)])[ \t]+'), ''),                  # 제목/목록 기호
+    (re.compile(r'\*\*|__|~~|`|(?<!\w)[*_]|[*_](?!\w)'), ''),                           # 강조
+    (re.compile(r'(^|\s)#[^\s#]+'), r'\1'),                                            # 해시태그
+]
+# 범위 "3~5개": 두 번째 수의 단위 명사를 앞 수에도 적용 (세에서 다섯개)
+RANGE_RE = re.compile(
+    r'(?<![A-Za-z\d.,])(?P<num>\d{1,3}(?:,\d{3})+|\d+)(?P<frac>\.\d+)?\s*~\s*'
+    r'(?=[\d,]*\d(?:\.\d+)?(?P<counter>' + '|'.join(SINO_COUNTERS + NATIVE_COUNTERS) + r')?)'
+)
+NUMBER_RE = re.compile(
+    r'(?<![A-Za-z\d.])(?<![A-Za-z]-)(?P<cur>[$₩€¥£])?(?P<num>\d{1,3}(?:,\d{3})+|\d+)(?:\.(?P<frac>\d+))?'
+    r'(?:(?P<unit>' + '|'.join(map(re.escape, sorted(UNIT_READINGS, key=len, reverse=True))) + r')(?![A-Za-z])'
+    r'|(?P<counter>' + '|'.join(SINO_COUNTERS + NATIVE_COUNTERS) + r')|(?![A-Za-z]))'
+)
+WHITESPACE_RULES: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r'(?<=[^\s.,!?…:;。])[ \t]*\n\s*(?=\S)'), ', '),                          # 문장부호 없는 줄바꿈 → 쉼
+    (re.compile(r'\.{3,}'), '…'),
+    (re.compile(r'([!?。])\1+'), r'\1'),
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r' ([.,!?…])'), r'\1'),
+    (re.compile(r'([.,!?])(?:\s*[.,])+'), r'\1'),
+]
+
+
+def sino_number(value: int) -> str:
+    """한자어 수사 (만/억/조 단위, '일십'·'일백'·'일천'·'일만' 의 '일' 생략)"""
+    if value == 0:
+        return '영'
+    groups, parts = [], str(value)
+    while parts:
+        groups.append(int(parts[-4:]))
+        parts = parts[:-4]
+    words = []
+    for index in range(len(groups) - 1, -1, -1):
+        group = groups[index]
+        if not group:
+            continue
+        chunk = ''
+        for place in range(3, -1, -1):
+            digit = group // (10 ** place) % 10
+            if digit:
+                chunk += ('' if digit == 1 and place else SINO_DIGITS[digit]) + SMALL_UNITS[place]
+        if index == 1 and group == 1:
+            chunk = ''
+        words.append(chunk + LARGE_UNITS[index])
+    return ''.join(words)
+
+
+def native_number(value: int) -> str:
+    """고유어 수 관형사 (1~99: 한, 두, 세, 스무, 스물한 ...)"""
+    tens, ones = divmod(value, 10)
+    if tens == 2 and ones == 0:
+        return '스무'
+    return NATIVE_TENS[tens] + NATIVE_ONES[ones]
+
+
+def _read_range(match: re.Match) -> str:
+    digits, frac, counter = match.group('num', 'frac', 'counter')
+    value = int(digits.replace(',', ''))
+    if counter == '번째' and value == 1 and not frac:
+        return '첫 번째에서 '
+    if counter in NATIVE_COUNTERS and not frac and 0 < value < 100:
+        return native_number(value) + '에서 '
+    # 나머지는 숫자 그대로 두고 NUMBER_RE 에서 읽음 (통화 기호 등 앞뒤 문맥 유지)
+    return digits + (frac or '') + '에서 '
+
+
+def _read_number(match: re.Match) -> str:
+    digits = match.group('num').replace(',', '')
+    frac, unit, counter, currency = match.group('frac', 'unit', 'counter', 'cur')
+    if len(digits) > 16 or (digits.startswith('0') and len(digits) > 1):
+        # 전화번호/코드: 한 자리씩
+        spoken = ''.join(SINO_DIGITS[int(d)] for d in digits)
+    elif counter == '번째' and int(digits) == 1 and not frac:
+        # 순서의 첫째는 '한번째' 가 아니라 '첫 번째'
+        return '첫 번째'
+    elif counter in NATIVE_COUNTERS and not frac and 0 < int(digits) < 100:
+        spoken = native_number(int(digits))
+    else:
+        spoken = sino_number(int(digits))
+    if frac:
+        spoken += '점' + ''.join(SINO_DIGITS[int(d)] for d in frac)
+    if unit:
+        spoken += UNIT_READINGS[unit]
+    if counter:
+        spoken += counter
+    if currency:
+        spoken += CURRENCY_PREFIX[currency]
+    prefix = SPEED_PREFIX.get(unit)
+    if prefix and not match.string[:match.start()].rstrip().endswith(prefix):
+        spoken = f"{prefix} {spoken}"
+    return spoken
+
+
+class TTSNormalizer:
+    """TTS 요청 전 텍스트 정규화: 마크업/연출 지시/이모지 제거, 숫자·단위 한국어 읽기, 공백 정리 (원문은 그대로 둠)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {'scripts': 0, 'original_chars': 0, 'spoken_chars': 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """부수 효과 없는 정규화 (같은 입력에 두 번 적용해도 결과가 같음)"""
+        if not text:
+            return ''
+        for pattern, replacement in MARKUP_RULES:
+            text = pattern.sub(replacement, text)
+        text = text.translate(TRANSLATE_TABLE)
+        text = RANGE_RE.sub(_read_range, text)
+        text = NUMBER_RE.sub(_read_number, text)
+        for pattern, replacement in WHITESPACE_RULES:
+            text = pattern.sub(replacement, text)
+        return text.strip()
+
+    @staticmethod
+    def display(text: str) -> str:
+        """자막용 원문: 마크업/연출 지시/이모지만 제거하고 숫자·기호·줄바꿈은 그대로 둠"""
+        if not text:
+            return ''
+        for pattern, replacement in MARKUP_RULES:
+            text = pattern.sub(replacement, text)
+        text = text.translate(DISPLAY_TABLE)
+        return '\n'.join(re.sub(r'[ \t]+', ' ', line).strip() for line in text.splitlines() if line.strip())
+
+    def for_tts(self, text: str, label: str = '') -> str:
+        """정규화 + 스크립트별 절약 문자 수 기록"""
+        spoken = self.normalize(text)
+        saved = len(text or '') - len(spoken)
+        with self._lock:
+            self.stats['scripts'] += 1
+            self.stats['original_chars'] += len(text or '')
+            self.stats['spoken_chars'] += len(spoken)
+        logger.info(f"🧹 TTS 정규화{f' ({label})' if label else ''}: {len(text or '')}자 → {len(spoken)}자 "
+                    f"({saved:+d}자 절약)")
+        return spoken
+
+    def report(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['saved_chars'] = stats['original_chars'] - stats['spoken_chars']
+        stats['saved_ratio'] = round(stats['saved_chars'] / stats['original_chars'], 3) if stats['original_chars'] else 0.0
+        return stats
+
+
+# TTS 정규화 인스턴스
+tts_normalizer = TTSNormalizer()
+
+if __name__ == "__main__":
+    import time
+
+    sample = """**1. 훅 (3-5초):** 🔥 여러분, 2024년 AI 시장이 1,200억 달러를 넘었다는 사실 알고 계셨나요?! 🤖
+
+(본문)
+- 첫째, GPT-4 같은 모델이 3가지 분야를 바꾸고 있어요 💡
+- 둘째, 전 세계 개발자 중 73.5%가 AI 도구를 써요!!!
+- 셋째, 스마트폰 배터리 5000mAh 시대... 충전은 단 20분 ⚡
+
+[효과음: 띠링]
+**결론:** 앞으로 12개월, 여러분의 일상도 바뀝니다 → 구독하고 21명의 친구와 공유하세요 👍 #AI #기술"""
+    print(tts_normalizer.for_tts(sample, 'sample'))
+
+    # 처리량: 컴파일된 규칙 + translate 테이블
+    scripts = [sample] * 2000
+    started = time.perf_counter()
+    for script in scripts:
+        TTSNormalizer.normalize(script)
+    elapsed = time.perf_counter() - started
+    print(f"{len(scripts)}개 정규화: {elapsed * 1000:.0f}ms ({elapsed / len(scripts) * 1e6:.0f}µs/개), "
+          f"절약 {tts_normalizer.report()['saved_ratio'] * 100:.1f}%")
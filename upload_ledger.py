@@ -0,0 +1,138 @@
+# upload_ledger.py
+import os
+import json
+import hashlib
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: 단일 프로세스 실행만 가정
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+class UploadLedger:
+    """렌더링 결과(내용 해시) + 제목 기준 업로드 기록. 같은 영상은 한 번만 videos.insert"""
+
+    def __init__(self, ledger_file: str = 'static/logs/upload_ledger.json', keep_days: int = 30):
+        self.ledger_file = ledger_file
+        self.keep_days = keep_days
+
+    # ========================
+    # 저장소 (읽기-수정-쓰기 전체를 파일 잠금으로 보호)
+    # ========================
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if os.path.exists(self.ledger_file):
+            with open(self.ledger_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]):
+        tmp_path = f"{self.ledger_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.ledger_file)
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(os.path.dirname(self.ledger_file) or '.', exist_ok=True)
+        with open(f"{self.ledger_file}.lock", 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self._load()
+            yield entries
+            self._save(entries)
+
+    @staticmethod
+    def key_for(file_hash: str, title: str) -> str:
+        return hashlib.sha256(f"{file_hash}|{title}".encode('utf-8')).hexdigest()[:24]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._load().get(key)
+
+    # ========================
+    # 상태 전이: started → (session_uri) → completed
+    # ========================
+    def begin(self, path: str, title: str) -> Dict[str, Any]:
+        """업로드 시도 기록. 이미 있는 항목이면 시도 횟수만 늘려서 그대로 반환"""
+        file_hash = content_hash(path)
+        key = self.key_for(file_hash, title)
+        now = datetime.now().astimezone().isoformat()
+        with self._locked() as entries:
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = {
+                    'key': key,
+                    'content_hash': file_hash,
+                    'title': title,
+                    'state': 'started',
+                    'session_uri': None,
+                    'video_id': None,
+                    'attempts': 0,
+                    'started_at': now,
+                }
+            if entry['state'] != 'completed':
+                entry['attempts'] += 1
+            entry['file'] = path
+            entry['updated_at'] = now
+            self._prune(entries)
+            return dict(entry)
+
+    def set_session(self, key: str, session_uri: Optional[str]):
+        """재개 가능한 업로드 세션 URI 저장 (None 이면 만료된 세션 삭제)"""
+        with self._locked() as entries:
+            entries[key]['session_uri'] = session_uri
+            entries[key]['state'] = 'uploading' if session_uri else 'started'
+            entries[key]['updated_at'] = datetime.now().astimezone().isoformat()
+
+    def complete(self, key: str, video_id: str, source: str = 'upload'):
+        with self._locked() as entries:
+            entries[key].update(state='completed', video_id=video_id, session_uri=None, completed_by=source,
+                                updated_at=datetime.now().astimezone().isoformat())
+            title = entries[key]['title']
+        logger.info(f"📒 업로드 기록: {title} → {video_id} ({source})")
+
+    def pending(self) -> List[Dict[str, Any]]:
+        return [entry for entry in self._load().values() if entry['state'] != 'completed']
+
+    def reconcile(self, uploads: Iterable[Dict[str, Any]], slack_minutes: int = 10) -> int:
+        """채널 최근 업로드(id, title, published_at)와 대조해, 응답을 못 받은 채 끝난 업로드를 완료 처리"""
+        uploads = list(uploads)
+        matched = 0
+        with self._locked() as entries:
+            claimed = {entry['video_id'] for entry in entries.values() if entry.get('video_id')}
+            for entry in entries.values():
+                if entry['state'] == 'completed':
+                    continue
+                started = datetime.fromisoformat(entry['started_at']) - timedelta(minutes=slack_minutes)
+                for upload in uploads:
+                    published = datetime.fromisoformat(upload['published_at'].replace('Z', '+00:00'))
+                    if upload['title'] == entry['title'] and upload['id'] not in claimed and published >= started:
+                        entry.update(state='completed', video_id=upload['id'], session_uri=None,
+                                     completed_by='reconcile', updated_at=datetime.now().astimezone().isoformat())
+                        claimed.add(upload['id'])
+                        matched += 1
+                        logger.info(f"📒 채널 대조로 업로드 확인: {entry['title']} → {upload['id']}")
+                        break
+        return matched
+
+    def _prune(self, entries: Dict[str, Dict[str, Any]]):
+        cutoff = datetime.now().astimezone() - timedelta(days=self.keep_days)
+        for key in [k for k, e in entries.items() if datetime.fromisoformat(e['started_at']) < cutoff]:
+            del entries[key]
+
+
+# 업로드 기록 인스턴스
+upload_ledger = UploadLedger()
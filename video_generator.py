@@ -1,39 +1,101 @@
+import os
 import subprocess
+from typing import Dict, Iterable, Optional
+from captions import ass_filter
+from background_generator import background_library, size_for_targets
+from parallel_render import render_parallel
+from encoder_autotune import encoder_profiles
 
-def generate_video():
-    input_audio = "output/final.mp3"
-    input_image = "output/background.png"
-    output_video = "output/final.mp4"
+# 출력 포맷 정의 (aspect: 가로/세로 비율로 중앙 크롭 후 size 로 스케일)
+TARGET_FORMATS = {
+    'shorts': {'size': (720, 1280), 'aspect': (9, 16), 'max_duration': 60, 'crf': 23},
+    'longform': {'size': (1920, 1080), 'aspect': (16, 9), 'max_duration': None, 'crf': 23},
+    'preview': {'size': (360, 640), 'aspect': (9, 16), 'max_duration': 15, 'crf': 32},
+}
+
+
+def _branch_filter(fmt: dict) -> str:
+    """중앙 크롭 + 스케일 필터"""
+    aw, ah = fmt['aspect']
+    width, height = fmt['size']
+    return (f"crop='min(iw,ih*{aw}/{ah})':'min(ih,iw*{ah}/{aw})',"
+            f"scale={width}:{height},setsar=1")
+
+
+def render_video(input_audio: str, input_image: str, targets: Iterable[str] = ('shorts',),
+                 output_dir: str = "output", captions: Optional[str] = None,
+                 parallel: bool = False) -> Dict[str, str]:
+    """한 번의 디코딩으로 여러 포맷을 동시에 인코딩. {포맷: 출력 경로} 반환"""
+    targets = list(dict.fromkeys(targets))
+    unknown = [name for name in targets if name not in TARGET_FORMATS]
+    if not targets or unknown:
+        raise ValueError(f"지원하지 않는 출력 포맷: {unknown or targets}")
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {name: os.path.join(output_dir, f"{name}.mp4") for name in targets}
+
+    if parallel:
+        # 롱폼(8~10분) 영상: 키프레임 경계로 나눠 CPU 코어 수만큼 병렬 인코딩
+        for name in targets:
+            fmt = TARGET_FORMATS[name]
+            # 해상도별 튜닝 프로필이 있으면 그 crf 를, 없으면 포맷 기본 crf 사용
+            profile = encoder_profiles.get(input_image, fmt['size']) or {}
+            render_parallel(input_image, input_audio, outputs[name],
+                            video_filter=_branch_filter(fmt), crf=profile.get('crf', fmt['crf']),
+                            max_duration=fmt['max_duration'], size=fmt['size'],
+                            timed_filter=ass_filter(captions) if captions else None)
+        print("🎬 영상 생성 완료 (병렬):", ", ".join(outputs.values()))
+        return outputs
+
+    # 모든 포맷에 길이 제한이 있으면 가장 긴 제한을 입력 단계에서 적용해 디코딩 자체를 줄임
+    caps = [TARGET_FORMATS[name]['max_duration'] for name in targets]
+    input_cap = ["-t", str(max(caps))] if all(caps) else []
+
+    labels = [f"[s{idx}]" for idx in range(len(targets))]
+    graph = [f"[0:v]split={len(targets)}{''.join(labels)}" if len(targets) > 1 else "[0:v]null[s0]"]
+    for idx, name in enumerate(targets):
+        chain = _branch_filter(TARGET_FORMATS[name])
+        if captions:
+            # 자막(ASS)은 같은 인코딩 패스에서 번인 (Python 프레임 처리 없음)
+            chain += "," + ass_filter(captions)
+        graph.append(f"[s{idx}]{chain},format=yuv420p[v{idx}]")
 
     cmd = [
         "ffmpeg", "-y",
-        "-loop", "1",
-        "-i", input_image,
-        "-i", input_audio,
-        "-c:v", "libx264",
-        "-tune", "stillimage",
-        "-c:a", "aac",
-        "-b:a", "192k",
-        "-pix_fmt", "yuv420p",
-        "-shortest",
-        output_video
+        "-loop", "1", *input_cap, "-i", input_image,
+        *input_cap, "-i", input_audio,
+        "-filter_complex", ";".join(graph),
     ]
+    for idx, name in enumerate(targets):
+        fmt = TARGET_FORMATS[name]
+        # 해상도별 튜닝 프로필이 있으면 그 preset/crf/fps 사용 (encoder_autotune.py)
+        profile = encoder_profiles.get(input_image, fmt['size']) or {}
+        cmd += ["-map", f"[v{idx}]", "-map", "1:a"]
+        if fmt['max_duration'] and not (input_cap and fmt['max_duration'] == max(caps)):
+            cmd += ["-t", str(fmt['max_duration'])]
+        cmd += [
+            "-c:v", "libx264",
+            "-tune", "stillimage",
+            *(["-preset", profile['preset'], "-r", str(profile['fps'])] if profile else []),
+            "-crf", str(profile.get('crf', fmt['crf'])),
+            "-c:a", "aac",
+            "-b:a", "192k",
+            "-shortest",
+            "-movflags", "+faststart",
+            outputs[name]
+        ]
 
     subprocess.run(cmd, check=True)
-    print("🎬 영상 생성 완료:", output_video)
-    return output_video
+    print("🎬 영상 생성 완료:", ", ".join(outputs.values()))
+    return outputs
 
-def convert_to_shorts_format(input_path: str, output_path: str):
-    cmd = [
-        "ffmpeg",
-        "-i", input_path,
-        "-vf", "crop=in_h*9/16:in_h,scale=720:1280",
-        "-t", "60",
-        "-c:v", "libx264",
-        "-c:a", "aac",
-        "-strict", "experimental",
-        output_path
-    ]
-    subprocess.run(cmd, check=True)
-    print("🎬 Shorts 포맷 변환 완료:", output_path)
 
+def generate_video(parallel: bool = False, captions: Optional[str] = None,
+                   targets: Iterable[str] = ('shorts',), trend: Optional[dict] = None) -> str:
+    input_audio = "output/final.mp3"
+    input_image = "output/background.png"
+    if trend:
+        # 주제별로 다른 배경 (캐시 적중 시 ms 단위)
+        input_image = background_library.get(trend.get('topic', ''), trend.get('category', ''),
+                                             size=size_for_targets(targets))
+    outputs = render_video(input_audio, input_image, targets, captions=captions, parallel=parallel)
+    return next(iter(outputs.values()))
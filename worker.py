@@ -0,0 +1,196 @@
+# worker.py
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence
+from job_queue import JobQueue, Job, LeaseLost, open_queue
+from retry_policy import is_retryable, get_policy
+from quota_scheduler import find_quota_error
+
+logger = logging.getLogger(__name__)
+
+# 영상 1개가 거치는 단계 (순서대로)
+PIPELINE = ['trend', 'script', 'tts', 'render', 'thumbnail', 'upload']
+# 주제 큐/업로드 기록/보류 목록/쿼터 추적은 호스트별 JSON 파일 (fcntl 잠금은 같은 호스트 안에서만 유효)
+# → 여러 호스트로 나눌 때는 trend, upload 단계를 한 호스트에서만 실행 (python worker.py work trend,upload)
+
+
+def enqueue_videos(queue: JobQueue, count: int, work_root: Optional[str] = None) -> list:
+    """영상 count 개를 trend 단계부터 큐에 넣음. 단계 산출물은 작업별 디렉터리에 저장"""
+    work_root = work_root or os.getenv('JOB_WORK_DIR', 'static/jobs')
+    stamp = f"{time.strftime('%Y%m%d%H%M')}-{uuid.uuid4().hex[:6]}"
+    job_ids = []
+    for slot in range(count):
+        job_id = f"{stamp}-{slot}"
+        # 여러 호스트에서 실행할 때 work_root 는 공유 볼륨이어야 함 (큐도 fs:// 백엔드로 같은 볼륨에)
+        job_ids.append(queue.enqueue(PIPELINE[0], {
+            'slot': slot,
+            'work_dir': os.path.join(work_root, job_id),
+        }, job_id=job_id))
+    logger.info(f"📥 영상 작업 {count}개 등록")
+    return job_ids
+
+
+class PipelineWorker:
+    """큐에서 단계 작업을 임대해 처리하고 다음 단계로 넘기는 워커 (프로세스/호스트를 늘리면 처리량 증가)"""
+
+    def __init__(self, queue: JobQueue, worker_id: Optional[str] = None,
+                 stages: Optional[Sequence[str]] = None, visibility_timeout: float = 600,
+                 heartbeat_interval: float = 60, idle_sleep: float = 5):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.stages = list(stages) if stages else None
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_sleep = idle_sleep
+        self.backoff = get_policy('workflow')
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            'trend': self.find_trend,
+            'script': self.write_script,
+            'tts': self.synthesize,
+            'render': self.render,
+            'thumbnail': self.thumbnail,
+            'upload': self.upload,
+        }
+        self._bot = None
+
+    @property
+    def bot(self):
+        # API 초기화는 실제로 단계를 처리할 때 한 번만
+        if self._bot is None:
+            from secure_main import YouTubeAutomationPro
+            self._bot = YouTubeAutomationPro()
+        return self._bot
+
+    # ========================
+    # 단계 처리기 (payload → 다음 단계에 넘길 값)
+    # ========================
+    def find_trend(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # 주제 큐에서 꺼내므로 같은 호스트의 워커끼리는 같은 주제를 중복으로 꺼내지 않음 (여러 호스트는 PIPELINE 주석 참고)
+        from trending import trend_analyzer
+        return {'trend': trend_analyzer.get_daily_trend()}
+
+    def write_script(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.bot.script_streaming:
+            # 스크립트 스트리밍과 TTS 를 겹쳐 실행 → tts 단계는 건너뜀
+            os.makedirs(payload['work_dir'], exist_ok=True)
+            streamed = self.bot.stream_script_to_audio(payload.get('trend'),
+                                                       os.path.join(payload['work_dir'], "audio.mp3"))
+            return {'script': streamed['script'], 'audio': streamed['audio']}
+        return {'script': self.bot.generate_script(payload.get('trend'))}
+
+    def synthesize(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if payload.get('audio'):
+            return {}
+        os.makedirs(payload['work_dir'], exist_ok=True)
+        audio = self.bot.text_to_speech(payload['script'], os.path.join(payload['work_dir'], "audio.mp3"))
+        return {'audio': audio}
+
+    def render(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # 제목은 여기서 한 번 정해 두어야 업로드 재시도 때도 같은 업로드 기록을 찾음
+        captions = self.bot.make_captions(payload['script'], payload['audio'])
+        return {'video': self.bot.render(payload['audio'], os.path.join(payload['work_dir'], "final.mp4"), captions),
+                'title': payload.get('title') or self.bot.make_title()}
+
+    def thumbnail(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        from thumbnail_generator import thumbnail_encoder
+        try:
+            info = thumbnail_encoder.make(payload['title'], os.path.join(payload['work_dir'], "thumbnail.jpg"))
+        except Exception as e:
+            # 썸네일 없이도 업로드는 진행
+            logger.warning(f"⚠️ {payload['work_dir']} 썸네일 생성 실패: {str(e)}")
+            return {'thumbnail': None}
+        return {'thumbnail': info['path']}
+
+    def upload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        from topic_queue import topic_queue
+        video_id = self.bot._publish(payload)
+        topic_queue.mark_published(payload.get('trend') or {})
+        return {'video_id': video_id}
+
+    # ========================
+    # 실행 루프
+    # ========================
+    def _heartbeat(self, job: Job, stop: threading.Event):
+        while not stop.wait(self.heartbeat_interval):
+            if not self.queue.heartbeat(job, self.visibility_timeout):
+                logger.warning(f"💔 작업 {job.id} 임대를 잃음 (결과는 반영되지 않음)")
+                return
+
+    def process(self, job: Job):
+        logger.info(f"▶️ [{self.worker_id}] {job.id} {job.stage} (시도 {job.attempts})")
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job, stop), daemon=True)
+        beat.start()
+        try:
+            result = self.handlers[job.stage](job.payload)
+            index = PIPELINE.index(job.stage)
+            next_stage = PIPELINE[index + 1] if index + 1 < len(PIPELINE) else None
+            stop.set()
+            self.queue.complete(job, next_stage, {**job.payload, **result})
+            logger.info(f"✔️ {job.id} {job.stage} 완료" + (f" → {next_stage}" if next_stage else ""))
+        except LeaseLost as e:
+            logger.warning(str(e))
+        except Exception as e:
+            stop.set()
+            quota_error = find_quota_error(e)
+            if quota_error:
+                # 쿼터 대기는 실패가 아님: 리셋 시각까지 미뤄 두고 다른 단계 작업을 계속 처리
+                self.queue.release(job, quota_error.reset_at.timestamp())
+                logger.warning(f"⏸️ {job.id} {job.stage} 보류: {quota_error}")
+            elif is_retryable(e):
+                delay = self.backoff.compute_delay(job.attempts - 1, e)
+                if self.queue.fail(job, str(e), retry_delay=delay):
+                    logger.warning(f"🔄 {job.id} {job.stage} 실패: {str(e)} → {delay:.0f}초 후 재시도")
+            else:
+                self.queue.fail(job, str(e))
+        finally:
+            stop.set()
+            beat.join()
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_idle: bool = False) -> int:
+        """작업을 처리한 개수 반환"""
+        processed = 0
+        while max_jobs is None or processed < max_jobs:
+            job = self.queue.lease(self.worker_id, self.stages, self.visibility_timeout)
+            if job is None:
+                if exit_when_idle:
+                    break
+                time.sleep(self.idle_sleep)
+                continue
+            self.process(job)
+            processed += 1
+        return processed
+
+
+if __name__ == "__main__":
+    import sys
+    from dotenv import load_dotenv
+    load_dotenv()
+    from logging_setup import setup_logging
+    from transport import install as install_transport
+    setup_logging()
+    # TRANSPORT_MODE=record|replay: API 응답을 카세트로 녹화/재생 (개발·프로파일링용)
+    install_transport()
+
+    # 사용법:
+    #   python worker.py produce [개수]      영상 작업 등록
+    #   python worker.py work [단계,...]     워커 실행 (프로세스/호스트를 늘려 수평 확장)
+    #   python worker.py drain               남은 작업을 처리하고 종료
+    #   python worker.py stats               단계/상태별 작업 수
+    # 큐 위치: JOB_QUEUE=sqlite://static/queue/jobs.db (한 호스트), fs:///mnt/shared/queue (여러 호스트)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'work'
+    queue = open_queue()
+    if command == 'produce':
+        enqueue_videos(queue, int(sys.argv[2]) if len(sys.argv) > 2 else int(os.getenv('DAILY_VIDEOS', 3)))
+    elif command in ('work', 'drain'):
+        stages = sys.argv[2].split(',') if len(sys.argv) > 2 else None
+        worker = PipelineWorker(queue, stages=stages,
+                                visibility_timeout=float(os.getenv('JOB_VISIBILITY_TIMEOUT', 600)))
+        worker.run(exit_when_idle=command == 'drain')
+    else:
+        for key, count in sorted(queue.stats().items()):
+            print(f"{key}: {count}")